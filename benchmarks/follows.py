@@ -0,0 +1,144 @@
+'''
+Пропускная способность подписки и отписки.
+
+Пример:
+    python benchmarks/follows.py --size 10k --authors 200
+
+Временный пользователь подписывается на --authors авторов и отписывается
+от них тремя способами: прежним (автор отдельным запросом, проверка
+exists() и create()), одним запросом Follow.objects.follow/unfollow
+и пачкой Follow.objects.bulk_follow. Каждая операция, кроме пачки,
+коммитится отдельно, как запрос сайта. Сигналы (счетчики, лента,
+кэш страниц) работают во всех способах, у пачки - один сигнал
+follows_created на все подписки.
+'''
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.run import prepare_db, setup_django  # noqa: E402
+
+USERNAME = 'bench-follower'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--size', default='10k', choices=('10k', '1m'))
+    parser.add_argument('--authors', type=int, default=200)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--db')
+
+    return parser.parse_args()
+
+
+def two_queries(user, usernames):
+    '''Прежний путь представлений profile_follow и profile_unfollow'''
+
+    from django.shortcuts import get_object_or_404
+    from posts.models import Follow, User
+
+    for username in usernames:
+        author = get_object_or_404(User, username=username)
+        if not Follow.objects.filter(user=user, author=author).exists():
+            Follow.objects.create(user=user, author=author)
+
+    def unfollow():
+        for username in usernames:
+            Follow.objects.filter(
+                user=user, author__username=username
+            ).delete()
+
+    return unfollow
+
+
+def one_query(user, usernames):
+    from posts.models import Follow
+
+    for username in usernames:
+        Follow.objects.follow(user, username)
+
+    def unfollow():
+        for username in usernames:
+            Follow.objects.unfollow(user, username)
+
+    return unfollow
+
+
+def bulk(user, usernames):
+    from django.db import transaction
+    from posts.models import Follow, User
+
+    with transaction.atomic():
+        Follow.objects.bulk_follow(
+            Follow(user=user, author=author)
+            for author in User.objects.filter(
+                username__in=usernames
+            ).only('pk', 'username')
+        )
+
+    def unfollow():
+        for username in usernames:
+            Follow.objects.unfollow(user, username)
+
+    return unfollow
+
+
+MODES = (
+    ('два запроса', two_queries),
+    ('один запрос', one_query),
+    ('пачка', bulk),
+)
+
+
+def main():
+    args = parse_args()
+    db = args.db or os.path.join(
+        tempfile.gettempdir(), f'yatube-bench-{args.size}.sqlite3'
+    )
+    setup_django(db)
+    prepare_db(db, args.size, reseed=False)
+
+    from django.contrib.auth import get_user_model
+    from django.core.cache import cache
+    from django.db.models import Count
+
+    User = get_user_model()
+    User.objects.filter(username=USERNAME).delete()
+    user = User.objects.create_user(username=USERNAME)
+    # Авторы с постами: подписка на них заполняет ленту.
+    usernames = list(
+        User.objects.annotate(total=Count('posts')).filter(total__gt=0)
+        .exclude(pk=user.pk).order_by('pk')
+        .values_list('username', flat=True)[:args.authors]
+    )
+
+    print(f'{"способ":<14}{"подписок/с":>12}{"отписок/с":>12}')
+    try:
+        for name, mode in MODES:
+            follow_time = unfollow_time = 0
+            for _ in range(args.rounds):
+                cache.clear()
+                started = time.perf_counter()
+                unfollow = mode(user, usernames)
+                follow_time += time.perf_counter() - started
+                started = time.perf_counter()
+                unfollow()
+                unfollow_time += time.perf_counter() - started
+
+            total = len(usernames) * args.rounds
+            print(
+                f'{name:<14}{total / follow_time:>12.0f}'
+                f'{total / unfollow_time:>12.0f}'
+            )
+    finally:
+        user.delete()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,304 @@
+'''
+Нагрузочный прогон всех представлений posts.
+
+Пример:
+    python benchmarks/run.py --size 10k
+    python benchmarks/run.py --size 1m --requests 500
+    python benchmarks/run.py --size 10k --update-baseline
+
+База для каждого размера заполняется один раз и переиспользуется
+(--reseed заполняет заново). Кэш очищается перед каждым
+запросом, кроме сценариев scenarios.CACHED, чтобы регрессия
+представления не пряталась за кэшем. Для каждого сценария печатаются
+p50/p95/p99 задержки, среднее и максимальное число SQL-запросов,
+в конце - пик потребления памяти. Результат сравнивается
+с baseline.json, при регрессии скрипт завершается с кодом 1.
+'''
+
+import argparse
+import json
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+WARMUP = 5
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--size', default='10k', choices=('10k', '1m'))
+    parser.add_argument(
+        '--requests', type=int, default=200,
+        help='Запросов на сценарий (после прогрева).',
+    )
+    parser.add_argument(
+        '--db', help='Файл базы, по умолчанию во временном каталоге.',
+    )
+    parser.add_argument(
+        '--reseed', action='store_true', help='Заполнить базу заново.',
+    )
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument(
+        '--update-baseline', action='store_true',
+        help='Записать результат как новый baseline для размера.',
+    )
+    parser.add_argument(
+        '--tolerance', type=float, default=0.5,
+        help='Допустимый рост p95 и памяти относительно baseline.',
+    )
+    parser.add_argument('--output', help='Сохранить результат в JSON.')
+    parser.add_argument('--seed-only', action='store_true',
+                        help=argparse.SUPPRESS)
+    parser.add_argument('--migrate-only', action='store_true',
+                        help=argparse.SUPPRESS)
+
+    return parser.parse_args()
+
+
+def setup_django(db):
+    sys.path[:0] = [ROOT, os.path.join(ROOT, 'yatube')]
+    os.environ['BENCH_DB'] = db
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'benchmarks.settings'
+
+    import django
+    django.setup()
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def is_seeded(size):
+    from django.db import DatabaseError
+    from benchmarks.seed import SIZES
+    from posts.models import Post
+
+    try:
+        return Post.objects.count() >= SIZES[size]
+    except DatabaseError:
+        return False
+
+
+def has_pending_migrations():
+    from django.db import connection
+    from django.db.migrations.executor import MigrationExecutor
+
+    executor = MigrationExecutor(connection)
+
+    return bool(
+        executor.migration_plan(executor.loader.graph.leaf_nodes())
+    )
+
+
+def seed(db, size):
+    '''Заполняет базу заново, вызывается в отдельном процессе'''
+
+    from django.core.management import call_command
+    from benchmarks.seed import SIZES, Seeder
+
+    if os.path.exists(db):
+        os.remove(db)
+    call_command('migrate', verbosity=0)
+    started = time.monotonic()
+    Seeder(SIZES[size]).run()
+    print(f'База заполнена за {time.monotonic() - started:.0f} с')
+
+
+def prepare_db(db, size, reseed):
+    '''
+    Заполняет базу в дочернем процессе, чтобы память заполнения
+    не попала в пик памяти прогона.
+    '''
+
+    from django.db import connection
+
+    if not reseed and is_seeded(size):
+        # Заполненная база догоняет новые миграции без перезаполнения.
+        if not has_pending_migrations():
+            return
+        step = '--migrate-only'
+    else:
+        step = '--seed-only'
+
+    connection.close()
+    subprocess.run(
+        [sys.executable, __file__, step, '--size', size, '--db', db],
+        check=True,
+    )
+
+
+def make_clients(dataset):
+    from django.test import Client
+
+    reader = Client()
+    reader.force_login(dataset.reader)
+    author = Client()
+    author.force_login(dataset.author_post.author)
+
+    return {'guest': Client(), 'reader': reader, 'author': author}
+
+
+def measure(build, dataset, clients, rng, count, cached=False):
+    '''
+    Выполняет сценарий, возвращает задержки в мс и числа запросов.
+    Без cached каждый запрос идет с пустым кэшем.
+    '''
+
+    from django.core.cache import cache
+    from django.db import connection
+
+    queries = 0
+
+    def count_queries(execute, sql, params, many, context):
+        nonlocal queries
+        queries += 1
+        return execute(sql, params, many, context)
+
+    latencies, counts = [], []
+    for i in range(WARMUP + count):
+        request = build(dataset, rng)
+        client = clients[request.client]
+        if not cached:
+            cache.clear()
+        queries = 0
+        with connection.execute_wrapper(count_queries):
+            started = time.perf_counter()
+            response = getattr(client, request.method)(
+                request.url, request.data
+            )
+            if response.streaming:
+                # Потоковый ответ пишется при чтении, как у сервера.
+                b''.join(response.streaming_content)
+            elapsed = time.perf_counter() - started
+        if response.status_code >= 400:
+            raise RuntimeError(f'{request.url}: {response.status_code}')
+        if i >= WARMUP:
+            latencies.append(elapsed * 1000)
+            counts.append(queries)
+
+    return latencies, counts
+
+
+def summarize(latencies, counts):
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+
+    return {
+        'p50_ms': round(cuts[49], 2),
+        'p95_ms': round(cuts[94], 2),
+        'p99_ms': round(cuts[98], 2),
+        'queries_avg': round(statistics.mean(counts), 2),
+        'queries': max(counts),
+    }
+
+
+def run(args):
+    from benchmarks.scenarios import (
+        CACHED, SCENARIOS, Dataset, check_coverage,
+    )
+
+    missing = check_coverage()
+    if missing:
+        sys.exit(f'Нет сценариев для URL: {", ".join(missing)}')
+
+    dataset = Dataset()
+    clients = make_clients(dataset)
+    rng = random.Random(1)
+
+    print(f'{"сценарий":<18}{"p50":>9}{"p95":>9}{"p99":>9}'
+          f'{"SQL ср.":>9}{"SQL макс.":>11}')
+    views = {}
+    for name, _, build in SCENARIOS:
+        latencies, counts = measure(
+            build, dataset, clients, rng, args.requests, name in CACHED
+        )
+        views[name] = summary = summarize(latencies, counts)
+        print(f'{name:<18}{summary["p50_ms"]:>9}{summary["p95_ms"]:>9}'
+              f'{summary["p99_ms"]:>9}{summary["queries_avg"]:>9}'
+              f'{summary["queries"]:>11}')
+
+    result = {'peak_rss_mb': round(peak_rss_mb(), 1), 'views': views}
+    print(f'Пик памяти: {result["peak_rss_mb"]} МБ')
+
+    return result
+
+
+def regressions(result, baseline, tolerance):
+    '''Сравнивает результат с baseline одного размера'''
+
+    found = []
+    for name, base in baseline.get('views', {}).items():
+        current = result['views'].get(name)
+        if current is None:
+            continue
+        # Абсолютный запас в 1 мс гасит шум на быстрых сценариях.
+        limit = base['p95_ms'] * (1 + tolerance) + 1
+        if current['p95_ms'] > limit:
+            found.append(
+                f'{name}: p95 {current["p95_ms"]} мс > {limit:.2f} мс'
+            )
+        if current['queries'] > base['queries']:
+            found.append(
+                f'{name}: SQL {current["queries"]} > {base["queries"]}'
+            )
+
+    rss_limit = baseline.get('peak_rss_mb', 0) * (1 + tolerance)
+    if rss_limit and result['peak_rss_mb'] > rss_limit:
+        found.append(
+            f'память {result["peak_rss_mb"]} МБ > {rss_limit:.1f} МБ'
+        )
+
+    return found
+
+
+def main():
+    args = parse_args()
+    db = args.db or os.path.join(
+        tempfile.gettempdir(), f'yatube-bench-{args.size}.sqlite3'
+    )
+    setup_django(db)
+    if args.seed_only:
+        seed(db, args.size)
+        return
+    if args.migrate_only:
+        from django.core.management import call_command
+        call_command('migrate', verbosity=0)
+        return
+    prepare_db(db, args.size, args.reseed)
+
+    result = run(args)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(result, file, ensure_ascii=False, indent=2)
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as file:
+            baselines = json.load(file)
+
+    if args.update_baseline:
+        baselines[args.size] = result
+        with open(args.baseline, 'w', encoding='utf-8') as file:
+            json.dump(baselines, file, ensure_ascii=False, indent=2)
+            file.write('\n')
+        print(f'Baseline для {args.size} обновлен.')
+        return
+
+    if args.size not in baselines:
+        print(f'Baseline для {args.size} нет, сравнение пропущено.')
+        return
+
+    found = regressions(result, baselines[args.size], args.tolerance)
+    if found:
+        sys.exit('Регрессии:\n' + '\n'.join(found))
+    print('Регрессий нет.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+'''
+Сценарии запросов ко всем URL из posts.urls.
+
+Каждый сценарий по данным базы и генератору случайных чисел
+выбирает клиента (гость, читатель с подписками, автор поста),
+метод, адрес и тело запроса. check_coverage не дает забыть
+сценарий для нового URL.
+
+Перед каждым запросом прогон очищает кэш, поэтому замеряется само
+представление: страницы, фрагменты и число постов строятся заново.
+Сценарии из CACHED, наоборот, меряют ответ из кэша страниц.
+'''
+
+from collections import namedtuple
+
+from django.db.models import Max
+from django.urls import reverse
+
+from posts.atom import follow_token
+from posts.models import Group, Post, User, UserStats
+from posts.urls import urlpatterns
+from posts.utils import encode_cursor
+
+Request = namedtuple('Request', 'client method url data')
+
+
+class Dataset:
+    '''
+    Объекты базы, из которых сценарии собирают адреса.
+
+    Atributes:
+        usernames, slugs - имена пользователей и группы;
+        max_post - наибольший id поста;
+        reader - пользователь с самым большим числом подписок;
+        feed_token - токен ленты Atom подписок читателя;
+        author_post - пост, который открывает на правку его автор.
+    '''
+
+    def __init__(self):
+        self.usernames = list(User.objects.values_list('username', flat=True))
+        self.slugs = list(Group.objects.values_list('slug', flat=True))
+        self.max_post = Post.objects.aggregate(top=Max('pk'))['top']
+        self.reader = (
+            UserStats.objects.select_related('user')
+            .order_by('-following_count').first().user
+        )
+        self.feed_token = follow_token(self.reader)
+        self.author_post = Post.objects.select_related('author').latest('pk')
+        self.words = (
+            Post.objects.order_by('pk').values_list('text', flat=True)
+            .first().split()
+        )
+
+    def post_id(self, rng):
+        return rng.randint(1, self.max_post)
+
+    def cursor(self, rng):
+        '''Токен ?after= случайного поста, как у ссылки на следующую'''
+
+        post = Post.objects.only('pub_date').get(pk=self.post_id(rng))
+
+        return encode_cursor(post.pub_date, post.pk)
+
+
+def url(name, namespace='posts', **kwargs):
+    return reverse(f'{namespace}:{name}', kwargs=kwargs)
+
+
+SCENARIOS = (
+    ('index', 'index', lambda d, rng: Request(
+        'guest', 'get', url('index'), None,
+    )),
+    ('index ?after=', 'index', lambda d, rng: Request(
+        'guest', 'get', url('index'), {'after': d.cursor(rng)},
+    )),
+    ('index (кэш)', 'index', lambda d, rng: Request(
+        'guest', 'get', url('index'), None,
+    )),
+    ('index ?page=', 'index', lambda d, rng: Request(
+        'guest', 'get', url('index'), {'page': rng.randint(1, 100)},
+    )),
+    ('group', 'group', lambda d, rng: Request(
+        'guest', 'get', url('group', slug=rng.choice(d.slugs)), None,
+    )),
+    ('group ?after=', 'group', lambda d, rng: Request(
+        'guest', 'get', url('group', slug=rng.choice(d.slugs)),
+        {'after': d.cursor(rng)},
+    )),
+    ('profile', 'profile', lambda d, rng: Request(
+        'guest', 'get', url('profile', username=rng.choice(d.usernames)),
+        None,
+    )),
+    ('post_detail', 'post_detail', lambda d, rng: Request(
+        'guest', 'get', url('post_detail', post_id=d.post_id(rng)), None,
+    )),
+    ('post_create', 'post_create', lambda d, rng: Request(
+        'reader', 'get', url('post_create'), None,
+    )),
+    ('post_edit', 'post_edit', lambda d, rng: Request(
+        'author', 'get', url('post_edit', post_id=d.author_post.pk), None,
+    )),
+    ('follow_index', 'follow_index', lambda d, rng: Request(
+        'reader', 'get', url('follow_index'), None,
+    )),
+    ('comments', 'comments', lambda d, rng: Request(
+        'guest', 'get', url('comments', post_id=d.post_id(rng)), None,
+    )),
+    ('group_feed', 'group_feed', lambda d, rng: Request(
+        'guest', 'get', url('group_feed', slug=rng.choice(d.slugs)), None,
+    )),
+    ('author_feed', 'author_feed', lambda d, rng: Request(
+        'guest', 'get',
+        url('author_feed', username=rng.choice(d.usernames)), None,
+    )),
+    ('follow_feed', 'follow_feed', lambda d, rng: Request(
+        'guest', 'get', url('follow_feed', token=d.feed_token), None,
+    )),
+    ('search', 'search', lambda d, rng: Request(
+        'guest', 'get', url('search'), {'q': rng.choice(d.words)},
+    )),
+    ('add_comment', 'add_comment', lambda d, rng: Request(
+        'reader', 'post', url('add_comment', post_id=d.post_id(rng)),
+        {'text': 'Комментарий из бенчмарка'},
+    )),
+    ('profile_follow', 'profile_follow', lambda d, rng: Request(
+        'reader', 'get',
+        url('profile_follow', username=rng.choice(d.usernames)), None,
+    )),
+    ('profile_unfollow', 'profile_unfollow', lambda d, rng: Request(
+        'reader', 'get',
+        url('profile_unfollow', username=rng.choice(d.usernames)), None,
+    )),
+    # API для сравнения с HTML-страницами тех же данных.
+    ('api posts', 'api:posts', lambda d, rng: Request(
+        'guest', 'get', url('posts', 'api'), {'limit': 10},
+    )),
+    ('api posts include', 'api:posts', lambda d, rng: Request(
+        'guest', 'get', url('posts', 'api'),
+        {'limit': 10, 'include': 'author,group'},
+    )),
+    ('api post', 'api:post', lambda d, rng: Request(
+        'guest', 'get', url('post', 'api', post_id=d.post_id(rng)), None,
+    )),
+)
+
+
+# Сценарии, которые меряют ответ из кэша страниц после прогрева.
+CACHED = {'index (кэш)'}
+
+
+def check_coverage():
+    '''Возвращает имена URL из posts.urls без сценария'''
+
+    covered = {url_name for _, url_name, _ in SCENARIOS}
+
+    return sorted(
+        pattern.name for pattern in urlpatterns
+        if pattern.name not in covered
+    )
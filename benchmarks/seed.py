@@ -0,0 +1,201 @@
+'''
+Быстрое заполнение базы синтетическими данными для бенчмарков.
+
+Посты, комментарии и подписки пишутся executemany в обход ORM:
+миллион постов через bulk_create заполнялся бы минутами.
+Граф подписок степенной: у авторов с малыми номерами подписчиков
+на порядки больше, чем у остальных, как у знаменитостей.
+Производные данные (счетчики, ленты, поисковый индекс) строятся
+после вставки одним проходом.
+'''
+
+import random
+from datetime import timedelta
+from itertools import accumulate
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from posts import search, stats
+from posts.models import (
+    Comment, FeedEntry, Follow, Group, Post, User, UserStats,
+)
+
+SIZES = {
+    '10k': 10_000,
+    '1m': 1_000_000,
+}
+
+CHUNK = 50_000
+GROUPS = 20
+SYLLABLES = (
+    'ка', 'ро', 'ли', 'на', 'то', 'ве', 'ми', 'по', 'ст', 'ра',
+    'де', 'лу', 'жи', 'бо', 'се', 'ны', 'ть', 'го', 'за', 'че',
+)
+
+
+def zipf_weights(count, exponent=1.0):
+    '''Накопленные веса закона Ципфа для random.choices'''
+
+    return list(accumulate(1 / (rank + 1) ** exponent
+                           for rank in range(count)))
+
+
+def insert_rows(model, fields, rows):
+    '''INSERT пачкой через executemany, имена колонок берутся из модели'''
+
+    columns = [model._meta.get_field(field).column for field in fields]
+    sql = (
+        f'INSERT INTO {model._meta.db_table} ({", ".join(columns)}) '
+        f'VALUES ({", ".join(["%s"] * len(columns))})'
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+class Seeder:
+    '''
+    Заполняет пустую базу данными одного размера.
+
+    Atributes:
+        posts - число постов, от него считаются остальные размеры;
+        users - число пользователей;
+        rng - генератор случайных чисел с фиксированным зерном.
+    '''
+
+    def __init__(self, posts, seed=1):
+        self.posts = posts
+        self.users = max(200, posts // 50)
+        self.rng = random.Random(seed)
+        self.words = [
+            ''.join(self.rng.choices(SYLLABLES, k=self.rng.randint(2, 4)))
+            for _ in range(5000)
+        ]
+        self.word_weights = zipf_weights(len(self.words))
+        self.author_weights = zipf_weights(self.users)
+
+    def date(self, value):
+        return connection.ops.adapt_datetimefield_value(value)
+
+    def text(self, low, high):
+        return ' '.join(self.rng.choices(
+            self.words,
+            cum_weights=self.word_weights,
+            k=self.rng.randint(low, high),
+        ))
+
+    def seed_users(self):
+        User.objects.bulk_create(
+            [
+                User(username=f'user{i}', password='!')
+                for i in range(self.users)
+            ],
+            batch_size=500,
+        )
+        Group.objects.bulk_create([
+            Group(title=f'Группа {i}', slug=f'group-{i}', description='')
+            for i in range(GROUPS)
+        ])
+        self.user_ids = list(User.objects.values_list('pk', flat=True))
+        self.group_ids = list(Group.objects.values_list('pk', flat=True))
+
+    def seed_posts(self):
+        start = timezone.now() - timedelta(days=730)
+        step = timedelta(days=730) / self.posts
+        for first in range(0, self.posts, CHUNK):
+            rows = []
+            for i in range(first, min(first + CHUNK, self.posts)):
+                pub_date = self.date(start + step * i)
+                group = self.rng.choice(self.group_ids)
+                rows.append((
+                    i + 1,
+                    self.text(8, 30),
+                    pub_date,
+                    pub_date,
+                    self.rng.choice(self.user_ids),
+                    group if self.rng.random() < 0.5 else None,
+                    '',
+                    None,
+                    None,
+                    '',
+                ))
+            insert_rows(
+                Post,
+                ('id', 'text', 'pub_date', 'updated', 'author', 'group',
+                 'image', 'image_width', 'image_height', 'image_hash'),
+                rows,
+            )
+
+    def seed_comments(self):
+        now = self.date(timezone.now())
+        for first in range(0, self.posts // 5, CHUNK):
+            insert_rows(
+                Comment,
+                ('post', 'author', 'text', 'created'),
+                [
+                    (
+                        self.rng.randint(1, self.posts),
+                        self.rng.choice(self.user_ids),
+                        self.text(3, 12),
+                        now,
+                    )
+                    for _ in range(first, min(first + CHUNK, self.posts // 5))
+                ],
+            )
+
+    def seed_follows(self):
+        '''Подписки: число подписок по Парето, авторы по Ципфу'''
+
+        rows = []
+        for user_id in self.user_ids:
+            degree = min(int(self.rng.paretovariate(1.2) * 3), 500)
+            authors = set(self.rng.choices(
+                self.user_ids, cum_weights=self.author_weights, k=degree
+            ))
+            rows += [
+                (user_id, author_id)
+                for author_id in authors if author_id != user_id
+            ]
+        insert_rows(Follow, ('user', 'author'), rows)
+
+    def fill_feeds(self):
+        '''Материализует ленты: последние посты авторов без знаменитостей'''
+
+        entry, follow, post, user_stats = (
+            model._meta.db_table
+            for model in (FeedEntry, Follow, Post, UserStats)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT OR IGNORE INTO {entry} (user_id, post_id, pub_date) '
+                f'SELECT user_id, post_id, pub_date FROM ('
+                f'SELECT f.user_id, p.id AS post_id, p.pub_date, '
+                f'ROW_NUMBER() OVER ('
+                f'PARTITION BY f.user_id ORDER BY p.pub_date DESC'
+                f') AS position '
+                f'FROM {follow} f JOIN {post} p ON p.author_id = f.author_id '
+                f'WHERE f.author_id NOT IN ('
+                f'SELECT user_id FROM {user_stats} '
+                f'WHERE followers_count >= %s)'
+                f') WHERE position <= %s',
+                [
+                    settings.FEED_CELEBRITY_THRESHOLD,
+                    settings.FEED_MAX_LENGTH,
+                ],
+            )
+
+    def run(self, report=print):
+        steps = (
+            ('пользователи и группы', self.seed_users),
+            ('посты', self.seed_posts),
+            ('комментарии', self.seed_comments),
+            ('подписки', self.seed_follows),
+            ('счетчики', stats.recount),
+            ('ленты', self.fill_feeds),
+            ('поисковый индекс', search.rebuild),
+        )
+        for name, step in steps:
+            report(f'Заполнение: {name}')
+            with transaction.atomic():
+                step()
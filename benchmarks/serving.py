@@ -0,0 +1,203 @@
+'''
+Пропускная способность одного процесса: WSGI против yatube.asgi.
+
+Пример:
+    python benchmarks/serving.py --size 10k
+    python benchmarks/serving.py --size 10k --delay 20 --threads 16
+
+Медленный ввод-вывод изображает задержка --delay мс перед каждым
+SQL-запросом (сетевой диск, перегруженная база). Синхронный
+воркер WSGI обрабатывает запросы по одному, воркер ASGI держит
+--clients одновременных запросов и выполняет Django в пуле
+из --threads потоков. Запросы - чтение index, group, profile,
+post_detail и follow_index из сценариев run.py.
+'''
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.run import prepare_db, setup_django  # noqa: E402
+
+READ_PATHS = ('index', 'group', 'profile', 'post_detail', 'follow_index')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--size', default='10k', choices=('10k', '1m'))
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument(
+        '--delay', type=float, default=5,
+        help='Задержка перед каждым SQL-запросом, мс.',
+    )
+    parser.add_argument('--db')
+
+    return parser.parse_args()
+
+
+def slow_io(app, delay):
+    '''Приложение WSGI, в котором каждый SQL-запрос ждет delay секунд'''
+
+    from django.db import connection
+
+    def sleepy(execute, sql, params, many, context):
+        time.sleep(delay)
+        return execute(sql, params, many, context)
+
+    def wrapped(environ, start_response):
+        with connection.execute_wrapper(sleepy):
+            response = app(environ, start_response)
+            try:
+                return list(response)
+            finally:
+                response.close()
+
+    return wrapped
+
+
+def make_requests(count):
+    '''Адреса и cookie запросов чтения из сценариев run.py'''
+
+    from django.test import Client
+    from benchmarks.scenarios import SCENARIOS, Dataset
+
+    dataset = Dataset()
+    reader = Client()
+    reader.force_login(dataset.reader)
+    cookies = {
+        'guest': '',
+        'reader': f'sessionid={reader.cookies["sessionid"].value}',
+    }
+
+    builders = [
+        build for _, url_name, build in SCENARIOS if url_name in READ_PATHS
+    ]
+    rng = random.Random(1)
+    requests = []
+    for i in range(count):
+        request = builders[i % len(builders)](dataset, rng)
+        query = '&'.join(
+            f'{key}={value}' for key, value in (request.data or {}).items()
+        )
+        requests.append((request.url, query, cookies[request.client]))
+
+    return requests
+
+
+def scope(url, query, cookie):
+    headers = [(b'host', b'localhost')]
+    if cookie:
+        headers.append((b'cookie', cookie.encode()))
+
+    return {
+        'type': 'http',
+        'method': 'GET',
+        'path': url,
+        'query_string': query.encode(),
+        'headers': headers,
+        'server': ('localhost', 80),
+    }
+
+
+def run_wsgi(app, requests):
+    '''Синхронный воркер: запросы по одному'''
+
+    from core.asgi import build_environ
+
+    def start_response(status, headers, exc_info=None):
+        if not status.startswith(('200', '302')):
+            raise RuntimeError(status)
+
+    latencies = []
+    for request in requests:
+        started = time.perf_counter()
+        environ = build_environ(scope(*request), BytesIO())
+        b''.join(app(environ, start_response))
+        latencies.append(time.perf_counter() - started)
+
+    return latencies
+
+
+def run_asgi(app, requests, clients):
+    '''Воркер ASGI: clients запросов одновременно'''
+
+    async def receive():
+        return {'type': 'http.request', 'body': b''}
+
+    async def one(request):
+        async def send(message):
+            if message['type'] == 'http.response.start' and (
+                message['status'] not in (200, 302)
+            ):
+                raise RuntimeError(message['status'])
+
+        started = time.perf_counter()
+        await app(scope(*request), receive, send)
+        return time.perf_counter() - started
+
+    async def client(queue, latencies):
+        while queue:
+            latencies.append(await one(queue.pop()))
+
+    async def main():
+        queue = list(reversed(requests))
+        latencies = []
+        await asyncio.gather(
+            *(client(queue, latencies) for _ in range(clients))
+        )
+        return latencies
+
+    return asyncio.run(main())
+
+
+def report(name, latencies, elapsed):
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+    print(
+        f'{name:<10}{len(latencies) / elapsed:>10.1f}'
+        f'{cuts[49] * 1000:>10.1f}{cuts[94] * 1000:>10.1f}'
+    )
+
+
+def main():
+    args = parse_args()
+    db = args.db or os.path.join(
+        tempfile.gettempdir(), f'yatube-bench-{args.size}.sqlite3'
+    )
+    setup_django(db)
+    prepare_db(db, args.size, reseed=False)
+
+    from django.core.cache import cache
+    from django.core.handlers.wsgi import WSGIHandler
+    from core.asgi import WsgiBridge
+
+    requests = make_requests(args.requests)
+    wsgi = slow_io(WSGIHandler(), args.delay / 1000)
+    modes = (
+        ('wsgi', lambda: run_wsgi(wsgi, requests)),
+        ('asgi', lambda: run_asgi(
+            WsgiBridge(wsgi, args.threads), requests, args.clients
+        )),
+    )
+
+    print(f'{"режим":<10}{"RPS":>10}{"p50 мс":>10}{"p95 мс":>10}')
+    for name, run in modes:
+        # Каждый режим начинает с пустого кэша страниц.
+        cache.clear()
+        started = time.perf_counter()
+        latencies = run()
+        report(name, latencies, time.perf_counter() - started)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+'''
+Настройки прогона бенчмарков.
+
+Берут настройки проекта и меняют только то, что мешает замерам:
+отдельная база из BENCH_DB, DEBUG выключен (Django не копит
+запросы в памяти), без debug_toolbar и с быстрым хешером паролей.
+'''
+
+import os
+
+from yatube.settings import *  # noqa: F401,F403
+from yatube.settings import DATABASES, MIDDLEWARE
+
+DEBUG = False
+
+DATABASES['default']['NAME'] = os.environ['BENCH_DB']
+
+MIDDLEWARE = [name for name in MIDDLEWARE if 'debug_toolbar' not in name]
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Бюджеты проверяет сам прогон, предупреждения только мешают выводу.
+VIEW_BUDGETS = {}
@@ -0,0 +1,22 @@
+from posts.utils import KeysetPaginator, encode_cursor
+
+
+class RowKeysetPaginator(KeysetPaginator):
+    '''
+    Курсорный постраничный вывод для values_list.
+    Строки - кортежи, поэтому ключ курсора берется по номерам
+    колонок, а не по атрибутам объекта.
+
+    Atributes:
+        key_index - номер колонки поля сортировки;
+        tiebreak_index - номер колонки уникального поля.
+    '''
+
+    def __init__(self, object_list, per_page, ordering, key_index,
+                 tiebreak_index):
+        super().__init__(object_list, per_page, ordering)
+        self.key_index = key_index
+        self.tiebreak_index = tiebreak_index
+
+    def _cursor(self, row):
+        return encode_cursor(row[self.key_index], row[self.tiebreak_index])
@@ -0,0 +1,197 @@
+'''
+Сериализация ресурсов API из кортежей values_list.
+
+Ресурс описывает поля ответа путями ORM, вложенные объекты
+(?include=) - полями связанных моделей. По запрошенным полям
+Plan собирает список колонок для одного values_list, в том числе
+через JOIN для вложенных объектов, и раскладывает каждую строку
+в словарь без создания экземпляров моделей.
+'''
+
+from django.core.files.storage import default_storage
+
+from posts.models import PostQuerySet
+
+
+class FieldError(ValueError):
+    '''Неизвестное поле или вложенный объект в параметрах запроса'''
+
+
+def media_url(name):
+    return default_storage.url(name) if name else None
+
+
+class Resource:
+    '''
+    Описание ресурса API.
+
+    Atributes:
+        fields - поле ответа -> путь ORM;
+        default - поля без ?fields=;
+        includes - вложенный объект -> (путь ORM к его id, поля);
+        annotations - поле -> метод QuerySet, который его добавляет;
+        converters - поле -> функция для значения из базы;
+        ordering - пара (поле, уникальное поле) для курсора.
+    '''
+
+    def __init__(self, fields, default, ordering, includes=None,
+                 annotations=None, converters=None):
+        self.fields = fields
+        self.default = default
+        self.ordering = ordering
+        self.includes = includes or {}
+        self.annotations = annotations or {}
+        self.converters = converters or {}
+
+
+USER_FIELDS = {
+    'username': 'username',
+    'first_name': 'first_name',
+    'last_name': 'last_name',
+    'posts_count': 'stats__posts_count',
+}
+
+GROUP_FIELDS = {
+    'slug': 'slug',
+    'title': 'title',
+    'description': 'description',
+}
+
+
+def related(prefix, fields):
+    return {name: f'{prefix}__{path}' for name, path in fields.items()}
+
+
+POSTS = Resource(
+    fields={
+        'id': 'id',
+        'text': 'text',
+        'pub_date': 'pub_date',
+        'updated': 'updated',
+        'image': 'image',
+        'author': 'author__username',
+        'group': 'group__slug',
+        'comments_count': 'comments_count',
+    },
+    default=('id', 'text', 'pub_date', 'author', 'group'),
+    ordering=('-pub_date', '-id'),
+    includes={
+        'author': ('author_id', related('author', USER_FIELDS)),
+        'group': ('group_id', related('group', GROUP_FIELDS)),
+    },
+    annotations={'comments_count': PostQuerySet.with_comments_count},
+    converters={'image': media_url},
+)
+
+GROUPS = Resource(
+    fields={'id': 'id', **GROUP_FIELDS},
+    default=('id', 'slug', 'title', 'description'),
+    ordering=('id', 'id'),
+)
+
+COMMENTS = Resource(
+    fields={
+        'id': 'id',
+        'post': 'post_id',
+        'author': 'author__username',
+        'text': 'text',
+        'created': 'created',
+    },
+    default=('id', 'post', 'author', 'text', 'created'),
+    ordering=('-created', '-id'),
+    includes={'author': ('author_id', related('author', USER_FIELDS))},
+)
+
+FOLLOWS = Resource(
+    fields={'id': 'id', 'author': 'author__username'},
+    default=('id', 'author'),
+    ordering=('-id', '-id'),
+    includes={'author': ('author_id', related('author', USER_FIELDS))},
+)
+
+
+def split_param(value):
+    return [name for name in (value or '').split(',') if name]
+
+
+class Plan:
+    '''
+    Колонки values_list для запрошенных полей и раскладка строк.
+
+    Atributes:
+        resource - описание ресурса;
+        paths - пути ORM колонок в порядке values_list;
+        annotations - методы QuerySet для вычисляемых полей;
+        flat - (поле, номер колонки, конвертер) верхнего уровня;
+        nested - (объект, номер колонки id, [(поле, номер колонки)]);
+        key_index, tiebreak_index - колонки ключа курсора.
+    '''
+
+    def __init__(self, resource, fields=None, includes=None):
+        self.resource = resource
+        fields = split_param(fields) or resource.default
+        includes = split_param(includes)
+
+        unknown = [
+            *(name for name in fields if name not in resource.fields),
+            *(name for name in includes if name not in resource.includes),
+        ]
+        if unknown:
+            raise FieldError(f'Неизвестные поля: {", ".join(unknown)}')
+
+        self.paths = []
+        self.annotations = [
+            resource.annotations[name] for name in fields
+            if name in resource.annotations
+        ]
+        self.flat = [
+            (name, self.column(resource.fields[name]),
+             resource.converters.get(name))
+            for name in fields
+        ]
+        self.nested = []
+        for name in includes:
+            id_path, nested_fields = resource.includes[name]
+            self.nested.append((
+                name,
+                self.column(id_path),
+                [
+                    (field, self.column(path))
+                    for field, path in nested_fields.items()
+                ],
+            ))
+
+        key, tiebreak = (name.lstrip('-') for name in resource.ordering)
+        self.key_index = self.column(key)
+        self.tiebreak_index = self.column(tiebreak)
+
+    def column(self, path):
+        '''Номер колонки пути ORM, добавляет колонку при первом запросе'''
+
+        if path not in self.paths:
+            self.paths.append(path)
+
+        return self.paths.index(path)
+
+    def rows(self, queryset):
+        '''Запрос, отдающий кортежи колонок плана'''
+
+        for annotate in self.annotations:
+            queryset = annotate(queryset)
+
+        return queryset.values_list(*self.paths)
+
+    def serialize(self, row):
+        item = {}
+        for name, index, convert in self.flat:
+            value = row[index]
+            item[name] = convert(value) if convert else value
+        for name, id_index, columns in self.nested:
+            item[name] = None if row[id_index] is None else {
+                field: row[index] for field, index in columns
+            }
+
+        return item
+
+    def serialize_all(self, rows):
+        return [self.serialize(row) for row in rows]
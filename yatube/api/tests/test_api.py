@@ -0,0 +1,296 @@
+import json
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+POSTS_COUNT = 5
+
+
+class ApiTestCase(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='auth', first_name='Лев', last_name='Толстой'
+        )
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        for i in range(POSTS_COUNT):
+            cls.post = Post.objects.create(
+                author=cls.user,
+                group=cls.group if i % 2 else None,
+                text=f'Тестовый пост {i}',
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.user)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def send(self, client, method, url, data=None):
+        return getattr(client, method)(
+            url, json.dumps(data or {}), content_type='application/json'
+        )
+
+
+class PostReadTests(ApiTestCase):
+
+    def test_list_default_fields(self):
+        '''Список постов от новых к старым с полями по умолчанию.'''
+
+        data = self.client.get(reverse('api:posts')).json()
+
+        self.assertEqual(len(data['results']), POSTS_COUNT)
+        self.assertEqual(data['results'][0], {
+            'id': self.post.pk,
+            'text': self.post.text,
+            'pub_date': data['results'][0]['pub_date'],
+            'author': 'auth',
+            'group': None,
+        })
+        self.assertEqual(data['results'][1]['group'], 'test-slug')
+        self.assertIsNone(data['next'])
+
+    def test_cursor_pagination(self):
+        '''Курсоры next/previous листают без пропусков.'''
+
+        url = reverse('api:posts')
+        first = self.client.get(url, {'limit': 2}).json()
+        second = self.client.get(
+            url, {'limit': 2, 'after': first['next']}
+        ).json()
+        back = self.client.get(
+            url, {'limit': 2, 'before': second['previous']}
+        ).json()
+
+        ids = [
+            post['id'] for post in first['results'] + second['results']
+        ]
+        self.assertEqual(ids, list(
+            Post.objects.values_list('pk', flat=True)[:4]
+        ))
+        self.assertEqual(back['results'], first['results'])
+
+    def test_sparse_fields(self):
+        '''?fields= отдает только перечисленные поля.'''
+
+        data = self.client.get(
+            reverse('api:posts'), {'fields': 'id,comments_count'}
+        ).json()
+
+        self.assertEqual(
+            data['results'][0], {'id': self.post.pk, 'comments_count': 0}
+        )
+
+    def test_include_in_one_query(self):
+        '''?include= разворачивает автора и группу одним запросом.'''
+
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(
+                reverse('api:posts'), {'include': 'author,group'}
+            ).json()
+
+        self.assertEqual(len(queries.captured_queries), 1)
+        self.assertEqual(data['results'][0]['author'], {
+            'username': 'auth',
+            'first_name': 'Лев',
+            'last_name': 'Толстой',
+            'posts_count': POSTS_COUNT,
+        })
+        self.assertIsNone(data['results'][0]['group'])
+        self.assertEqual(
+            data['results'][1]['group']['title'], self.group.title
+        )
+
+    def test_unknown_field(self):
+        '''Неизвестное поле - ошибка 400.'''
+
+        response = self.client.get(reverse('api:posts'), {'fields': 'secret'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', response.json()['error'])
+
+    def test_filters(self):
+        '''Фильтры по группе и автору.'''
+
+        url = reverse('api:posts')
+        in_group = self.client.get(url, {'group': 'test-slug'}).json()
+        by_reader = self.client.get(url, {'author': 'reader'}).json()
+
+        self.assertEqual(len(in_group['results']), POSTS_COUNT // 2)
+        self.assertEqual(by_reader['results'], [])
+
+    def test_detail_and_404(self):
+        '''Пост по id, для несуществующего - JSON 404.'''
+
+        found = self.client.get(
+            reverse('api:post', kwargs={'post_id': self.post.pk})
+        )
+        missing = self.client.get(
+            reverse('api:post', kwargs={'post_id': 10 ** 6})
+        )
+
+        self.assertEqual(found.json()['text'], self.post.text)
+        self.assertEqual(missing.status_code, 404)
+        self.assertIn('error', missing.json())
+
+    def test_method_not_allowed(self):
+        '''Неразрешенный метод - 405 с заголовком Allow.'''
+
+        response = self.client.put(reverse('api:groups'))
+
+        self.assertEqual(response.status_code, 405)
+        self.assertEqual(response['Allow'], 'GET')
+
+
+class PostWriteTests(ApiTestCase):
+
+    def test_create_requires_login(self):
+        '''Без входа создать пост нельзя.'''
+
+        response = self.send(
+            self.client, 'post', reverse('api:posts'), {'text': 'Новый'}
+        )
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_create_post(self):
+        '''POST создает пост в группе по slug.'''
+
+        response = self.send(
+            self.reader_client, 'post', reverse('api:posts'),
+            {'text': 'Новый пост', 'group': 'test-slug'},
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['group'], 'test-slug')
+        self.assertTrue(Post.objects.filter(
+            author=self.reader, text='Новый пост', group=self.group
+        ).exists())
+
+    def test_create_invalid(self):
+        '''Пустой текст и неизвестная группа - ошибка 400.'''
+
+        url = reverse('api:posts')
+        empty = self.send(self.reader_client, 'post', url, {'text': ''})
+        no_group = self.send(
+            self.reader_client, 'post', url, {'text': 'x', 'group': 'nope'}
+        )
+
+        self.assertEqual(empty.status_code, 400)
+        self.assertIn('text', empty.json()['errors'])
+        self.assertEqual(no_group.status_code, 400)
+
+    def test_edit_and_delete_by_author_only(self):
+        '''Править и удалять пост может только автор.'''
+
+        url = reverse('api:post', kwargs={'post_id': self.post.pk})
+
+        forbidden = self.send(self.reader_client, 'patch', url, {'text': 'x'})
+        edited = self.send(
+            self.author_client, 'patch', url, {'text': 'Исправлено'}
+        )
+        deleted = self.send(self.author_client, 'delete', url)
+
+        self.assertEqual(forbidden.status_code, 403)
+        self.assertEqual(edited.json()['text'], 'Исправлено')
+        self.assertEqual(deleted.status_code, 204)
+        self.assertFalse(Post.objects.filter(pk=self.post.pk).exists())
+
+
+class CommentGroupFollowTests(ApiTestCase):
+
+    def test_comments(self):
+        '''Комментарии поста: создание и список.'''
+
+        url = reverse('api:comments', kwargs={'post_id': self.post.pk})
+        created = self.send(
+            self.reader_client, 'post', url, {'text': 'Комментарий'}
+        )
+        data = self.client.get(url, {'include': 'author'}).json()
+
+        self.assertEqual(created.status_code, 201)
+        self.assertEqual(data['results'][0]['text'], 'Комментарий')
+        self.assertEqual(data['results'][0]['author']['username'], 'reader')
+        self.assertEqual(Comment.objects.filter(post=self.post).count(), 1)
+
+    def test_groups(self):
+        '''Список групп и группа по slug.'''
+
+        listing = self.client.get(reverse('api:groups')).json()
+        found = self.client.get(
+            reverse('api:group', kwargs={'slug': 'test-slug'})
+        ).json()
+
+        self.assertEqual(listing['results'][0]['slug'], 'test-slug')
+        self.assertEqual(found['description'], 'Тестовое описание')
+
+    def test_follow_cycle(self):
+        '''Подписка, повтор, подписка на себя, список и отписка.'''
+
+        url = reverse('api:follows')
+        created = self.send(
+            self.reader_client, 'post', url, {'author': 'auth'}
+        )
+        repeated = self.send(
+            self.reader_client, 'post', url, {'author': 'auth'}
+        )
+        itself = self.send(
+            self.reader_client, 'post', url, {'author': 'reader'}
+        )
+        listing = self.reader_client.get(url).json()
+
+        self.assertEqual(created.status_code, 201)
+        self.assertEqual(repeated.status_code, 200)
+        self.assertEqual(itself.status_code, 400)
+        self.assertEqual(listing['results'][0]['author'], 'auth')
+
+        deleted = self.send(
+            self.reader_client, 'delete',
+            reverse('api:follow', kwargs={'username': 'auth'}),
+        )
+        self.assertEqual(deleted.status_code, 204)
+        self.assertFalse(Follow.objects.filter(user=self.reader).exists())
+
+    def test_follow_many(self):
+        '''Подписка на список авторов: только новые и не на себя.'''
+
+        User.objects.create_user(username='other')
+        url = reverse('api:follows')
+        authors = {'authors': ['auth', 'other', 'reader', 'missing']}
+
+        created = self.send(self.reader_client, 'post', url, authors)
+        repeated = self.send(self.reader_client, 'post', url, authors)
+        invalid = self.send(
+            self.reader_client, 'post', url, {'authors': 'auth'}
+        )
+
+        self.assertEqual(created.status_code, 201)
+        self.assertCountEqual(created.json()['created'], ['auth', 'other'])
+        self.assertEqual(repeated.status_code, 200)
+        self.assertEqual(repeated.json()['created'], [])
+        self.assertEqual(invalid.status_code, 400)
+        self.assertEqual(Follow.objects.filter(user=self.reader).count(), 2)
+
+    def test_follows_require_login(self):
+        self.assertEqual(
+            self.client.get(reverse('api:follows')).status_code, 401
+        )
+
+    @override_settings(API_MAX_PAGE_SIZE=2)
+    def test_limit_capped(self):
+        data = self.client.get(reverse('api:posts'), {'limit': 50}).json()
+
+        self.assertEqual(len(data['results']), 2)
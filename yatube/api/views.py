@@ -0,0 +1,315 @@
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+
+from posts.forms import CommentForm, PostForm
+from posts.models import Comment, Follow, Group, Post, User
+from .pagination import RowKeysetPaginator
+from .serializers import COMMENTS, FOLLOWS, GROUPS, POSTS, FieldError, Plan
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+class ApiError(Exception):
+    '''Ошибка, которую клиент получает как JSON с кодом status'''
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def json_response(data, status=200):
+    return JsonResponse(
+        data,
+        status=status,
+        safe=False,
+        json_dumps_params={'ensure_ascii': False},
+    )
+
+
+def api_view(*methods):
+    '''
+    Представление API: проверяет метод и вход для записи,
+    ошибки отдает JSON вида {"error": ...}.
+    '''
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            try:
+                if request.method not in methods:
+                    raise ApiError(405, f'Метод {request.method} не разрешен')
+                if (
+                    request.method not in SAFE_METHODS
+                    and not request.user.is_authenticated
+                ):
+                    raise ApiError(401, 'Нужна авторизация')
+                return view(request, *args, **kwargs)
+            except ApiError as error:
+                response = json_response(
+                    {'error': error.message}, status=error.status
+                )
+            except FieldError as error:
+                response = json_response({'error': str(error)}, status=400)
+            except Http404:
+                response = json_response({'error': 'Не найдено'}, status=404)
+
+            if response.status_code == 405:
+                response['Allow'] = ', '.join(methods)
+
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def read_json(request):
+    '''Тело запроса как словарь'''
+
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        raise ApiError(400, 'Тело запроса не JSON')
+
+    if not isinstance(data, dict):
+        raise ApiError(400, 'Тело запроса должно быть объектом')
+
+    return data
+
+
+def page_size(request):
+    try:
+        size = int(request.GET.get('limit', settings.API_PAGE_SIZE))
+    except ValueError:
+        raise ApiError(400, 'limit должен быть числом')
+
+    return min(max(size, 1), settings.API_MAX_PAGE_SIZE)
+
+
+def plan_for(request, resource):
+    return Plan(
+        resource,
+        fields=request.GET.get('fields'),
+        includes=request.GET.get('include'),
+    )
+
+
+def paginated(request, resource, queryset):
+    '''
+    Страница ресурса по курсору ?after=/?before=.
+    Поля и вложенные объекты читаются одним запросом.
+    '''
+
+    plan = plan_for(request, resource)
+    paginator = RowKeysetPaginator(
+        plan.rows(queryset.order_by(*resource.ordering)),
+        page_size(request),
+        resource.ordering,
+        plan.key_index,
+        plan.tiebreak_index,
+    )
+    page = paginator.get_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+
+    return json_response({
+        'results': plan.serialize_all(page),
+        'next': paginator.next_cursor,
+        'previous': paginator.previous_cursor,
+    })
+
+
+def detail(request, resource, queryset, status=200):
+    '''Один объект ресурса или 404'''
+
+    plan = plan_for(request, resource)
+    row = plan.rows(queryset).first()
+    if row is None:
+        raise Http404
+
+    return json_response(plan.serialize(row), status=status)
+
+
+def group_id(data, default=None):
+    '''id группы по slug из поля group, null снимает группу'''
+
+    if 'group' not in data:
+        return default
+    if not data['group']:
+        return None
+
+    found = Group.objects.filter(slug=data['group']).values_list(
+        'pk', flat=True
+    ).first()
+    if found is None:
+        raise ApiError(400, f'Нет группы {data["group"]}')
+
+    return found
+
+
+def form_errors(form):
+    return json_response({'errors': form.errors}, status=400)
+
+
+@api_view('GET', 'POST')
+def posts(request):
+    '''
+    GET - посты от новых к старым, фильтры ?group=<slug>, ?author=<имя>.
+    POST - новый пост {"text": ..., "group": <slug>}.
+    '''
+
+    if request.method == 'POST':
+        data = read_json(request)
+        form = PostForm({'text': data.get('text'), 'group': group_id(data)})
+        if not form.is_valid():
+            return form_errors(form)
+        post = form.save(commit=False)
+        post.author = request.user
+        post.save()
+
+        return detail(request, POSTS, Post.objects.filter(pk=post.pk), 201)
+
+    queryset = Post.objects.all()
+    if request.GET.get('group'):
+        queryset = queryset.filter(group__slug=request.GET['group'])
+    if request.GET.get('author'):
+        queryset = queryset.filter(author__username=request.GET['author'])
+
+    return paginated(request, POSTS, queryset)
+
+
+@api_view('GET', 'PATCH', 'DELETE')
+def post(request, post_id):
+    '''Пост: чтение, правка и удаление автором'''
+
+    if request.method == 'GET':
+        return detail(request, POSTS, Post.objects.filter(pk=post_id))
+
+    instance = get_object_or_404(Post, pk=post_id)
+    if instance.author_id != request.user.pk:
+        raise ApiError(403, 'Менять пост может только автор')
+
+    if request.method == 'DELETE':
+        instance.delete()
+        return HttpResponse(status=204)
+
+    data = read_json(request)
+    form = PostForm(
+        {
+            'text': data.get('text', instance.text),
+            'group': group_id(data, instance.group_id),
+        },
+        instance=instance,
+    )
+    if not form.is_valid():
+        return form_errors(form)
+    form.save()
+
+    return detail(request, POSTS, Post.objects.filter(pk=post_id))
+
+
+@api_view('GET', 'POST')
+def comments(request, post_id):
+    '''Комментарии поста от новых к старым, POST - новый комментарий'''
+
+    if request.method == 'POST':
+        instance = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+        form = CommentForm({'text': read_json(request).get('text')})
+        if not form.is_valid():
+            return form_errors(form)
+        comment = form.save(commit=False)
+        comment.author = request.user
+        comment.post = instance
+        comment.save()
+
+        return detail(
+            request, COMMENTS, Comment.objects.filter(pk=comment.pk), 201
+        )
+
+    return paginated(
+        request, COMMENTS, Comment.objects.filter(post_id=post_id)
+    )
+
+
+@api_view('GET')
+def groups(request):
+    return paginated(request, GROUPS, Group.objects.all())
+
+
+@api_view('GET')
+def group(request, slug):
+    return detail(request, GROUPS, Group.objects.filter(slug=slug))
+
+
+@api_view('GET', 'POST')
+def follows(request):
+    '''
+    GET - подписки текущего пользователя.
+    POST - подписка {"author": <имя>}
+    или на несколько авторов сразу {"authors": [<имя>, ...]}.
+    '''
+
+    if not request.user.is_authenticated:
+        raise ApiError(401, 'Нужна авторизация')
+
+    if request.method == 'POST':
+        data = read_json(request)
+        if 'authors' in data:
+            return follow_many(request, data['authors'])
+
+        username = data.get('author')
+        if username == request.user.username:
+            raise ApiError(400, 'Нельзя подписаться на себя')
+        created = Follow.objects.follow(request.user, username)
+
+        return detail(
+            request, FOLLOWS,
+            Follow.objects.filter(
+                user=request.user, author__username=username
+            ),
+            201 if created else 200,
+        )
+
+    return paginated(
+        request, FOLLOWS, Follow.objects.filter(user=request.user)
+    )
+
+
+def follow_many(request, usernames):
+    '''Подписка на список авторов одним bulk_follow'''
+
+    if not isinstance(usernames, list) or not all(
+        isinstance(username, str) for username in usernames
+    ):
+        raise ApiError(400, 'authors должен быть списком имен')
+    if len(usernames) > settings.API_MAX_BULK_FOLLOWS:
+        raise ApiError(
+            400, f'Не больше {settings.API_MAX_BULK_FOLLOWS} авторов за раз'
+        )
+
+    authors = User.objects.filter(username__in=usernames).only(
+        'pk', 'username'
+    )
+    created = Follow.objects.bulk_follow(
+        Follow(user=request.user, author=author) for author in authors
+    )
+
+    return json_response(
+        {'created': [follow.author.username for follow in created]},
+        status=201 if created else 200,
+    )
+
+
+@api_view('DELETE')
+def follow(request, username):
+    '''Отписка от автора'''
+
+    Follow.objects.unfollow(request.user, username)
+
+    return HttpResponse(status=204)
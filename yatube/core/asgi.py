@@ -0,0 +1,207 @@
+'''
+Приложение ASGI поверх обработчика WSGI Django.
+
+Django 2.2 не умеет асинхронные представления, поэтому мост делит
+работу так: цикл событий принимает тело запроса и отдает ответ
+клиенту, а сам Django от начала до конца ответа выполняется в одном
+потоке ограниченного пула (ASGI_THREADS). Медленный клиент не держит
+поток, пока шлет тело, а пока поток ждет базу, цикл обслуживает
+остальные соединения.
+
+Части ответа передаются в цикл через очередь на QUEUE_SIZE частей:
+потоковый ответ (ленты Atom) не копится в памяти целиком, а поток
+ждет, пока клиент заберет уже отданное.
+'''
+
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+QUEUE_SIZE = 8
+
+SPECIAL_HEADERS = {
+    'content-length': 'CONTENT_LENGTH',
+    'content-type': 'CONTENT_TYPE',
+}
+
+
+def build_environ(scope, body):
+    '''Окружение WSGI для запроса HTTP из scope ASGI'''
+
+    script_name = scope.get('root_path', '')
+    path = scope['path']
+    if script_name and path.startswith(script_name):
+        path = path[len(script_name):]
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': script_name.encode().decode('latin-1'),
+        'PATH_INFO': path.encode().decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'REMOTE_ADDR': client[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+
+    for raw_name, raw_value in scope.get('headers', []):
+        name = raw_name.decode('latin-1').lower()
+        key = SPECIAL_HEADERS.get(
+            name, 'HTTP_' + name.upper().replace('-', '_')
+        )
+        value = raw_value.decode('latin-1')
+        if key in environ:
+            separator = '; ' if key == 'HTTP_COOKIE' else ','
+            value = environ[key] + separator + value
+        environ[key] = value
+
+    # Тело уже прочитано целиком, его длина известна и без заголовка,
+    # например при Transfer-Encoding: chunked.
+    environ['CONTENT_LENGTH'] = str(body.seek(0, 2))
+    body.seek(0)
+
+    return environ
+
+
+async def read_body(receive):
+    '''
+    Тело запроса как файл; большое тело уходит на диск.
+    None, если клиент отключился раньше.
+    '''
+
+    body = tempfile.SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+    )
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            body.close()
+            return None
+        body.write(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    body.seek(0)
+
+    return body
+
+
+class WsgiBridge:
+    '''
+    Приложение ASGI 3, выполняющее приложение WSGI в пуле потоков.
+
+    Atributes:
+        wsgi - приложение WSGI;
+        executor - пул потоков, в которых работает Django.
+    '''
+
+    def __init__(self, wsgi, threads=None):
+        self.wsgi = wsgi
+        self.executor = ThreadPoolExecutor(
+            max_workers=threads or settings.ASGI_THREADS,
+            thread_name_prefix='asgi',
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            raise ValueError(f'Протокол {scope["type"]} не поддерживается')
+
+        body = await read_body(receive)
+        if body is None:
+            return
+
+        with body:
+            await self.respond(build_environ(scope, body), send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def respond(self, environ, send):
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        done = loop.run_in_executor(
+            self.executor, self.run, environ, loop, queue
+        )
+
+        kind = None
+        started = False
+        try:
+            while True:
+                kind, value = await queue.get()
+                if kind == 'end':
+                    break
+                if kind == 'start':
+                    started = True
+                    await send({
+                        'type': 'http.response.start',
+                        'status': value[0],
+                        'headers': value[1],
+                    })
+                else:
+                    await send({
+                        'type': 'http.response.body',
+                        'body': value,
+                        'more_body': True,
+                    })
+            # Без начала ответа Django упал: ошибку поднимет await done,
+            # и сервер ASGI ответит 500 сам.
+            if started:
+                await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            # Клиент мог отключиться: поток все равно дочитывается,
+            # иначе он навсегда повиснет на полной очереди.
+            while kind != 'end':
+                kind, _ = await queue.get()
+            await done
+
+    def run(self, environ, loop, queue):
+        '''
+        Выполняет запрос в потоке пула, от вызова Django
+        до закрытия ответа, и передает части ответа в очередь.
+        '''
+
+        def put(item):
+            asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+        def start_response(status, headers, exc_info=None):
+            put(('start', (
+                int(status.split(' ', 1)[0]),
+                [
+                    (name.lower().encode('latin-1'), value.encode('latin-1'))
+                    for name, value in headers
+                ],
+            )))
+
+        try:
+            result = self.wsgi(environ, start_response)
+            try:
+                for chunk in result:
+                    if chunk:
+                        put(('body', chunk))
+            finally:
+                # close() шлет request_finished и закрывает соединения
+                # с базой в этом же потоке.
+                if hasattr(result, 'close'):
+                    result.close()
+        finally:
+            put(('end', None))
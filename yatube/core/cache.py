@@ -0,0 +1,217 @@
+'''
+Версионированный кэш страниц.
+
+У каждого ресурса (лента, группа, автор, пост) есть номер поколения
+в общем кэше. Номера входят в ключ страницы, поэтому сигнал моделей,
+увеличивший поколение, сразу делает старые копии недоступными
+во всех процессах, не дожидаясь истечения TTL.
+Те же поколения и время их смены служат валидаторами ETag
+и Last-Modified для условных GET-запросов.
+
+Страница, прочитанная с реплики, которая снята раньше последней
+смены поколений страницы, может не содержать этих изменений.
+Такая страница отдается без кэша и без валидаторов: иначе она
+осталась бы в кэше под новым поколением и после того, как
+реплика догонит основную базу.
+'''
+
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.core.cache import cache
+from django.views.decorators.cache import cache_page
+from django.views.decorators.http import condition
+
+from . import metrics, replicas
+
+GENERATION_PREFIX = 'generation'
+MODIFIED_PREFIX = 'modified'
+
+
+def generation_key(resource):
+    return f'{GENERATION_PREFIX}:{resource}'
+
+
+def modified_key(resource):
+    return f'{MODIFIED_PREFIX}:{resource}'
+
+
+def new_generation():
+    '''
+    Начальный номер поколения.
+    Берется из часов, чтобы вытесненный из кэша номер не начался
+    заново с уже использованного значения.
+    '''
+
+    return time.time_ns() // 1000
+
+
+def get_generations(*resources):
+    '''Возвращает номера поколений ресурсов, заводя недостающие'''
+
+    keys = [generation_key(resource) for resource in resources]
+    found = cache.get_many(keys)
+
+    for key in keys:
+        if key not in found:
+            generation = new_generation()
+            cache.add(key, generation, timeout=None)
+            found[key] = cache.get(key, generation)
+
+    return [found[key] for key in keys]
+
+
+def get_modified(*resources):
+    '''
+    Возвращает время последней смены поколения ресурсов (Unix time).
+    Для ресурса без отметки время считается текущим: клиент
+    в худшем случае получит страницу целиком.
+    '''
+
+    keys = [modified_key(resource) for resource in resources]
+    found = cache.get_many(keys)
+
+    for key in keys:
+        if key not in found:
+            now = time.time()
+            cache.add(key, now, timeout=None)
+            found[key] = cache.get(key, now)
+
+    return [found[key] for key in keys]
+
+
+def bump(*resources):
+    '''Увеличивает поколения ресурсов, сбрасывая их кэш'''
+
+    now = time.time()
+    for resource in set(resources):
+        key = generation_key(resource)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, new_generation(), timeout=None)
+        else:
+            cache.touch(key, timeout=None)
+    cache.set_many(
+        {modified_key(resource): now for resource in resources},
+        timeout=None,
+    )
+
+
+def replica_is_behind(resources):
+    '''Реплика запроса еще не видит последней смены поколений'''
+
+    if replicas.current_replica() is None:
+        return False
+
+    return replicas.is_behind(max(get_modified(*resources)))
+
+
+def versioned_prefix(name, *resources):
+    '''
+    Префикс ключа из имени и текущих поколений ресурсов.
+    None, если страницу кэшировать нельзя (replica_is_behind).
+    '''
+
+    if replica_is_behind(resources):
+        return None
+
+    generations = get_generations(*resources)
+
+    return ':'.join([name, *map(str, generations)])
+
+
+def cache_page_versioned(timeout, name, *resources):
+    '''
+    Кэширует страницу как cache_page, но с поколениями в ключе.
+    Ресурсы - шаблоны строк, заполняемые аргументами представления,
+    например 'group:{slug}'.
+    '''
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            prefix = versioned_prefix(
+                name,
+                *(resource.format(**kwargs) for resource in resources),
+            )
+            if prefix is None:
+                metrics.count_cache('page', misses=1)
+                return view(request, *args, **kwargs)
+
+            cached_view = cache_page(timeout, key_prefix=prefix)(view)
+            response = cached_view(request, *args, **kwargs)
+
+            if request.method in ('GET', 'HEAD'):
+                hit = not request._cache_update_cache
+                metrics.count_cache('page', hits=int(hit), misses=int(not hit))
+
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def resolve_resources(resources, kwargs):
+    '''
+    Подставляет аргументы представления в шаблоны ресурсов.
+    Функция среди ресурсов получает аргументы и возвращает список
+    ресурсов или None, если страницы нет.
+    '''
+
+    found = []
+    for resource in resources:
+        if callable(resource):
+            extra = resource(**kwargs)
+            if extra is None:
+                return None
+            found += extra
+        else:
+            found.append(resource.format(**kwargs))
+
+    return found
+
+
+def conditional_versioned(name, *resources):
+    '''
+    Отвечает 304 на условный GET, пока поколения ресурсов страницы
+    не менялись, не вызывая представление. ETag собирается
+    из поколений, пользователя и адреса с параметрами,
+    Last-Modified - из времени последней смены поколений.
+    Ресурсы задаются как в cache_page_versioned или функцией.
+    '''
+
+    def validators(request, kwargs):
+        if not hasattr(request, '_page_validators'):
+            found = resolve_resources(resources, kwargs)
+            request._page_validators = None
+            if found is not None and not replica_is_behind(found):
+                generations = get_generations(*found)
+                modified = max(get_modified(*found))
+                raw = ':'.join([
+                    name,
+                    *map(str, generations),
+                    str(request.user.pk),
+                    request.get_full_path(),
+                ])
+                request._page_validators = (
+                    hashlib.md5(raw.encode()).hexdigest(),
+                    datetime.fromtimestamp(modified, timezone.utc),
+                )
+
+        return request._page_validators
+
+    def etag(request, *args, **kwargs):
+        found = validators(request, kwargs)
+
+        return found and found[0]
+
+    def last_modified(request, *args, **kwargs):
+        found = validators(request, kwargs)
+
+        return found and found[1]
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
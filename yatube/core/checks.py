@@ -0,0 +1,33 @@
+'''
+Системные проверки окружения.
+
+Подписки (posts.models.FollowQuerySet) пишутся запросами
+INSERT/DELETE ... RETURNING, которые SQLite умеет с версии 3.35.
+На более старой библиотеке manage.py сразу сообщает об ошибке,
+а не падает на первой подписке.
+'''
+
+from django.conf import settings
+from django.core import checks
+from django.db.backends.sqlite3.base import Database
+
+SQLITE_ENGINE = 'django.db.backends.sqlite3'
+SQLITE_MIN_VERSION = (3, 35)
+
+
+@checks.register(checks.Tags.compatibility)
+def check_sqlite_version(app_configs, **kwargs):
+    '''Библиотека SQLite умеет RETURNING'''
+
+    uses_sqlite = any(
+        database['ENGINE'] == SQLITE_ENGINE
+        for database in settings.DATABASES.values()
+    )
+    if not uses_sqlite or Database.sqlite_version_info >= SQLITE_MIN_VERSION:
+        return []
+
+    return [checks.Error(
+        f'SQLite {Database.sqlite_version} не поддерживает RETURNING.',
+        hint='Нужна SQLite {}.{} или новее.'.format(*SQLITE_MIN_VERSION),
+        id='core.E001',
+    )]
@@ -0,0 +1,54 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.replicas import copy_database
+
+SQLITE = 'django.db.backends.sqlite3'
+
+
+class Command(BaseCommand):
+    help = 'Копирует базу default в файлы реплик SQLite.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Работать постоянно, копируя базу через --interval.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Пауза между копиями, секунд.',
+        )
+
+    def handle(self, *args, **options):
+        databases = [
+            settings.DATABASES[alias]
+            for alias in ('default', *settings.DATABASE_REPLICAS)
+        ]
+        if any(database['ENGINE'] != SQLITE for database in databases):
+            raise CommandError(
+                'Копирование файлов работает только для SQLite, '
+                'для других СУБД нужна их собственная репликация.'
+            )
+        if not settings.DATABASE_REPLICAS:
+            self.stdout.write('Реплики не настроены (DB_REPLICAS).')
+            return
+
+        source = databases[0]['NAME']
+        targets = [database['NAME'] for database in databases[1:]]
+        while True:
+            started = time.monotonic()
+            for target in targets:
+                copy_database(source, target)
+            self.stdout.write(
+                f'Реплик обновлено: {len(targets)} '
+                f'за {time.monotonic() - started:.2f} с'
+            )
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
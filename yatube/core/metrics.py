@@ -0,0 +1,241 @@
+'''
+Метрики запросов в памяти процесса.
+
+MetricsMiddleware считает для каждого запроса число и время
+SQL-запросов, время рендеринга шаблонов и попадания в кэш,
+складывает их в гистограммы по view_name и сравнивает
+с бюджетами из settings.VIEW_BUDGETS. Представление metrics
+отдает накопленное в текстовом формате Prometheus.
+'''
+
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import ExitStack
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+from django.template.base import Template
+
+logger = logging.getLogger(__name__)
+
+SECONDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+COUNTS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+# Метрика запроса -> (имя в Prometheus, границы бакетов, описание).
+HISTOGRAMS = {
+    'seconds': (
+        'yatube_request_duration_seconds', SECONDS, 'Время ответа.'
+    ),
+    'sql_count': (
+        'yatube_sql_queries', COUNTS, 'Число SQL-запросов за ответ.'
+    ),
+    'sql_seconds': (
+        'yatube_sql_duration_seconds', SECONDS, 'Время SQL за ответ.'
+    ),
+    'template_seconds': (
+        'yatube_template_render_seconds', SECONDS,
+        'Время рендеринга шаблонов за ответ.',
+    ),
+}
+CACHE_COUNTER = 'yatube_cache_requests_total'
+
+UNRESOLVED = '<unresolved>'
+
+_local = threading.local()
+
+
+class Histogram:
+    '''Гистограмма с фиксированными бакетами, как в Prometheus'''
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        '''Пары (граница, число значений не больше нее)'''
+
+        total = 0
+        for bound, count in zip((*self.buckets, '+Inf'), self.counts):
+            total += count
+            yield bound, total
+
+
+class Registry:
+    '''Гистограммы и счетчики кэша по view_name'''
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {}
+            self.cache = defaultdict(int)
+
+    def observe(self, view, sample, cache):
+        with self.lock:
+            for metric, (_, buckets, _) in HISTOGRAMS.items():
+                key = metric, view
+                if key not in self.histograms:
+                    self.histograms[key] = Histogram(buckets)
+                self.histograms[key].observe(sample[metric])
+            for (kind, result), count in cache.items():
+                self.cache[view, kind, result] += count
+
+    def render(self):
+        '''Текстовый формат Prometheus 0.0.4'''
+
+        lines = []
+        with self.lock:
+            for metric, (name, _, help_text) in HISTOGRAMS.items():
+                lines += [
+                    f'# HELP {name} {help_text}',
+                    f'# TYPE {name} histogram',
+                ]
+                for (key, view), histogram in sorted(self.histograms.items()):
+                    if key != metric:
+                        continue
+                    for bound, total in histogram.cumulative():
+                        lines.append(
+                            f'{name}_bucket{{view="{view}",le="{bound}"}} '
+                            f'{total}'
+                        )
+                    lines += [
+                        f'{name}_sum{{view="{view}"}} {histogram.sum}',
+                        f'{name}_count{{view="{view}"}} {histogram.count}',
+                    ]
+
+            lines += [
+                f'# HELP {CACHE_COUNTER} Обращения к кэшу страниц '
+                f'и фрагментов.',
+                f'# TYPE {CACHE_COUNTER} counter',
+            ]
+            for (view, kind, result), count in sorted(self.cache.items()):
+                lines.append(
+                    f'{CACHE_COUNTER}{{view="{view}",cache="{kind}",'
+                    f'result="{result}"}} {count}'
+                )
+
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+class RequestMetrics:
+    '''Счетчики одного запроса'''
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_seconds = 0
+        self.template_seconds = 0
+        self.rendering = False
+        self.cache = defaultdict(int)
+
+    def sql_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_count += 1
+            self.sql_seconds += time.perf_counter() - started
+
+
+def current():
+    '''Счетчики запроса, который обрабатывает этот поток'''
+
+    return getattr(_local, 'metrics', None)
+
+
+def count_cache(kind, hits=0, misses=0):
+    '''Отмечает попадания и промахи кэша kind в текущем запросе'''
+
+    metrics = current()
+    if metrics is not None:
+        metrics.cache[kind, 'hit'] += hits
+        metrics.cache[kind, 'miss'] += misses
+
+
+def timed_render(render):
+    '''Засекает только внешний рендеринг, вложенные include не в счет'''
+
+    @wraps(render)
+    def wrapper(self, context):
+        metrics = current()
+        if metrics is None or metrics.rendering:
+            return render(self, context)
+
+        metrics.rendering = True
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            metrics.rendering = False
+            metrics.template_seconds += time.perf_counter() - started
+
+    wrapper.timed = True
+
+    return wrapper
+
+
+def instrument_templates():
+    if not getattr(Template.render, 'timed', False):
+        Template.render = timed_render(Template.render)
+
+
+def check_budget(view, sample):
+    '''Пишет предупреждение для метрик сверх бюджета представления'''
+
+    budget = settings.VIEW_BUDGETS.get(view, {})
+    for metric, limit in budget.items():
+        if sample[metric] > limit:
+            logger.warning(
+                'Бюджет %s превышен: %s = %s, лимит %s',
+                view, metric, sample[metric], limit,
+            )
+
+
+class MetricsMiddleware:
+    '''Собирает метрики запроса, ставится первой в MIDDLEWARE'''
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        instrument_templates()
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        _local.metrics = metrics
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(metrics.sql_wrapper)
+                    )
+                response = self.get_response(request)
+        finally:
+            _local.metrics = None
+
+        match = request.resolver_match
+        view = match.view_name if match is not None else UNRESOLVED
+        sample = {
+            'seconds': time.perf_counter() - started,
+            'sql_count': metrics.sql_count,
+            'sql_seconds': metrics.sql_seconds,
+            'template_seconds': metrics.template_seconds,
+        }
+        registry.observe(view, sample, metrics.cache)
+        check_budget(view, sample)
+
+        return response
@@ -0,0 +1,152 @@
+'''
+Чтение с реплик базы.
+
+ReplicaMiddleware выбирает для GET- и HEAD-запроса одну реплику
+из settings.DATABASE_REPLICAS, ReplicaRouter направляет на нее
+чтения, а все записи - на default. После первой записи запрос
+до конца читает с default, а ответ ставит cookie, которая
+на settings.REPLICA_PIN_SECONDS оставляет чтения пользователя
+на default: он сразу видит свои изменения, даже если реплика
+отстает. Вне запросов (команды, очереди) все идет на default.
+
+Реплики SQLite - копии файла базы, их обновляет команда
+sync_replicas функцией copy_database. Время изменения файла
+реплики - момент снимка: по нему кэш страниц узнает, что реплика
+еще не видит последних изменений страницы (is_behind).
+'''
+
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'read_primary'
+
+# Поколения кэша меняются в сигналах, иногда еще до коммита
+# транзакции, поэтому снимок считается на столько секунд старше.
+SNAPSHOT_MARGIN = 1
+
+_local = threading.local()
+
+
+def current_replica():
+    '''Реплика для чтений текущего запроса или None'''
+
+    return getattr(_local, 'replica', None)
+
+
+def synced_at(alias):
+    '''Время снимка, с которого снята реплика alias (Unix time)'''
+
+    try:
+        return os.path.getmtime(settings.DATABASES[alias]['NAME'])
+    except OSError:
+        return 0.0
+
+
+def is_behind(modified):
+    '''
+    Запрос читает с реплики, снятой раньше modified: страница
+    с нее может быть устаревшей, и кэшировать ее нельзя.
+    '''
+
+    replica = current_replica()
+    if replica is None:
+        return False
+
+    return synced_at(replica) - SNAPSHOT_MARGIN < modified
+
+
+class ReplicaRouter:
+    '''Чтения на реплику запроса, записи и миграции на default'''
+
+    def db_for_read(self, model, **hints):
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+
+        return current_replica()
+
+    def db_for_write(self, model, **hints):
+        _local.replica = None
+        _local.wrote = True
+
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+
+        return None
+
+
+class ReplicaMiddleware:
+    '''Назначает запросу реплику и закрепляет писавших за default'''
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _local.wrote = False
+        _local.replica = None
+        if (
+            settings.DATABASE_REPLICAS
+            and request.method in ('GET', 'HEAD')
+            and PIN_COOKIE not in request.COOKIES
+        ):
+            _local.replica = random.choice(settings.DATABASE_REPLICAS)
+
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = _local.wrote
+            _local.wrote = False
+            _local.replica = None
+
+        if wrote and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+
+        return response
+
+
+def copy_database(source, target):
+    '''
+    Копирует базу SQLite source в target.
+    Копия собирается во временном файле через backup API
+    и атомарно подменяет target: читатели видят либо старую,
+    либо новую копию целиком. Копия переводится в режим журнала
+    DELETE, чтобы у подмененного файла не оставалось -wal и -shm.
+    Время изменения копии - начало снимка (synced_at).
+    '''
+
+    temporary = f'{target}.tmp'
+    if os.path.exists(temporary):
+        os.remove(temporary)
+
+    started = time.time()
+    primary = sqlite3.connect(source)
+    replica = sqlite3.connect(temporary)
+    try:
+        primary.backup(replica)
+        replica.execute('PRAGMA journal_mode=DELETE')
+    finally:
+        replica.close()
+        primary.close()
+
+    os.utime(temporary, (started, started))
+    os.replace(temporary, target)
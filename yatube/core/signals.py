@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+# PRAGMA, которые меняют сам файл базы. На репликах не применяются:
+# их файлы подменяет sync_replicas, и у них не должно быть -wal.
+FILE_PRAGMAS = {'journal_mode'}
+
+
+def sqlite_pragmas(alias):
+    '''Профиль PRAGMA для соединения с базой alias'''
+
+    pragmas = settings.SQLITE_PRAGMAS
+    if alias in settings.DATABASE_REPLICAS:
+        pragmas = {
+            name: value for name, value in pragmas.items()
+            if name not in FILE_PRAGMAS
+        }
+
+    return pragmas
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    '''
+    Настраивает новое соединение SQLite профилем settings.SQLITE_PRAGMAS.
+    PRAGMA выполняются на сыром соединении, мимо execute_wrapper,
+    чтобы не попадать в счетчики запросов страницы.
+    '''
+
+    if connection.vendor != 'sqlite':
+        return
+
+    for name, value in sqlite_pragmas(connection.alias).items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
@@ -0,0 +1,96 @@
+'''
+Файловое хранилище с адресацией по содержимому.
+
+Файл называется sha256 своего содержимого и лежит в двух уровнях
+каталогов по первым символам хэша: posts/ab/cd/abcd...ef.jpg.
+Повторная загрузка того же содержимого не пишет новый файл, а отдает
+имя уже сохраненного. Содержимое по имени никогда не меняется,
+поэтому такие адреса можно кэшировать навсегда.
+
+Удалять общий файл можно, только когда на него не осталось ссылок:
+это решает приложение, а хранилище отмечает каждое сохранение
+временем изменения файла (file_age).
+'''
+
+import hashlib
+import os
+import posixpath
+import re
+import time
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+CONTENT_NAME = re.compile(
+    r'(^|/)[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.\w+)?$'
+)
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def is_content_addressed(name):
+    return CONTENT_NAME.search(name) is not None
+
+
+def content_hash(content):
+    '''sha256 содержимого, файл читается частями'''
+
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+
+    return digest.hexdigest()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    '''FileSystemStorage, в котором имя файла - хэш его содержимого'''
+
+    def content_name(self, name, content):
+        '''Имя по содержимому в каталоге исходного имени'''
+
+        digest = content_hash(content)
+        extension = os.path.splitext(name)[1].lower()
+
+        return posixpath.join(
+            posixpath.dirname(name),
+            digest[:2],
+            digest[2:4],
+            f'{digest}{extension}',
+        )
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+
+        name = self.content_name(name, content)
+        if self.exists(name):
+            # Свежее время изменения не дает удалить файл,
+            # на который вот-вот сошлется новая запись.
+            os.utime(self.path(name))
+            return name
+
+        # Запись во временный файл и переименование: параллельная
+        # загрузка того же содержимого не увидит файл наполовину.
+        temporary = self._save(f'{name}.upload', content)
+        os.replace(self.path(temporary), self.path(name))
+
+        return name
+
+    def file_age(self, name):
+        '''
+        Сколько секунд файл не сохранялся или None, если его нет.
+        Имя вне хранилища - не его файл, для него тоже None.
+        '''
+
+        try:
+            modified = os.path.getmtime(self.path(name))
+        except (OSError, SuspiciousFileOperation):
+            return None
+
+        return time.time() - modified
@@ -0,0 +1,135 @@
+import asyncio
+import threading
+import time
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import SimpleTestCase, override_settings
+from django.urls import path
+from django.views.decorators.csrf import csrf_exempt
+
+from ..asgi import QUEUE_SIZE, WsgiBridge
+
+SLOW = 0.2
+THREADS = 4
+
+
+@csrf_exempt
+def echo(request):
+    return HttpResponse(
+        f'{request.method} {request.path} {request.GET.get("q")} '
+        f'{request.COOKIES.get("a")}{request.COOKIES.get("b")} '
+        f'{request.body.decode()}'
+    )
+
+
+def stream(request):
+    return StreamingHttpResponse(
+        f'{i};' for i in range(QUEUE_SIZE * 4)
+    )
+
+
+def slow(request):
+    time.sleep(SLOW)
+
+    return HttpResponse(threading.current_thread().name)
+
+
+urlpatterns = [
+    path('echo/', echo),
+    path('stream/', stream),
+    path('slow/', slow),
+]
+
+
+def scope(path, method='GET', query=b'', headers=()):
+    return {
+        'type': 'http',
+        'method': method,
+        'path': path,
+        'query_string': query,
+        'headers': [(b'host', b'testserver'), *headers],
+    }
+
+
+async def call(app, scope, chunks=(b'',)):
+    '''Выполняет запрос, тело шлет частями chunks'''
+
+    incoming = [
+        {'type': 'http.request', 'body': chunk,
+         'more_body': i < len(chunks) - 1}
+        for i, chunk in enumerate(chunks)
+    ]
+    sent = []
+
+    async def receive():
+        return incoming.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+
+    return sent
+
+
+def body(sent):
+    return b''.join(message.get('body', b'') for message in sent[1:])
+
+
+@override_settings(ROOT_URLCONF=__name__, ALLOWED_HOSTS=['testserver'])
+class WsgiBridgeTests(SimpleTestCase):
+
+    def setUp(self):
+        self.app = WsgiBridge(WSGIHandler(), threads=THREADS)
+        self.addCleanup(self.app.executor.shutdown)
+
+    def run_requests(self, *requests):
+        async def gather():
+            return await asyncio.gather(
+                *(call(self.app, *request) for request in requests)
+            )
+
+        return asyncio.run(gather())
+
+    def test_request_reaches_django(self):
+        '''Метод, путь, параметры, cookie и тело частями доходят до Django.'''
+
+        [sent] = self.run_requests((
+            scope(
+                '/echo/', 'POST', b'q=1',
+                [(b'cookie', b'a=1'), (b'cookie', b'b=2')],
+            ),
+            (b'he', b'llo'),
+        ))
+
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn(
+            (b'content-type', b'text/html; charset=utf-8'), sent[0]['headers']
+        )
+        self.assertEqual(body(sent), b'POST /echo/ 1 12 hello')
+        self.assertFalse(sent[-1].get('more_body', False))
+
+    def test_streaming_response_sent_in_parts(self):
+        [sent] = self.run_requests((scope('/stream/'),))
+
+        self.assertEqual(len(sent), QUEUE_SIZE * 4 + 2)
+        self.assertTrue(body(sent).startswith(b'0;1;2;'))
+
+    def test_not_found(self):
+        [sent] = self.run_requests((scope('/missing/'),))
+
+        self.assertEqual(sent[0]['status'], 404)
+
+    def test_slow_requests_run_in_parallel_threads(self):
+        '''Медленные запросы идут параллельно, но не больше THREADS.'''
+
+        started = time.perf_counter()
+        results = self.run_requests(*[(scope('/slow/'),)] * THREADS * 2)
+        elapsed = time.perf_counter() - started
+
+        threads = {body(sent) for sent in results}
+        self.assertEqual(len(threads), THREADS)
+        self.assertTrue(all(name.startswith(b'asgi') for name in threads))
+        self.assertLess(elapsed, SLOW * 3)
+        self.assertGreaterEqual(elapsed, SLOW * 2)
@@ -0,0 +1,66 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..metrics import registry
+
+
+class MetricsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+
+    def test_metrics_collected_per_view(self):
+        '''Метрики копятся по view_name и отдаются в формате Prometheus.'''
+
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+
+        response = self.client.get(reverse('metrics'))
+        text = response.content.decode()
+
+        self.assertEqual(response['Content-Type'].split(';')[0], 'text/plain')
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="posts:index"} 2',
+            text,
+        )
+        self.assertIn('yatube_sql_queries_bucket{view="posts:index"', text)
+        self.assertIn(
+            'yatube_cache_requests_total{view="posts:index",cache="page",'
+            'result="hit"} 1',
+            text,
+        )
+        self.assertIn(
+            'yatube_cache_requests_total{view="posts:index",cache="page",'
+            'result="miss"} 1',
+            text,
+        )
+
+    def test_template_time_recorded(self):
+        '''Время рендеринга шаблонов попадает в гистограмму.'''
+
+        self.client.get(reverse('about:author'))
+
+        histogram = registry.histograms['template_seconds', 'about:author']
+        self.assertEqual(histogram.count, 1)
+        self.assertGreater(histogram.sum, 0)
+
+    @override_settings(VIEW_BUDGETS={'posts:index': {'sql_count': 0}})
+    def test_budget_warning(self):
+        '''Превышение бюджета пишет предупреждение.'''
+
+        with self.assertLogs('core.metrics', 'WARNING') as logs:
+            self.client.get(reverse('posts:index'))
+
+        self.assertIn('posts:index', logs.output[0])
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_token(self):
+        '''С токеном метрики отдаются только по заголовку Authorization.'''
+
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        response = self.client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret'
+        )
+        self.assertEqual(response.status_code, 200)
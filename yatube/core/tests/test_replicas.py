@@ -0,0 +1,185 @@
+import os
+import sqlite3
+import tempfile
+import time
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from posts.models import Post
+from ..cache import bump, cache_page_versioned, conditional_versioned
+from ..replicas import (
+    PIN_COOKIE, ReplicaMiddleware, ReplicaRouter, copy_database,
+)
+
+router = ReplicaRouter()
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(SimpleTestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def handle(self, request, write=False):
+        '''Прогоняет запрос, запоминая базы чтения до и после записи'''
+
+        reads = []
+
+        def view(request):
+            reads.append(router.db_for_read(Post))
+            if write:
+                router.db_for_write(Post)
+                reads.append(router.db_for_read(Post))
+            return HttpResponse()
+
+        response = ReplicaMiddleware(view)(request)
+
+        return reads, response
+
+    def test_get_reads_from_replica(self):
+        '''GET читает с реплики и не закрепляется за default.'''
+
+        reads, response = self.handle(self.factory.get('/'))
+
+        self.assertEqual(reads, ['replica'])
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_write_pins_to_primary(self):
+        '''После записи чтения идут на default, ответ ставит cookie.'''
+
+        reads, response = self.handle(self.factory.get('/'), write=True)
+
+        self.assertEqual(reads, ['replica', None])
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+    def test_pinned_user_reads_primary(self):
+        '''С cookie после недавней записи чтения идут на default.'''
+
+        request = self.factory.get('/')
+        request.COOKIES[PIN_COOKIE] = '1'
+
+        self.assertEqual(self.handle(request)[0], [None])
+
+    def test_post_reads_primary(self):
+        '''Небезопасные методы не читают с реплик.'''
+
+        self.assertEqual(self.handle(self.factory.post('/'))[0], [None])
+
+    def test_outside_request_reads_primary(self):
+        '''Вне запроса (команды, очереди) чтения идут на default.'''
+
+        self.assertIsNone(router.db_for_read(Post))
+        self.assertFalse(router.allow_migrate('replica', 'posts'))
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaPageCacheTests(SimpleTestCase):
+    '''Страницы с отстающей реплики не кэшируются под новым поколением'''
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.rendered = 0
+
+        def view(request):
+            self.rendered += 1
+            return HttpResponse(f'версия {self.rendered}')
+
+        self.cached = ReplicaMiddleware(
+            cache_page_versioned(60, 'test_page', 'test')(view)
+        )
+        self.conditional = ReplicaMiddleware(
+            conditional_versioned('test_page', 'test')(view)
+        )
+
+    def get(self):
+        request = self.factory.get('/')
+        request.user = AnonymousUser()
+        return request
+
+    def synced(self, seconds_after_bump):
+        bump('test')
+        return mock.patch(
+            'core.replicas.synced_at',
+            return_value=time.time() + seconds_after_bump,
+        )
+
+    def test_lagging_replica_page_not_cached(self):
+        '''
+        Пока реплика отстает, страница строится заново на каждый
+        запрос; догнавшая реплика дает свежую страницу в кэш.
+        '''
+
+        with self.synced(-60):
+            self.cached(self.get())
+            self.cached(self.get())
+        self.assertEqual(self.rendered, 2)
+
+        with mock.patch(
+            'core.replicas.synced_at', return_value=time.time() + 60
+        ):
+            fresh = self.cached(self.get())
+            cached = self.cached(self.get())
+        self.assertEqual(self.rendered, 3)
+        self.assertEqual(cached.content, fresh.content)
+
+    def test_lagging_replica_page_without_validators(self):
+        with self.synced(-60):
+            response = self.conditional(self.get())
+        self.assertFalse(response.has_header('ETag'))
+        self.assertFalse(response.has_header('Last-Modified'))
+
+        with self.synced(60):
+            response = self.conditional(self.get())
+        self.assertTrue(response.has_header('ETag'))
+
+
+class CopyDatabaseTests(SimpleTestCase):
+
+    def test_copy_replaces_replica(self):
+        '''Копия повторяет базу и подменяет старый файл реплики.'''
+
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, 'primary.sqlite3')
+            target = os.path.join(directory, 'replica.sqlite3')
+            primary = sqlite3.connect(source)
+            primary.execute('PRAGMA journal_mode=WAL')
+            primary.execute('CREATE TABLE post (text TEXT)')
+            primary.execute("INSERT INTO post VALUES ('первый')")
+            primary.commit()
+
+            copy_database(source, target)
+            primary.execute("INSERT INTO post VALUES ('второй')")
+            primary.commit()
+            started = time.time()
+            copy_database(source, target)
+            finished = time.time()
+            primary.close()
+
+            replica = sqlite3.connect(target)
+            rows = replica.execute('SELECT text FROM post').fetchall()
+            mode = replica.execute('PRAGMA journal_mode').fetchone()
+            replica.close()
+
+            # Время изменения копии - начало снимка.
+            self.assertGreaterEqual(os.path.getmtime(target), started - 1)
+            self.assertLessEqual(os.path.getmtime(target), finished)
+            self.assertEqual(rows, [('первый',), ('второй',)])
+            self.assertEqual(mode, ('delete',))
+            self.assertEqual(os.listdir(directory).count(
+                'replica.sqlite3.tmp'
+            ), 0)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_sync_without_replicas(self):
+        '''Без реплик команда ничего не копирует.'''
+
+        with tempfile.TemporaryFile('w+') as output:
+            call_command('sync_replicas', stdout=output)
+            output.seek(0)
+            self.assertIn('DB_REPLICAS', output.read())
@@ -0,0 +1,205 @@
+import os
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.db import OperationalError
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase, override_settings
+
+from ..checks import check_sqlite_version
+from ..signals import sqlite_pragmas
+
+WRITERS = 4
+READERS = 4
+WRITES = 50
+
+
+def open_database(path, alias='stress'):
+    '''Соединение Django с файлом path, с сигналом connection_created'''
+
+    wrapper = DatabaseWrapper(
+        {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': path,
+            'OPTIONS': {'timeout': 0.1},
+            'CONN_MAX_AGE': None,
+            'AUTOCOMMIT': True,
+            'ATOMIC_REQUESTS': False,
+            'TIME_ZONE': None,
+            'USER': '', 'PASSWORD': '', 'HOST': '', 'PORT': '',
+        },
+        alias=alias,
+    )
+    wrapper.ensure_connection()
+
+    return wrapper
+
+
+class Load:
+    '''
+    Писатели вставляют WRITES строк каждый, читатели считают строки,
+    пока писатели не закончат.
+
+    Atributes:
+        errors - ошибки OperationalError из всех потоков;
+        longest_read - самое долгое чтение, секунд.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.errors = []
+        self.longest_read = 0
+        self.done = threading.Event()
+
+    def write(self, number):
+        database = open_database(self.path, f'writer{number}')
+        try:
+            for i in range(WRITES):
+                with database.cursor() as cursor:
+                    cursor.execute(
+                        'INSERT INTO comment (text) VALUES (%s)',
+                        [f'{number}-{i}'],
+                    )
+        except OperationalError as error:
+            self.errors.append(error)
+        finally:
+            database.close()
+
+    def read(self, number):
+        database = open_database(self.path, f'reader{number}')
+        try:
+            while not self.done.is_set():
+                started = time.perf_counter()
+                with database.cursor() as cursor:
+                    cursor.execute('SELECT COUNT(*) FROM comment')
+                    cursor.fetchone()
+                self.longest_read = max(
+                    self.longest_read, time.perf_counter() - started
+                )
+        except OperationalError as error:
+            self.errors.append(error)
+        finally:
+            database.close()
+
+    def run(self):
+        writers = [
+            threading.Thread(target=self.write, args=(i,))
+            for i in range(WRITERS)
+        ]
+        readers = [
+            threading.Thread(target=self.read, args=(i,))
+            for i in range(READERS)
+        ]
+        for thread in readers + writers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        self.done.set()
+        for thread in readers:
+            thread.join()
+
+
+class SqlitePragmaTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'stress.sqlite3')
+        setup = open_database(self.path)
+        setup.connection.execute(
+            'CREATE TABLE comment (id INTEGER PRIMARY KEY, text TEXT)'
+        )
+        setup.close()
+
+    def test_profile_applied_to_new_connections(self):
+        '''Новое соединение получает WAL и busy_timeout из профиля.'''
+
+        database = open_database(self.path)
+        self.addCleanup(database.close)
+
+        pragma = database.connection.execute
+        self.assertEqual(pragma('PRAGMA journal_mode').fetchone(), ('wal',))
+        self.assertEqual(pragma('PRAGMA busy_timeout').fetchone(), (5000,))
+        self.assertEqual(pragma('PRAGMA synchronous').fetchone(), (1,))
+
+    @override_settings(DATABASE_REPLICAS=['replica'])
+    def test_replicas_keep_journal_mode(self):
+        '''Файл реплики не переводится в WAL.'''
+
+        self.assertNotIn('journal_mode', sqlite_pragmas('replica'))
+        self.assertIn('busy_timeout', sqlite_pragmas('replica'))
+
+    @override_settings(SQLITE_PRAGMAS={'journal_mode': 'DELETE'})
+    def test_open_reader_blocks_commit_without_profile(self):
+        '''Без профиля открытое чтение не дает записи закоммититься.'''
+
+        reader = open_database(self.path)
+        writer = open_database(self.path)
+        self.addCleanup(reader.close)
+        self.addCleanup(writer.close)
+
+        reader.connection.execute('BEGIN')
+        reader.connection.execute('SELECT COUNT(*) FROM comment').fetchone()
+
+        with self.assertRaisesMessage(OperationalError, 'locked'):
+            with writer.cursor() as cursor:
+                cursor.execute("INSERT INTO comment (text) VALUES ('x')")
+
+    def test_open_reader_does_not_block_commit(self):
+        '''С WAL запись коммитится при открытой читающей транзакции.'''
+
+        reader = open_database(self.path)
+        writer = open_database(self.path)
+        self.addCleanup(reader.close)
+        self.addCleanup(writer.close)
+
+        reader.connection.execute('BEGIN')
+        before = reader.connection.execute(
+            'SELECT COUNT(*) FROM comment'
+        ).fetchone()
+
+        with writer.cursor() as cursor:
+            cursor.execute("INSERT INTO comment (text) VALUES ('x')")
+
+        # Читатель видит снимок на начало своей транзакции.
+        self.assertEqual(
+            reader.connection.execute(
+                'SELECT COUNT(*) FROM comment'
+            ).fetchone(),
+            before,
+        )
+
+    def test_concurrent_readers_and_writers(self):
+        '''
+        Нагрузка: писатели и читатели на постоянных соединениях
+        работают одновременно без "database is locked".
+        '''
+
+        load = Load(self.path)
+        load.run()
+
+        check = open_database(self.path)
+        count = check.connection.execute(
+            'SELECT COUNT(*) FROM comment'
+        ).fetchone()[0]
+        check.close()
+
+        self.assertEqual(load.errors, [])
+        self.assertEqual(count, WRITERS * WRITES)
+        self.assertLess(load.longest_read, 1)
+
+
+class SqliteVersionCheckTests(SimpleTestCase):
+
+    def test_old_sqlite_reported(self):
+        '''SQLite без RETURNING - ошибка проверки core.E001.'''
+
+        self.assertEqual(check_sqlite_version(None), [])
+        with mock.patch(
+            'core.checks.Database.sqlite_version_info', (3, 34, 1)
+        ):
+            errors = check_sqlite_version(None)
+
+        self.assertEqual([error.id for error in errors], ['core.E001'])
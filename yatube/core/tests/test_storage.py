@@ -0,0 +1,74 @@
+import hashlib
+import os
+import tempfile
+import time
+
+from django.core.files.base import ContentFile
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from ..storage import ContentAddressedStorage, is_content_addressed
+from ..views import media
+
+CONTENT = b'picture'
+DIGEST = hashlib.sha256(CONTENT).hexdigest()
+
+
+class ContentAddressedStorageTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = directory.name
+        self.storage = ContentAddressedStorage(location=self.root)
+
+    def test_name_is_sharded_hash(self):
+        '''Имя - sha256 содержимого в каталогах по первым символам.'''
+
+        name = self.storage.save('posts/photo.JPG', ContentFile(CONTENT))
+
+        self.assertEqual(
+            name, f'posts/{DIGEST[:2]}/{DIGEST[2:4]}/{DIGEST}.jpg'
+        )
+        self.assertTrue(is_content_addressed(name))
+        with self.storage.open(name) as file:
+            self.assertEqual(file.read(), CONTENT)
+
+    def test_same_content_stored_once(self):
+        '''Повторная загрузка отдает то же имя без второго файла.'''
+
+        first = self.storage.save('posts/a.jpg', ContentFile(CONTENT))
+        second = self.storage.save('posts/b.jpg', ContentFile(CONTENT))
+        other = self.storage.save('posts/c.jpg', ContentFile(b'other'))
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        files = [
+            name for _, _, names in os.walk(self.root) for name in names
+        ]
+        self.assertEqual(len(files), 2)
+
+    def test_saving_again_refreshes_stale_file(self):
+        name = self.storage.save('posts/a.jpg', ContentFile(CONTENT))
+        past = time.time() - 3600
+        os.utime(self.storage.path(name), (past, past))
+        self.assertGreater(self.storage.file_age(name), 60)
+
+        self.storage.save('posts/b.jpg', ContentFile(CONTENT))
+
+        self.assertLess(self.storage.file_age(name), 60)
+        self.assertIsNone(self.storage.file_age('posts/missing.jpg'))
+        self.assertIsNone(self.storage.file_age('../outside.jpg'))
+
+    def test_media_view_marks_content_addressed_immutable(self):
+        '''Файлы с именем по содержимому отдаются с кэшем навсегда.'''
+
+        name = self.storage.save('posts/a.jpg', ContentFile(CONTENT))
+        legacy = self.storage._save('posts/legacy.jpg', ContentFile(CONTENT))
+        request = RequestFactory().get('/')
+
+        with override_settings(MEDIA_ROOT=self.root):
+            immutable = media(request, name)
+            legacy = media(request, legacy)
+
+        self.assertIn('immutable', immutable['Cache-Control'])
+        self.assertFalse(legacy.has_header('Cache-Control'))
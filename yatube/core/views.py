@@ -1,4 +1,10 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
 from django.shortcuts import render
+from django.views.static import serve
+
+from .metrics import registry
+from .storage import IMMUTABLE, is_content_addressed
 
 
 def page_not_found(request, exception):
@@ -7,3 +13,32 @@ def page_not_found(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+def metrics(request):
+    '''
+    Отдает метрики процесса в формате Prometheus.
+    Если задан METRICS_TOKEN, нужен заголовок Authorization: Bearer.
+    '''
+
+    token = settings.METRICS_TOKEN
+    if token and request.META.get('HTTP_AUTHORIZATION') != f'Bearer {token}':
+        return HttpResponseForbidden()
+
+    return HttpResponse(
+        registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
+def media(request, path):
+    '''
+    Отдает загруженные файлы при DEBUG. Файлы с именем по содержимому
+    не меняются, браузер может не перепроверять их никогда.
+    '''
+
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    if is_content_addressed(path):
+        response['Cache-Control'] = IMMUTABLE
+
+    return response
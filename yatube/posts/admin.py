@@ -1,5 +1,6 @@
 from django.contrib import admin
 
+from . import search
 from .models import Post, Group, Comment, Follow
 
 
@@ -12,6 +13,7 @@ class PostAdmin(admin.ModelAdmin):
         list_display - поля которые отображаются в админке;
         list_editable - отображается в виде виджетов формы на странице;
         list_filter - добавляет фильтрацию (по дате);
+        search_fields - включает поиск, он идет по индексу search;
         empty_value_display - отображает значение для пустых полей.
     '''
 
@@ -27,6 +29,15 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        match = search.match_expression(search_term)
+        if not match or not search.is_available():
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+
+        return queryset.filter(pk__in=search.matching_ids(match)), False
+
 
 @admin.register(Group)
 class GroupAdmin(admin.ModelAdmin):
@@ -0,0 +1,242 @@
+'''
+Ленты Atom для групп, авторов и подписок.
+
+Лента пишется потоком по values_list, без экземпляров моделей
+и шаблонов. Ленты группы и автора кэшируются целиком
+с поколениями ресурсов core.cache в ключе: новый пост в группе
+или у автора меняет поколение, и следующий опрос получает новую
+ленту. Ссылки в ленте абсолютные, поэтому схема и хост запроса
+тоже входят в ключ. ?since=<дата ISO 8601> оставляет посты,
+опубликованные позже.
+'''
+
+import hashlib
+from urllib.parse import urlencode
+from xml.sax.saxutils import escape, quoteattr
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.http import (
+    HttpResponse, HttpResponseBadRequest, StreamingHttpResponse,
+)
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_datetime
+from django.utils.feedgenerator import rfc3339_date
+from django.utils.text import Truncator
+
+from core import metrics
+
+CONTENT_TYPE = 'application/atom+xml; charset=utf-8'
+FOLLOW_SALT = 'posts.atom.follow'
+
+ROW_FIELDS = (
+    'pk', 'text', 'pub_date', 'updated',
+    'author__username', 'author__first_name', 'author__last_name',
+)
+
+FEED_HEAD = (
+    '<?xml version="1.0" encoding="utf-8"?>\n'
+    '<feed xmlns="http://www.w3.org/2005/Atom">'
+    '<title>{title}</title>'
+    '<link href={link} rel="alternate"/>'
+    '<link href={self} rel="self"/>'
+    '<id>{id}</id>'
+    '<updated>{updated}</updated>'
+)
+ENTRY = (
+    '<entry>'
+    '<title>{title}</title>'
+    '<link href={link} rel="alternate"/>'
+    '<id>{id}</id>'
+    '<published>{published}</published>'
+    '<updated>{updated}</updated>'
+    '<author><name>{author}</name></author>'
+    '<content type="text">{content}</content>'
+    '</entry>'
+)
+FEED_TAIL = '</feed>\n'
+
+
+def follow_token(user):
+    '''Подписанный токен адреса ленты подписок пользователя'''
+
+    return signing.dumps(user.pk, salt=FOLLOW_SALT)
+
+
+def follow_user_id(token):
+    '''id пользователя из токена или None для чужого токена'''
+
+    try:
+        return signing.loads(token, salt=FOLLOW_SALT)
+    except signing.BadSignature:
+        return None
+
+
+def parse_since(request):
+    '''
+    Дата из ?since= или None.
+    Для неверной даты бросает ValueError.
+    '''
+
+    value = request.GET.get('since')
+    if not value:
+        return None
+
+    since = parse_datetime(value)
+    if since is None:
+        raise ValueError(value)
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since, timezone.utc)
+
+    return since
+
+
+def entry(request, row):
+    pk, text, pub_date, updated, username, first_name, last_name = row
+    link = request.build_absolute_uri(
+        reverse('posts:post_detail', kwargs={'post_id': pk})
+    )
+
+    return ENTRY.format(
+        title=escape(Truncator(text).words(8)),
+        link=quoteattr(link),
+        id=escape(link),
+        published=rfc3339_date(pub_date),
+        updated=rfc3339_date(updated),
+        author=escape(f'{first_name} {last_name}'.strip() or username),
+        content=escape(text),
+    )
+
+
+def self_link(request, since):
+    '''Адрес ленты: путь запроса и ?since=, без прочих параметров'''
+
+    path = request.path
+    if since is not None:
+        path += '?' + urlencode({'since': since.isoformat()})
+
+    return request.build_absolute_uri(path)
+
+
+def stream(request, title, link, rows, since=None):
+    '''
+    Части документа Atom.
+    <updated> ленты - самое позднее изменение ее постов, поэтому
+    строки (не больше SYNDICATION_ENTRIES) читаются до заголовка.
+    '''
+
+    rows = list(rows)
+    updated = max((row[3] for row in rows), default=timezone.now())
+    link = request.build_absolute_uri(link)
+
+    yield FEED_HEAD.format(
+        title=escape(title),
+        link=quoteattr(link),
+        self=quoteattr(self_link(request, since)),
+        id=escape(link),
+        updated=rfc3339_date(updated),
+    )
+    for row in rows:
+        yield entry(request, row)
+    yield FEED_TAIL
+
+
+def newer(queryset, since, key='pub_date'):
+    '''Посты, опубликованные после since'''
+
+    if since is None:
+        return queryset
+
+    return queryset.filter(**{f'{key}__gt': since})
+
+
+def feed_rows(queryset):
+    '''Итератор кортежей ROW_FIELDS последних постов ленты'''
+
+    return queryset.values_list(*ROW_FIELDS)[
+        :settings.SYNDICATION_ENTRIES
+    ].iterator()
+
+
+def save_to_cache(key, chunks):
+    '''Отдает части дальше и кэширует ленту, если ее дочитали'''
+
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+
+    cache.set(key, ''.join(parts), settings.PAGE_CACHE_TIMEOUT)
+
+
+def cached_feed(request, prefix, title, link, queryset):
+    '''
+    Лента группы или автора.
+    prefix - versioned_prefix ресурсов ленты, часть ключа кэша;
+    None - лента не кэшируется.
+    '''
+
+    try:
+        since = parse_since(request)
+    except ValueError:
+        return HttpResponseBadRequest('Неверная дата в ?since=')
+
+    rows = feed_rows(newer(queryset, since))
+    if prefix is None:
+        metrics.count_cache('feed', misses=1)
+        return StreamingHttpResponse(
+            stream(request, title, link, rows, since),
+            content_type=CONTENT_TYPE,
+        )
+
+    key = ':'.join([
+        'atom',
+        prefix,
+        f'{request.scheme}://{request.get_host()}',
+        since.isoformat() if since else '',
+    ])
+    body = cache.get(key)
+    metrics.count_cache('feed', hits=int(body is not None),
+                        misses=int(body is None))
+    if body is not None:
+        return HttpResponse(body, content_type=CONTENT_TYPE)
+
+    chunks = stream(request, title, link, rows, since)
+
+    return StreamingHttpResponse(
+        save_to_cache(key, chunks), content_type=CONTENT_TYPE
+    )
+
+
+def follow_feed(request, title, link, queryset, key, ordering):
+    '''
+    Лента подписок. Ее меняют посты многих авторов, поэтому
+    она не кэшируется, а ETag считается по id и датам изменения
+    постов ленты одним легким запросом.
+    '''
+
+    try:
+        since = parse_since(request)
+    except ValueError:
+        return HttpResponseBadRequest('Неверная дата в ?since=')
+
+    queryset = newer(queryset.order_by(*ordering), since, key)
+
+    versions = queryset.values_list('pk', 'updated')[
+        :settings.SYNDICATION_ENTRIES
+    ]
+    raw = ':'.join(f'{pk}.{updated.timestamp()}' for pk, updated in versions)
+    etag = '"{}"'.format(hashlib.md5(raw.encode()).hexdigest())
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = StreamingHttpResponse(
+            stream(request, title, link, feed_rows(queryset), since),
+            content_type=CONTENT_TYPE,
+        )
+    response['ETag'] = etag
+
+    return response
@@ -1,2 +1,18 @@
 POSTS_LIMIT = 10
 MAX_LEN_TITLE = 15
+
+# Загруженная картинка ужимается до IMAGE_MAX_SIDE по большей стороне.
+IMAGE_MAX_SIDE = 1920
+IMAGE_QUALITY = 82
+# Ширины вариантов для srcset и их форматы в порядке предпочтения,
+# форматы без поддержки в Pillow пропускаются.
+IMAGE_WIDTHS = (480, 960, 1920)
+IMAGE_FORMATS = ('WEBP', 'JPEG')
+# Общий файл картинки без ссылок удаляется, только если его
+# не сохраняли столько секунд: его может подхватывать новая загрузка.
+IMAGE_RELEASE_GRACE = 60
+THUMBNAIL_JOB_ATTEMPTS = 3
+THUMBNAIL_JOB_TIMEOUT = 60 * 5
+
+# Сколько слов запроса учитывает поиск.
+SEARCH_MAX_TERMS = 10
@@ -0,0 +1,224 @@
+'''
+Материализованная лента подписок (fan-out on write).
+
+Новый пост раскладывается в FeedEntry каждого подписчика автора,
+поэтому follow_index читает один диапазон по индексу (user, pub_date)
+вместо JOIN с Follow. Посты авторов с числом подписчиков не меньше
+FEED_CELEBRITY_THRESHOLD не раскладываются, а подмешиваются при чтении.
+
+Новый пост только дописывается в ленты: обрезать их до FEED_MAX_LENGTH
+в запросе post_create значило бы запрос на каждого подписчика.
+Ленты обрезает команда trim_feeds, лишние записи до нее
+на чтение не влияют.
+'''
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import F, Q
+
+from .models import FeedEntry, Follow, Post, UserStats
+
+# Ключ курсора ленты: дата и id поста из FeedEntry,
+# чтобы сортировка шла по индексу (user, pub_date, post).
+FEED_ORDERING = ('-feed_date', '-feed_post')
+
+
+def is_celebrity(author_id):
+    '''Проверяет, что у автора слишком много подписчиков для fan-out'''
+
+    return UserStats.objects.filter(
+        user_id=author_id,
+        followers_count__gte=settings.FEED_CELEBRITY_THRESHOLD,
+    ).exists()
+
+
+def celebrity_ids(user):
+    '''Возвращает id авторов-знаменитостей, на которых подписан user'''
+
+    return list(
+        Follow.objects.filter(
+            user=user,
+            author__stats__followers_count__gte=(
+                settings.FEED_CELEBRITY_THRESHOLD
+            ),
+        ).values_list('author_id', flat=True)
+    )
+
+
+def trim(user_id):
+    '''
+    Обрезает ленту пользователя до FEED_MAX_LENGTH записей.
+    Возвращает True, если было что обрезать.
+    '''
+
+    border = (
+        FeedEntry.objects.filter(user_id=user_id)
+        .order_by('-pub_date', '-post_id')
+        .values_list('pub_date', 'post_id')
+        [settings.FEED_MAX_LENGTH:settings.FEED_MAX_LENGTH + 1]
+    )
+
+    if border:
+        # Ключ (pub_date, post) как у индекса feed_user_pub_date_idx:
+        # записи с той же датой, что у границы, но выше нее, остаются.
+        pub_date, post_id = border[0]
+        FeedEntry.objects.filter(
+            Q(pub_date__lt=pub_date)
+            | Q(pub_date=pub_date, post_id__lte=post_id),
+            user_id=user_id,
+            pub_date__lte=pub_date,
+        ).delete()
+
+    return bool(border)
+
+
+def grown_feeds(since=None):
+    '''
+    id пользователей, в ленты которых могли прийти посты после since.
+    Без since - все пользователи с лентой.
+    '''
+
+    if since is None:
+        return FeedEntry.objects.order_by().values_list(
+            'user_id', flat=True
+        ).distinct()
+
+    return Follow.objects.filter(
+        author__posts__pub_date__gte=since
+    ).order_by().values_list('user_id', flat=True).distinct()
+
+
+def push_posts(posts):
+    '''
+    Раскладывает пачку постов по лентам подписчиков их авторов.
+    Возвращает id подписчиков, ленты которых пора обрезать.
+    '''
+
+    authors = {post.author_id for post in posts}
+    celebrities = set(
+        UserStats.objects.filter(
+            user_id__in=authors,
+            followers_count__gte=settings.FEED_CELEBRITY_THRESHOLD,
+        ).values_list('user_id', flat=True)
+    )
+
+    followers = defaultdict(list)
+    for user_id, author_id in Follow.objects.filter(
+        author_id__in=authors - celebrities
+    ).values_list('user_id', 'author_id'):
+        followers[author_id].append(user_id)
+
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+            for post in posts
+            for user_id in followers[post.author_id]
+        ],
+        ignore_conflicts=True,
+    )
+
+    return {user_id for users in followers.values() for user_id in users}
+
+
+def push_post(post):
+    '''Раскладывает новый пост по лентам подписчиков автора'''
+
+    push_posts([post])
+
+
+def backfill(user_id, author_id):
+    '''Добавляет в ленту последние посты автора после подписки'''
+
+    if is_celebrity(author_id):
+        return
+
+    posts = (
+        Post.objects.filter(author_id=author_id)
+        .values_list('pk', 'pub_date')
+        [:settings.FEED_MAX_LENGTH]
+    )
+
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+            for pk, pub_date in posts
+        ],
+        ignore_conflicts=True,
+    )
+
+    trim(user_id)
+
+
+def backfill_follows(follows, using):
+    '''
+    backfill для пачки новых подписок: последние посты авторов,
+    кроме знаменитостей, попадают в ленты одним INSERT ... SELECT.
+    '''
+
+    entry, follow, post, user_stats = (
+        model._meta.db_table
+        for model in (FeedEntry, Follow, Post, UserStats)
+    )
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f'''
+            WITH new AS (
+                SELECT user_id, author_id FROM {follow}
+                WHERE id IN ({', '.join(['%s'] * len(follows))})
+                AND author_id NOT IN (
+                    SELECT user_id FROM {user_stats}
+                    WHERE followers_count >= %s
+                )
+            )
+            INSERT INTO {entry} (user_id, post_id, pub_date)
+            SELECT new.user_id, p.id, p.pub_date
+            FROM new JOIN (
+                SELECT id, author_id, pub_date, ROW_NUMBER() OVER (
+                    PARTITION BY author_id ORDER BY pub_date DESC
+                ) AS position
+                FROM {post}
+                WHERE author_id IN (SELECT author_id FROM new)
+            ) p ON p.author_id = new.author_id
+            WHERE p.position <= %s
+            ON CONFLICT DO NOTHING
+            ''',
+            [
+                *(follow.pk for follow in follows),
+                settings.FEED_CELEBRITY_THRESHOLD,
+                settings.FEED_MAX_LENGTH,
+            ],
+        )
+
+    for user_id in {follow.user_id for follow in follows}:
+        trim(user_id)
+
+
+def remove_author(user_id, author_id):
+    '''Убирает из ленты посты автора после отписки'''
+
+    FeedEntry.objects.filter(
+        user_id=user_id,
+        post__author_id=author_id,
+    ).delete()
+
+
+def get_feed_posts(user):
+    '''
+    Возвращает посты ленты подписок с ключом FEED_ORDERING.
+    Без знаменитостей это один диапазон FeedEntry пользователя,
+    иначе материализованная лента объединяется с их постами.
+    '''
+
+    celebrities = celebrity_ids(user)
+    if not celebrities:
+        return Post.objects.filter(feed_entries__user=user).annotate(
+            feed_date=F('feed_entries__pub_date'),
+            feed_post=F('feed_entries__post'),
+        )
+
+    return Post.objects.filter(
+        Q(pk__in=FeedEntry.objects.filter(user=user).values('post_id'))
+        | Q(author_id__in=celebrities)
+    ).annotate(feed_date=F('pub_date'), feed_post=F('pk'))
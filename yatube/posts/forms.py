@@ -23,3 +23,11 @@ class CommentForm(forms.ModelForm):
     class Meta:
         model = Comment
         fields = ('text',)
+
+
+class SearchForm(forms.Form):
+    q = forms.CharField(
+        label='Поиск',
+        max_length=200,
+        widget=forms.TextInput(attrs={'class': 'form-control'}),
+    )
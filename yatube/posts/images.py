@@ -0,0 +1,162 @@
+'''
+Обработка картинок постов при загрузке.
+
+Загруженный файл открывается Pillow прямо из временного файла
+загрузки, большие JPEG декодируются сразу в уменьшенном масштабе
+(draft). Картинка поворачивается по EXIF, ужимается до
+IMAGE_MAX_SIDE и пересохраняется без метаданных. Размеры и хэш
+содержимого записываются в пост, а варианты для srcset строит
+build_thumbnails в форматах IMAGE_FORMATS, которые умеет Pillow.
+
+Одинаковые картинки разных постов - один файл хранилища
+по содержимому, он удаляется вместе с миниатюрами (release),
+когда на него не ссылается ни один пост. Файл, сохраненный меньше
+IMAGE_RELEASE_GRACE секунд назад, не удаляется сразу: release ставит
+его в таблицу ImageRelease, и команда release_images повторяет
+проверку после паузы (release_due).
+'''
+
+import hashlib
+import os
+from datetime import timedelta
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+from sorl.thumbnail import delete
+from sorl.thumbnail.base import EXTENSIONS
+from sorl.thumbnail.images import ImageFile
+
+from .constants import (
+    IMAGE_FORMATS,
+    IMAGE_MAX_SIDE,
+    IMAGE_QUALITY,
+    IMAGE_RELEASE_GRACE,
+    IMAGE_WIDTHS,
+)
+from .models import ImageRelease, Post, ThumbnailJob
+
+MIME_TYPES = {'WEBP': 'image/webp', 'JPEG': 'image/jpeg'}
+
+Image.init()
+VARIANT_FORMATS = tuple(
+    format_ for format_ in IMAGE_FORMATS
+    if format_ in Image.SAVE and format_ in EXTENSIONS
+)
+
+# Варианты, которые строит build_thumbnails и ищет {% image_variants %}.
+VARIANTS = tuple(
+    (str(width), {
+        'format': format_, 'quality': IMAGE_QUALITY, 'upscale': False,
+    })
+    for format_ in VARIANT_FORMATS
+    for width in IMAGE_WIDTHS
+)
+
+
+def has_alpha(image):
+    return image.mode in ('RGBA', 'LA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    )
+
+
+def prepare(upload):
+    '''
+    Возвращает (файл, ширина, высота, sha256) для загруженной картинки.
+    Прозрачные картинки сохраняются в PNG, остальные - в JPEG.
+    '''
+
+    upload.seek(0)
+    with Image.open(upload) as source:
+        source.draft('RGB', (IMAGE_MAX_SIDE, IMAGE_MAX_SIDE))
+        image = ImageOps.exif_transpose(source)
+        image.thumbnail((IMAGE_MAX_SIDE, IMAGE_MAX_SIDE), Image.LANCZOS)
+
+        buffer = BytesIO()
+        if has_alpha(image):
+            image.convert('RGBA').save(buffer, 'PNG', optimize=True)
+            extension = 'png'
+        else:
+            image.convert('RGB').save(
+                buffer, 'JPEG',
+                quality=IMAGE_QUALITY, optimize=True, progressive=True,
+            )
+            extension = 'jpg'
+
+    content = buffer.getvalue()
+    stem = os.path.splitext(os.path.basename(upload.name))[0]
+
+    return (
+        ContentFile(content, name=f'{stem}.{extension}'),
+        image.width,
+        image.height,
+        hashlib.sha256(content).hexdigest(),
+    )
+
+
+def process(post):
+    '''Заменяет новую картинку поста обработанной'''
+
+    content, post.image_width, post.image_height, post.image_hash = (
+        prepare(post.image.file)
+    )
+    post.image.save(content.name, content, save=False)
+
+
+def stored(name):
+    '''Картинка поста по имени для sorl, в хранилище поля image'''
+
+    return ImageFile(name, Post._meta.get_field('image').storage)
+
+
+def defer_release(name):
+    '''Откладывает release картинки на IMAGE_RELEASE_GRACE секунд'''
+
+    ImageRelease.objects.update_or_create(
+        image=name,
+        defaults={
+            'due': timezone.now() + timedelta(seconds=IMAGE_RELEASE_GRACE),
+        },
+    )
+
+
+def release(name):
+    '''
+    Удаляет файл картинки, его миниатюры и задачу на них,
+    если файл больше не нужен ни одному посту.
+    Недавно сохраненный файл откладывается (defer_release).
+    Возвращает True, если файл удален.
+    '''
+
+    source = stored(name)
+    if Post.objects.filter(image=name).exists():
+        return False
+    age = source.storage.file_age(name)
+    if age is None:
+        return False
+    if age <= IMAGE_RELEASE_GRACE:
+        defer_release(name)
+        return False
+
+    ThumbnailJob.objects.filter(image=name).delete()
+    delete(source)
+
+    return True
+
+
+def release_due(limit):
+    '''
+    Повторяет release для отложенных картинок, чей срок наступил.
+    Возвращает число удаленных файлов.
+    '''
+
+    released = 0
+    pending = ImageRelease.objects.filter(due__lte=timezone.now())
+    for job in list(pending[:limit]):
+        with transaction.atomic():
+            job.delete()
+            released += release(job.image)
+
+    return released
@@ -0,0 +1,73 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from posts import thumbnails
+
+
+def process_in_thread(job):
+    try:
+        return thumbnails.process(job)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Строит миниатюры картинок из очереди ThumbnailJob.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Работать постоянно, опрашивая очередь.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Пауза между опросами пустой очереди, секунд.',
+        )
+        parser.add_argument(
+            '--batch',
+            type=int,
+            default=50,
+            help='Сколько задач забирать за один проход.',
+        )
+        parser.add_argument(
+            '--retry-failed',
+            action='store_true',
+            help='Вернуть в очередь задачи, исчерпавшие попытки.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=2,
+            help='Число потоков, строящих миниатюры (1 - без потоков).',
+        )
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            retried = thumbnails.retry_failed()
+            self.stdout.write(f'Возвращено задач: {retried}')
+
+        workers = options['workers']
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                self.run(partial(pool.map, process_in_thread), options)
+        else:
+            self.run(partial(map, thumbnails.process), options)
+
+    def run(self, process_all, options):
+        while True:
+            jobs = thumbnails.pending_jobs(options['batch'])
+            done = sum(process_all(jobs))
+            if done:
+                self.stdout.write(f'Готово миниатюр: {done}')
+
+            if not options['loop']:
+                break
+            if not done:
+                time.sleep(options['interval'])
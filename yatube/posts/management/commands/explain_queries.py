@@ -0,0 +1,99 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from posts.constants import POSTS_LIMIT
+from posts.feed import FEED_ORDERING, get_feed_posts
+from posts.models import Comment, Follow, Post, User
+from posts.utils import KeysetPaginator
+
+# Курсор для проверки глубоких страниц: значения не важны,
+# SQLite строит план без учета параметров.
+SEEK_CURSOR = ('2000-01-01T00:00:00+00:00', 1)
+
+
+def page_querysets(name, queryset, ordering=None):
+    '''Возвращает запросы первой и глубокой страницы списка'''
+
+    paginator = KeysetPaginator(queryset, POSTS_LIMIT, ordering)
+
+    return [
+        (f'{name} (первая страница)', paginator.page_queryset()),
+        (f'{name} (по курсору)', paginator.page_queryset(SEEK_CURSOR)),
+    ]
+
+
+def view_querysets():
+    '''Возвращает запросы, которые выполняют представления posts'''
+
+    user = User(pk=1)
+    posts = Post.objects.for_listing()
+
+    return [
+        *page_querysets('index', posts),
+        *page_querysets('group_posts', posts.filter(group_id=1)),
+        *page_querysets('profile', posts.filter(author_id=1)),
+        *page_querysets(
+            'follow_index',
+            get_feed_posts(user).for_listing(),
+            FEED_ORDERING,
+        ),
+        ('post_detail', posts.filter(pk=1)),
+        *page_querysets(
+            'post_detail (комментарии)',
+            Comment.objects.filter(post_id=1).select_related('author'),
+        ),
+        ('profile (подписка)', Follow.objects.filter(user=user, author=user)),
+        ('profile (подписчики)', Follow.objects.filter(author=user)),
+        ('profile (подписки)', Follow.objects.filter(user=user)),
+    ]
+
+
+def explain(queryset):
+    '''Возвращает строки EXPLAIN QUERY PLAN для запроса'''
+
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def is_slow(step):
+    '''Полный проход по таблице или сортировка во временном B-дереве'''
+
+    full_scan = step.startswith('SCAN') and 'USING' not in step
+
+    return full_scan or 'TEMP B-TREE' in step
+
+
+class Command(BaseCommand):
+    help = (
+        'Выводит EXPLAIN QUERY PLAN для запросов представлений '
+        'и завершается ошибкой при полном проходе по таблице '
+        'или сортировке во временном B-дереве.'
+    )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Команда поддерживает только SQLite.')
+
+        failed = []
+        for name, queryset in view_querysets():
+            plan = explain(queryset)
+            slow = [step for step in plan if is_slow(step)]
+            if slow:
+                failed.append(name)
+
+            style = self.style.ERROR if slow else self.style.SUCCESS
+            self.stdout.write(style(name))
+            for step in plan:
+                self.stdout.write(f'    {step}')
+
+        if failed:
+            raise CommandError(
+                'Запросы без подходящего индекса: ' + ', '.join(failed)
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS('Все запросы используют индексы.')
+        )
@@ -0,0 +1,48 @@
+import time
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = 'Выгружает посты, комментарии и подписки в JSONL или CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default='-',
+            help='Файл для выгрузки, по умолчанию стандартный вывод.',
+        )
+        parser.add_argument(
+            '--format',
+            choices=transfer.FORMATS,
+            help='Формат файла, по умолчанию по расширению.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Сколько строк читать из базы за раз.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or transfer.guess_format(path)
+        stream = (
+            nullcontext(self.stdout) if path == '-'
+            else open(path, 'w', encoding='utf-8', newline='')
+        )
+
+        started = time.monotonic()
+        records = transfer.export_records(options['chunk_size'])
+        with stream as out:
+            total = transfer.write_records(out, fmt, records)
+
+        elapsed = time.monotonic() - started
+        self.stderr.write(self.style.SUCCESS(
+            f'Выгружено строк: {total} за {elapsed:.1f} с '
+            f'({total / max(elapsed, 1e-9):.0f} строк/с)'
+        ))
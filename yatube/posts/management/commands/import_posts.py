@@ -0,0 +1,68 @@
+import sys
+import time
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+
+from posts import transfer
+from posts.models import Comment, Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает посты, комментарии и подписки из JSONL или CSV '
+        'пачками через bulk_create.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help='Файл для загрузки, "-" - стандартный ввод.',
+        )
+        parser.add_argument(
+            '--format',
+            choices=transfer.FORMATS,
+            help='Формат файла, по умолчанию по расширению.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько записей загружать в одной транзакции.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or transfer.guess_format(path)
+        stream = (
+            nullcontext(sys.stdin) if path == '-'
+            else open(path, encoding='utf-8', newline='')
+        )
+
+        started = time.monotonic()
+        importer = transfer.Importer(options['batch_size'])
+        try:
+            with stream as lines, transfer.explicit_dates(
+                Post._meta.get_field('pub_date'),
+                Comment._meta.get_field('created'),
+            ):
+                records = transfer.read_records(lines, fmt)
+                for chunk in transfer.chunks(records, options['batch_size']):
+                    importer.load(chunk)
+                    if options['verbosity'] > 1:
+                        self.stdout.write(
+                            f'Загружено строк: {importer.rows}'
+                        )
+        except (ValueError, KeyError, DatabaseError) as error:
+            raise CommandError(
+                f'Ошибка в пачке после строки {importer.rows}: {error!r}'
+            )
+        finally:
+            importer.finish()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено строк: {importer.rows} за {elapsed:.1f} с '
+            f'({importer.rows / max(elapsed, 1e-9):.0f} строк/с)'
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts import stats
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики UserStats и исправляет расхождения.'
+
+    def handle(self, *args, **options):
+        fixed = stats.recount()
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Исправлено записей статистики: {fixed}')
+        )
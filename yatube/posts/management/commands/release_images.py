@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import images
+
+
+class Command(BaseCommand):
+    help = 'Удаляет картинки без постов, удаление которых было отложено.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Работать постоянно, опрашивая очередь.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=60.0,
+            help='Пауза между проходами, секунд.',
+        )
+        parser.add_argument(
+            '--batch',
+            type=int,
+            default=100,
+            help='Сколько картинок проверять за один проход.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            released = images.release_due(options['batch'])
+            if released:
+                self.stdout.write(f'Удалено картинок: {released}')
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts import feed
+
+
+class Command(BaseCommand):
+    help = 'Обрезает ленты подписок до FEED_MAX_LENGTH записей.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help=(
+                'Работать постоянно; каждый проход смотрит только ленты, '
+                'в которые пришли посты после предыдущего.'
+            ),
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=60.0,
+            help='Пауза между проходами, секунд.',
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        while True:
+            started = timezone.now()
+            trimmed = sum(
+                feed.trim(user_id)
+                for user_id in list(feed.grown_feeds(since))
+            )
+            if trimmed:
+                self.stdout.write(f'Обрезано лент: {trimmed}')
+
+            if not options['loop']:
+                break
+            since = started
+            time.sleep(options['interval'])
@@ -0,0 +1,26 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_post_image_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageRelease',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image', models.CharField(max_length=255, unique=True, verbose_name='Картинка')),
+                ('due', models.DateTimeField(db_index=True, verbose_name='Проверить после')),
+            ],
+            options={
+                'verbose_name': 'Отложенное удаление картинки',
+                'verbose_name_plural': 'Отложенные удаления картинок',
+                'ordering': ['due'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_imagerelease'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='thumbnailjob',
+            name='failed',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Провалена'),
+        ),
+    ]
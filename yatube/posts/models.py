@@ -1,10 +1,18 @@
-from django.db import models
+from django.db import connections, models, router
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal
 from django.contrib.auth import get_user_model
 
+from core.storage import ContentAddressedStorage
 from .constants import MAX_LEN_TITLE
 
 User = get_user_model()
 
+# Пачка новых подписок из FollowQuerySet.bulk_follow (аргумент follows):
+# вместо post_save на каждую строку (posts.signals).
+follows_created = Signal()
+
 
 class Group(models.Model):
     '''
@@ -30,6 +38,44 @@ class Group(models.Model):
         return self.title[:MAX_LEN_TITLE]
 
 
+class PostQuerySet(models.QuerySet):
+
+    def with_comments_count(self):
+        '''Добавляет comments_count - число комментариев подзапросом'''
+
+        comments = (
+            Comment.objects.filter(post=models.OuterRef('pk'))
+            .order_by().values('post')
+            .annotate(total=models.Count('pk')).values('total')
+        )
+
+        return self.annotate(
+            comments_count=Coalesce(models.Subquery(comments), 0),
+        )
+
+    def for_listing(self):
+        '''
+        Готовит посты к выводу в шаблонах.
+        Подтягивает автора, его счетчики и группу одним JOIN,
+        считает комментарии подзапросом и не грузит лишние колонки.
+        '''
+
+        return self.select_related('author__stats', 'group').only(
+            'text',
+            'pub_date',
+            'updated',
+            'image',
+            'image_width',
+            'image_height',
+            'author__username',
+            'author__first_name',
+            'author__last_name',
+            'author__stats__posts_count',
+            'group__title',
+            'group__slug',
+        ).with_comments_count()
+
+
 class Post(models.Model):
     '''
     Создает модель поста
@@ -37,9 +83,12 @@ class Post(models.Model):
     Atributes:
         text - текст поста;
         pub_date - автоматом создается дата при создании поста;
+        updated - дата последнего изменения, версия кэша поста;
         author - ключ для связей Many to One;
         group - ключ для связей Many to One;
-        image - поле для картинки.
+        image - поле для картинки;
+        image_width, image_height - размеры обработанной картинки;
+        image_hash - sha256 содержимого картинки.
     '''
 
     text = models.TextField(
@@ -52,6 +101,11 @@ class Post(models.Model):
         verbose_name='Дата публикации'
     )
 
+    updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения'
+    )
+
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -72,13 +126,53 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
-        blank=True
+        storage=ContentAddressedStorage(),
+        blank=True,
     )
 
+    image_width = models.PositiveIntegerField(
+        'Ширина картинки',
+        blank=True,
+        null=True,
+        editable=False,
+    )
+
+    image_height = models.PositiveIntegerField(
+        'Высота картинки',
+        blank=True,
+        null=True,
+        editable=False,
+    )
+
+    image_hash = models.CharField(
+        'Хэш картинки',
+        max_length=64,
+        blank=True,
+        editable=False,
+    )
+
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'пост'
         verbose_name_plural = 'посты'
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date_idx',
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx',
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx',
+            ),
+            # Поиск постов с общим файлом картинки.
+            models.Index(fields=['image'], name='post_image_idx'),
+        ]
 
     def __str__(self) -> str:
         '''Возвращает название группы'''
@@ -114,11 +208,174 @@ class Comment(models.Model):
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
         ordering = ['-created']
+        indexes = [
+            models.Index(
+                fields=['post', '-created', '-id'],
+                name='comment_post_created_idx',
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.text[:MAX_LEN_TITLE]
 
 
+class FollowQuerySet(models.QuerySet):
+    '''
+    Подписки без гонок: проверку "уже подписан" делает ограничение
+    unique, поэтому двойной клик и параллельные запросы не падают.
+    '''
+
+    def write_db(self):
+        return self._db or router.db_for_write(self.model)
+
+    def execute(self, sql, params):
+        '''Выполняет запрос ... RETURNING id, author_id'''
+
+        with connections[self.write_db()].cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def send(self, signal, follows, **kwargs):
+        '''
+        Шлет сигнал для подписок, записанных в обход save() и delete():
+        от сигналов зависят счетчики, лента и кэш страниц.
+        '''
+
+        for follow in follows:
+            signal.send(
+                self.model, instance=follow, using=self.write_db(), **kwargs
+            )
+
+    def rows(self, rows, user, username):
+        # Сигналам от автора нужны только id и имя, они уже известны.
+        return [
+            self.model(
+                pk=pk, user=user, author=User(pk=author_id, username=username)
+            )
+            for pk, author_id in rows
+        ]
+
+    def follow(self, user, username):
+        '''
+        Подписывает user на автора username одним INSERT ... SELECT.
+        Возвращает True, если подписка новая; False - уже подписан,
+        это он сам или такого автора нет.
+        '''
+
+        rows = self.execute(
+            f'''
+            INSERT INTO {self.model._meta.db_table} (user_id, author_id)
+            SELECT %s, id FROM {User._meta.db_table}
+            WHERE username = %s AND id <> %s
+            ON CONFLICT DO NOTHING
+            RETURNING id, author_id
+            ''',
+            [user.pk, username, user.pk],
+        )
+        self.send(
+            post_save, self.rows(rows, user, username),
+            created=True, update_fields=None, raw=False,
+        )
+
+        return bool(rows)
+
+    def unfollow(self, user, username):
+        '''Отписывает user от автора username одним DELETE'''
+
+        rows = self.execute(
+            f'''
+            DELETE FROM {self.model._meta.db_table}
+            WHERE user_id = %s AND author_id IN (
+                SELECT id FROM {User._meta.db_table} WHERE username = %s
+            )
+            RETURNING id, author_id
+            ''',
+            [user.pk, username],
+        )
+        self.send(post_delete, self.rows(rows, user, username))
+
+        return bool(rows)
+
+    def bulk_follow(self, follows):
+        '''
+        Создает недостающие подписки запросом INSERT ... ON CONFLICT
+        DO NOTHING RETURNING на пачку и возвращает новые. Уже
+        существующие подписки и подписки на себя пропускает.
+        Вместо post_save шлет один follows_created на все новые
+        подписки, чтобы счетчики, ленты и кэш обновились пачкой.
+        '''
+
+        follows = {
+            (follow.user_id, follow.author_id): follow
+            for follow in follows
+            if follow.user_id != follow.author_id
+        }
+        pairs = list(follows)
+        size = connections[self.write_db()].ops.bulk_batch_size(
+            ['user_id', 'author_id'], pairs
+        )
+
+        created = []
+        for first in range(0, len(pairs), size):
+            batch = pairs[first:first + size]
+            rows = self.execute(
+                f'''
+                INSERT INTO {self.model._meta.db_table} (user_id, author_id)
+                VALUES {', '.join(['(%s, %s)'] * len(batch))}
+                ON CONFLICT DO NOTHING
+                RETURNING id, user_id, author_id
+                ''',
+                [value for pair in batch for value in pair],
+            )
+            for pk, user_id, author_id in rows:
+                follow = follows[user_id, author_id]
+                follow.pk = pk
+                created.append(follow)
+
+        if created:
+            follows_created.send(
+                self.model, follows=created, using=self.write_db()
+            )
+
+        return created
+
+    def bulk_unfollow(self, follows):
+        '''
+        Удаляет подписки запросом DELETE ... RETURNING на пачку
+        и возвращает удаленные, с pk. Для каждой шлет post_delete,
+        как unfollow; author у подписок должен быть с username.
+        '''
+
+        follows = {
+            (follow.user_id, follow.author_id): follow for follow in follows
+        }
+        pairs = list(follows)
+        size = connections[self.write_db()].ops.bulk_batch_size(
+            ['user_id', 'author_id'], pairs
+        )
+
+        deleted = []
+        for first in range(0, len(pairs), size):
+            batch = pairs[first:first + size]
+            rows = self.execute(
+                f'''
+                DELETE FROM {self.model._meta.db_table}
+                WHERE (user_id, author_id) IN (
+                    VALUES {', '.join(['(%s, %s)'] * len(batch))}
+                )
+                RETURNING id, user_id, author_id
+                ''',
+                [value for pair in batch for value in pair],
+            )
+            for pk, user_id, author_id in rows:
+                follow = follows[user_id, author_id]
+                follow.pk = pk
+                deleted.append(follow)
+        self.send(post_delete, deleted)
+
+        return deleted
+
+
 class Follow(models.Model):
 
     user = models.ForeignKey(
@@ -135,12 +392,149 @@ class Follow(models.Model):
         verbose_name='Подписчик'
     )
 
+    objects = FollowQuerySet.as_manager()
+
     class Meta:
         constraints = [
             models.UniqueConstraint(fields=['user', 'author'], name='unique'),
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='follow_author_user_idx',
+            ),
+        ]
         verbose_name = 'Подписки'
         verbose_name_plural = 'Подписчики'
 
     def __str__(self) -> str:
         return f'{self.user.username} - {self.author.username}'
+
+
+class FeedEntry(models.Model):
+    '''
+    Создает запись материализованной ленты подписок
+
+    Atributes:
+        user - владелец ленты;
+        post - пост автора, на которого подписан user;
+        pub_date - копия даты поста для чтения ленты одним диапазоном.
+    '''
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed',
+        verbose_name='Пользователь',
+    )
+
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Пост',
+    )
+
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        ordering = ['-pub_date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_feed_entry',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='feed_user_pub_date_idx',
+            ),
+        ]
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Лента подписок'
+
+    def __str__(self) -> str:
+        return f'{self.user_id} - {self.post_id}'
+
+
+class UserStats(models.Model):
+    '''
+    Создает счетчики пользователя, чтобы не считать их COUNT(*)
+
+    Atributes:
+        user - владелец счетчиков;
+        posts_count - число постов пользователя;
+        followers_count - число подписчиков;
+        following_count - число подписок;
+        comments_count - число комментариев пользователя.
+    '''
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь',
+    )
+
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+    comments_count = models.PositiveIntegerField('Комментариев', default=0)
+
+    class Meta:
+        verbose_name = 'Статистика пользователя'
+        verbose_name_plural = 'Статистика пользователей'
+
+    def __str__(self) -> str:
+        return str(self.user_id)
+
+
+class ThumbnailJob(models.Model):
+    '''
+    Создает задачу на построение миниатюр картинки
+
+    Atributes:
+        image - имя файла картинки, уникально для дедупликации;
+        created - время постановки в очередь;
+        started - время захвата воркером или None;
+        attempts - число неудачных попыток;
+        failed - время последней попытки, после которой задача
+            больше не берется, или None.
+    '''
+
+    image = models.CharField('Картинка', max_length=255, unique=True)
+    created = models.DateTimeField('Поставлена', auto_now_add=True)
+    started = models.DateTimeField('Взята в работу', null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    failed = models.DateTimeField('Провалена', null=True, blank=True)
+
+    class Meta:
+        ordering = ['created']
+        verbose_name = 'Задача миниатюр'
+        verbose_name_plural = 'Задачи миниатюр'
+
+    def __str__(self) -> str:
+        return self.image
+
+
+class ImageRelease(models.Model):
+    '''
+    Создает отложенное удаление картинки
+
+    Atributes:
+        image - имя файла картинки, уникально для дедупликации;
+        due - время, после которого удаление проверяется снова.
+    '''
+
+    image = models.CharField('Картинка', max_length=255, unique=True)
+    due = models.DateTimeField('Проверить после', db_index=True)
+
+    class Meta:
+        ordering = ['due']
+        verbose_name = 'Отложенное удаление картинки'
+        verbose_name_plural = 'Отложенные удаления картинок'
+
+    def __str__(self) -> str:
+        return self.image
@@ -0,0 +1,230 @@
+'''
+Полнотекстовый поиск по постам на SQLite FTS5.
+
+Текст поста хранится в таблице posts_post_fts основами слов
+(см. stemmer), поэтому запрос "постами" находит "пост" и "посты".
+Индекс обновляется сигналами сохранения и удаления Post.
+Результаты ранжируются BM25 с прибавкой за свежесть и листаются
+курсором, как остальные списки постов. Ранжируются только
+SEARCH_MAX_CANDIDATES последних совпадений, и порядок устойчив, пока
+в индекс не добавлены посты (см. RANKED).
+'''
+
+import re
+from itertools import islice
+
+from django.conf import settings
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.db.models import FloatField
+from django.utils.functional import cached_property
+
+from .constants import SEARCH_MAX_TERMS
+from .models import Post
+from .stemmer import stem
+from .utils import KeysetPaginator
+
+TABLE = 'posts_post_fts'
+
+CREATE_TABLE = (
+    f'CREATE VIRTUAL TABLE {TABLE} USING fts5(body, pub_ts UNINDEXED)'
+)
+DROP_TABLE = f'DROP TABLE IF EXISTS {TABLE}'
+
+INSERT = (
+    f'INSERT OR REPLACE INTO {TABLE} (rowid, body, pub_ts) '
+    f'VALUES (%s, %s, %s)'
+)
+DELETE = f'DELETE FROM {TABLE} WHERE rowid = %s'
+
+# Оценка: BM25 (чем меньше, тем лучше) минус свежесть. Свежесть
+# считается от абсолютной даты, а не от возраста поста, но BM25
+# зависит от статистики всего индекса (число постов, частота слова,
+# средняя длина текста). Новый пост меняет оценки остальных, и курсор
+# ?after=, выданный до него, может пропустить или повторить результат.
+# Ранжируются только SEARCH_MAX_CANDIDATES последних совпадений:
+# FTS5 отдает их по rowid без сортировки, и частое слово
+# не заставляет считать BM25 для всей таблицы. Более старое
+# совпадение не попадает в выдачу, даже если оно подходит лучше;
+# страница поиска об этом предупреждает (SearchPaginator.truncated).
+RANKED = (
+    f'SELECT rowid, score FROM ('
+    f'SELECT rowid, bm25({TABLE}) - pub_ts / %s AS score '
+    f'FROM {TABLE} WHERE {TABLE} MATCH %s ORDER BY rowid DESC LIMIT %s'
+    f') {{seek}} ORDER BY score {{desc}}, rowid {{desc}} LIMIT %s'
+)
+SEEK = 'WHERE score {op} %s OR (score = %s AND rowid {op} %s)'
+CANDIDATES = (
+    f'SELECT COUNT(*) FROM (SELECT rowid FROM {TABLE} '
+    f'WHERE {TABLE} MATCH %s LIMIT %s)'
+)
+
+WORD = re.compile(r'\w+')
+
+REBUILD_BATCH = 1000
+
+
+def is_available():
+    '''FTS5 есть только у SQLite'''
+
+    return connection.vendor == 'sqlite'
+
+
+def tokens(text):
+    '''Возвращает основы слов текста'''
+
+    return [stem(word) for word in WORD.findall(text)]
+
+
+def match_expression(query):
+    '''
+    Переводит запрос пользователя в выражение MATCH.
+    Каждая основа берется в кавычки, поэтому синтаксис FTS5
+    в запросе не работает и не ломает его.
+    '''
+
+    terms = dict.fromkeys(tokens(query)[:SEARCH_MAX_TERMS])
+
+    return ' '.join(f'"{term}"' for term in terms)
+
+
+def index_values(pk, text, pub_date):
+    return pk, ' '.join(tokens(text)), int(pub_date.timestamp())
+
+
+def index_rows(rows, using=None):
+    '''Записывает в индекс строки (id, текст, дата публикации)'''
+
+    using = using or connection
+    with using.cursor() as cursor:
+        cursor.executemany(INSERT, [index_values(*row) for row in rows])
+
+
+def index_post(post):
+    # Один пост пишется через execute: SQL-панель debug_toolbar
+    # на SQLite падает на executemany в запросах страниц.
+    if is_available():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                INSERT, index_values(post.pk, post.text, post.pub_date)
+            )
+
+
+def unindex_post(pk):
+    if is_available():
+        with connection.cursor() as cursor:
+            cursor.execute(DELETE, [pk])
+
+
+def rebuild():
+    '''Перестраивает индекс по всем постам, возвращает их число'''
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+
+    rows = (
+        Post.objects.order_by().values_list('pk', 'text', 'pub_date')
+        .iterator(chunk_size=REBUILD_BATCH)
+    )
+    total = 0
+    for batch in iter(lambda: list(islice(rows, REBUILD_BATCH)), []):
+        index_rows(batch)
+        total += len(batch)
+
+    return total
+
+
+def matching_ids(match):
+    '''Подзапрос id постов, подходящих под выражение MATCH'''
+
+    return RawSQL(
+        f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s',
+        [match],
+    )
+
+
+def ranked_ids(match, cursor=None, backwards=False, limit=None):
+    '''Возвращает пары (id, оценка) за курсором в порядке ранжирования'''
+
+    params = [
+        float(settings.SEARCH_RECENCY_SECONDS),
+        match,
+        settings.SEARCH_MAX_CANDIDATES,
+    ]
+    seek = ''
+    if cursor is not None:
+        score, pk = cursor
+        seek = SEEK.format(op='<' if backwards else '>')
+        params += [score, score, pk]
+    params.append(limit if limit is not None else -1)
+
+    sql = RANKED.format(seek=seek, desc='DESC' if backwards else '')
+    with connection.cursor() as db_cursor:
+        db_cursor.execute(sql, params)
+
+        return db_cursor.fetchall()
+
+
+def has_more_candidates(match):
+    '''Совпадений больше, чем SEARCH_MAX_CANDIDATES'''
+
+    limit = settings.SEARCH_MAX_CANDIDATES
+    with connection.cursor() as db_cursor:
+        db_cursor.execute(CANDIDATES, [match, limit + 1])
+
+        return db_cursor.fetchone()[0] > limit
+
+
+class SearchPaginator(KeysetPaginator):
+    '''
+    Курсорный вывод результатов поиска.
+    Ключ - оценка search_rank, запрос страницы идет в FTS5,
+    а сами посты читаются одним запросом по id.
+
+    Atributes:
+        max_candidates - сколько последних совпадений ранжируется;
+        truncated - совпадений больше, и старые не показаны.
+    '''
+
+    def __init__(self, query, per_page):
+        super().__init__(
+            Post.objects.for_listing(),
+            per_page,
+            ('search_rank', 'pk'),
+        )
+        self.match = match_expression(query)
+
+    def _key_field(self):
+        return FloatField()
+
+    @property
+    def max_candidates(self):
+        return settings.SEARCH_MAX_CANDIDATES
+
+    @cached_property
+    def truncated(self):
+        # Предупреждение нужно только на первой странице.
+        if not self.match or self.previous_cursor is not None:
+            return False
+
+        return has_more_candidates(self.match)
+
+    def page_queryset(self, cursor=None, backwards=False):
+        if not self.match:
+            return []
+
+        if cursor is not None:
+            value, pk = cursor
+            cursor = self._key_field().to_python(value), pk
+
+        ranked = ranked_ids(self.match, cursor, backwards, self.per_page + 1)
+        posts = self.object_list.in_bulk([pk for pk, score in ranked])
+
+        rows = []
+        for pk, score in ranked:
+            post = posts.get(pk)
+            if post is not None:
+                post.search_rank = score
+                rows.append(post)
+
+        return rows
@@ -0,0 +1,214 @@
+from collections import Counter
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import (
+    post_delete, post_init, post_save, pre_save,
+)
+from django.dispatch import receiver
+
+from core import cache as page_cache
+from . import feed, images, search, stats, thumbnails
+from .models import (
+    Comment, Follow, Group, Post, User, UserStats, follows_created,
+)
+
+
+def post_resources(post):
+    '''Ресурсы кэша, страницы которых показывают пост'''
+
+    resources = ['index', f'post:{post.pk}', f'author:{post.author.username}']
+    if post.group_id:
+        resources.append(f'group:{post.group.slug}')
+
+    return resources
+
+
+@receiver(post_save, sender=User)
+def create_stats(sender, instance, created, **kwargs):
+    '''Заводит счетчики новому пользователю'''
+
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def count_post(sender, instance, created, **kwargs):
+    if created:
+        stats.bump(instance.author_id, posts_count=1)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_post(sender, instance, **kwargs):
+    stats.bump(instance.author_id, posts_count=-1)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, **kwargs):
+    if created:
+        stats.bump(instance.author_id, comments_count=1)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    stats.bump(instance.author_id, comments_count=-1)
+
+
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, **kwargs):
+    if created:
+        stats.bump(instance.user_id, following_count=1)
+        stats.bump(instance.author_id, followers_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def uncount_follow(sender, instance, **kwargs):
+    stats.bump(instance.user_id, following_count=-1)
+    stats.bump(instance.author_id, followers_count=-1)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    '''Раскладывает новый пост по лентам подписчиков'''
+
+    if created:
+        feed.push_post(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_feed(sender, instance, created, **kwargs):
+    '''Заполняет ленту постами автора после подписки'''
+
+    if created:
+        feed.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def trim_feed(sender, instance, **kwargs):
+    '''Убирает посты автора из ленты после отписки'''
+
+    feed.remove_author(instance.user_id, instance.author_id)
+
+
+@receiver(follows_created, sender=Follow)
+def apply_follows(sender, follows, using, **kwargs):
+    '''
+    Пачка подписок из bulk_follow: то же, что count_follow,
+    backfill_feed и invalidate_follow_profiles, но запросами
+    на всю пачку, а не на каждую подписку.
+    '''
+
+    stats.bump_many(
+        'following_count', Counter(follow.user_id for follow in follows)
+    )
+    stats.bump_many(
+        'followers_count', Counter(follow.author_id for follow in follows)
+    )
+    feed.backfill_follows(follows, using)
+    usernames = User.objects.using(using).filter(pk__in={
+        pk for follow in follows for pk in (follow.user_id, follow.author_id)
+    }).values_list('username', flat=True)
+    page_cache.bump(*(f'author:{username}' for username in usernames))
+
+
+@receiver(post_init, sender=Post)
+def remember_group(sender, instance, **kwargs):
+    '''Запоминает группу и картинку поста, чтобы заметить их смену'''
+
+    instance._loaded_group_id = instance.__dict__.get('group_id')
+    image = instance.__dict__.get('image')
+    instance._loaded_image = getattr(image, 'name', image)
+
+
+@receiver(post_save, sender=Post)
+def invalidate_saved_post(sender, instance, **kwargs):
+    resources = post_resources(instance)
+
+    old_group_id = instance._loaded_group_id
+    if old_group_id and old_group_id != instance.group_id:
+        old_slug = Group.objects.filter(pk=old_group_id).values_list(
+            'slug', flat=True
+        ).first()
+        resources.append(f'group:{old_slug}')
+    instance._loaded_group_id = instance.group_id
+
+    page_cache.bump(*resources)
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_deleted_post(sender, instance, **kwargs):
+    page_cache.bump(*post_resources(instance))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_commented_post(sender, instance, **kwargs):
+    post = Post.objects.select_related('author', 'group').filter(
+        pk=instance.post_id
+    ).first()
+
+    if post is not None:
+        page_cache.bump(*post_resources(post))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_profiles(sender, instance, **kwargs):
+    page_cache.bump(
+        f'author:{instance.author.username}',
+        f'author:{instance.user.username}',
+    )
+
+
+@receiver(post_save, sender=Group)
+def invalidate_group(sender, instance, **kwargs):
+    page_cache.bump(f'group:{instance.slug}')
+
+
+@receiver(pre_save, sender=Post)
+def process_image(sender, instance, **kwargs):
+    '''Обрабатывает только что загруженную картинку до записи на диск'''
+
+    if not instance.image:
+        instance.image_width = instance.image_height = None
+        instance.image_hash = ''
+    elif not instance.image._committed:
+        images.process(instance)
+
+
+@receiver(post_save, sender=Post)
+def release_replaced_image(sender, instance, **kwargs):
+    '''Отпускает файл прежней картинки после смены картинки поста'''
+
+    old = instance._loaded_image
+    if old and old != instance.image.name:
+        transaction.on_commit(partial(images.release, old))
+
+
+@receiver(post_delete, sender=Post)
+def release_deleted_image(sender, instance, **kwargs):
+    if instance.image:
+        transaction.on_commit(partial(images.release, instance.image.name))
+
+
+@receiver(post_save, sender=Post)
+def enqueue_thumbnails(sender, instance, **kwargs):
+    '''Ставит новую картинку поста в очередь на миниатюры'''
+
+    name = instance.image.name if instance.image else None
+    if name and name != instance._loaded_image:
+        thumbnails.enqueue(name)
+    instance._loaded_image = name
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, update_fields=None, **kwargs):
+    '''Обновляет пост в поисковом индексе при смене текста'''
+
+    if update_fields is None or 'text' in update_fields:
+        search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.unindex_post(instance.pk)
@@ -0,0 +1,88 @@
+'''
+Денормализованные счетчики UserStats.
+
+Счетчики меняются F-выражениями из сигналов Post, Follow и Comment,
+поэтому страницы читают готовые значения вместо COUNT(*).
+Расхождения исправляет команда recount_stats.
+'''
+
+from collections import defaultdict
+
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, User, UserStats
+
+# Счетчик UserStats -> (модель, поле со ссылкой на пользователя).
+COUNTERS = {
+    'posts_count': (Post, 'author'),
+    'followers_count': (Follow, 'author'),
+    'following_count': (Follow, 'user'),
+    'comments_count': (Comment, 'author'),
+}
+
+
+def bump(user_id, **deltas):
+    '''Атомарно меняет счетчики пользователя на заданные приращения'''
+
+    UserStats.objects.filter(user_id=user_id).update(
+        **{name: F(name) + delta for name, delta in deltas.items()}
+    )
+
+
+def bump_many(name, deltas):
+    '''
+    Меняет счетчик name многим пользователям: deltas - приращения
+    по id пользователя. Один UPDATE на каждое различное приращение.
+    '''
+
+    users = defaultdict(list)
+    for user_id, delta in deltas.items():
+        users[delta].append(user_id)
+
+    for delta, user_ids in users.items():
+        UserStats.objects.filter(user_id__in=user_ids).update(
+            **{name: F(name) + delta}
+        )
+
+
+def count_subquery(model, field):
+    '''Подзапрос с числом строк model, ссылающихся на пользователя'''
+
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('user')})
+            .order_by().values(field)
+            .annotate(total=Count('pk')).values('total')
+        ),
+        0,
+    )
+
+
+def recount():
+    '''
+    Создает недостающие строки и пересчитывает все счетчики.
+    Возвращает число исправленных строк.
+    '''
+
+    missing = User.objects.filter(stats__isnull=True).values_list(
+        'pk', flat=True
+    )
+    UserStats.objects.bulk_create(
+        [UserStats(user_id=pk) for pk in missing]
+    )
+
+    actual = {
+        name: count_subquery(model, field)
+        for name, (model, field) in COUNTERS.items()
+    }
+
+    drifted = UserStats.objects.annotate(
+        **{f'actual_{name}': value for name, value in actual.items()}
+    ).exclude(
+        **{name: F(f'actual_{name}') for name in COUNTERS}
+    )
+
+    return UserStats.objects.filter(
+        pk__in=drifted.values('pk')
+    ).update(**actual)
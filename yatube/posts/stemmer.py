@@ -0,0 +1,147 @@
+'''
+Стеммер русского языка по алгоритму Snowball (Porter).
+
+Отрезает окончания, чтобы разные формы слова ("постов", "посты",
+"пост") попадали в индекс поиска одной основой.
+'''
+
+from functools import lru_cache
+
+VOWELS = 'аеиоуыэюя'
+
+
+def endings(*groups):
+    '''
+    Готовит таблицу окончаний: пары (длина, {окончание: группа})
+    от длинных к коротким, чтобы первое совпадение было самым длинным.
+    '''
+
+    table = {}
+    for group, words in enumerate(groups):
+        for ending in words:
+            table.setdefault(len(ending), {})[ending] = group
+
+    return sorted(table.items(), reverse=True)
+
+
+PERFECTIVE_GERUND = endings(
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+ADJECTIVE = endings(
+    (),
+    (
+        'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой',
+        'ем', 'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых',
+        'ую', 'юю', 'ая', 'яя', 'ою', 'ею',
+    ),
+)
+PARTICIPLE = endings(
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+REFLEXIVE = endings((), ('ся', 'сь'))
+VERB = endings(
+    (
+        'ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но',
+        'ет', 'ют', 'ны', 'ть', 'ешь', 'нно',
+    ),
+    (
+        'ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей',
+        'уй', 'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят',
+        'ует', 'уют', 'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю',
+    ),
+)
+NOUN = endings(
+    (),
+    (
+        'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи',
+        'ии', 'и', 'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием',
+        'ем', 'ам', 'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию',
+        'ью', 'ю', 'ия', 'ья', 'я',
+    ),
+)
+DERIVATIONAL = endings((), ('ость', 'ост'))
+SUPERLATIVE = endings((), ('ейше', 'ейш'))
+
+
+def regions(word):
+    '''Возвращает начала областей RV и R2'''
+
+    rv = r1 = r2 = len(word)
+    for i, char in enumerate(word):
+        if char in VOWELS:
+            rv = i + 1
+            break
+
+    for i in range(1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            r1 = i + 1
+            break
+
+    for i in range(r1 + 1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            r2 = i + 1
+            break
+
+    return rv, r2
+
+
+def cut(word, table, start):
+    '''
+    Отрезает самое длинное окончание из таблицы, лежащее в word[start:].
+    Окончания первой группы должны идти после "а" или "я".
+    Возвращает None, если подходящего окончания нет.
+    '''
+
+    for length, found in table:
+        if len(word) - length < start:
+            continue
+
+        group = found.get(word[-length:])
+        if group is None:
+            continue
+
+        stem = word[:-length]
+        if group == 0 and (len(stem) <= start or stem[-1] not in 'ая'):
+            return None
+
+        return stem
+
+    return None
+
+
+@lru_cache(maxsize=100000)
+def stem(word):
+    '''Возвращает основу слова в нижнем регистре'''
+
+    word = word.lower().replace('ё', 'е')
+    rv, r2 = regions(word)
+
+    # Шаг 1: деепричастие или возвратная частица с прилагательным,
+    # глаголом или существительным.
+    stemmed = cut(word, PERFECTIVE_GERUND, rv)
+    if stemmed is None:
+        word = cut(word, REFLEXIVE, rv) or word
+        stemmed = cut(word, ADJECTIVE, rv)
+        if stemmed is not None:
+            stemmed = cut(stemmed, PARTICIPLE, rv) or stemmed
+        else:
+            stemmed = cut(word, VERB, rv) or cut(word, NOUN, rv)
+    word = stemmed if stemmed is not None else word
+
+    # Шаг 2.
+    if word.endswith('и') and len(word) - 1 >= rv:
+        word = word[:-1]
+
+    # Шаг 3: словообразовательный суффикс в R2.
+    word = cut(word, DERIVATIONAL, r2) or word
+
+    # Шаг 4: превосходная степень, двойное "н" и мягкий знак.
+    word = cut(word, SUPERLATIVE, rv) or word
+    if word.endswith('нн') and len(word) - 1 >= rv:
+        word = word[:-1]
+    elif word.endswith('ь') and len(word) - 1 >= rv:
+        word = word[:-1]
+
+    return word
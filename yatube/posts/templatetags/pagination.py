@@ -0,0 +1,24 @@
+from django import template
+
+from ..utils import ELLIPSIS, elided_page_range
+
+register = template.Library()
+
+
+@register.simple_tag
+def page_links(page_obj, on_each_side=2, on_ends=1):
+    '''
+    Возвращает номера страниц для навигации вокруг page_obj
+    и ELLIPSIS на месте пропусков.
+    '''
+
+    return list(elided_page_range(
+        page_obj.number, page_obj.paginator.num_pages, on_each_side, on_ends
+    ))
+
+
+@register.filter
+def is_gap(value):
+    '''Пропуск в навигации вместо номера страницы'''
+
+    return value == ELLIPSIS
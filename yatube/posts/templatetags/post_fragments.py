@@ -0,0 +1,72 @@
+import hashlib
+
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from core import metrics
+
+register = template.Library()
+
+POST_TEMPLATE = 'posts/includes/post.html'
+
+
+def fragment_key(post, on_profile, in_group):
+    '''
+    Ключ фрагмента поста.
+    Дата изменения и число комментариев служат версией,
+    флаги - вариантами шаблона для профиля и группы.
+    Имя автора и адрес группы меняются без сохранения поста,
+    поэтому их хэш тоже входит в ключ.
+    '''
+
+    author = post.author
+    shown = '\0'.join([
+        author.username,
+        author.first_name,
+        author.last_name,
+        post.group.slug if post.group_id else '',
+    ])
+
+    return (
+        f'post_fragment:{post.pk}:{post.updated.timestamp()}:'
+        f'{getattr(post, "comments_count", "")}:'
+        f'{hashlib.md5(shown.encode()).hexdigest()}:'
+        f'{int(on_profile)}{int(in_group)}'
+    )
+
+
+@register.simple_tag(takes_context=True)
+def post_fragments(context, posts):
+    '''
+    Возвращает отрендеренные post.html для постов страницы.
+    Все фрагменты читаются одним get_many, недостающие
+    рендерятся и сохраняются одним set_many.
+    '''
+
+    request = context.get('request')
+    group = context.get('group')
+    match = getattr(request, 'resolver_match', None)
+    on_profile = match is not None and match.url_name == 'profile'
+
+    keys = [fragment_key(post, on_profile, bool(group)) for post in posts]
+    fragments = cache.get_many(keys)
+
+    missing = {}
+    for key, post in zip(keys, posts):
+        if key not in fragments:
+            missing[key] = render_to_string(
+                POST_TEMPLATE,
+                {'post': post, 'group': group},
+                request=request,
+            )
+    if missing:
+        cache.set_many(missing, settings.POST_FRAGMENT_TIMEOUT)
+        fragments.update(missing)
+    metrics.count_cache(
+        'fragment', hits=len(keys) - len(missing), misses=len(missing)
+    )
+
+    return [mark_safe(fragments[key]) for key in keys]
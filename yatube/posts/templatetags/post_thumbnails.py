@@ -0,0 +1,29 @@
+from django import template
+
+from .. import thumbnails
+from ..images import MIME_TYPES
+
+register = template.Library()
+
+
+@register.simple_tag
+def image_variants(file_):
+    '''
+    Источники <picture> из готовых вариантов картинки или None.
+    Последний формат (JPEG) идет в сам <img>, остальные - в <source>.
+    '''
+
+    found = thumbnails.ready_variants(file_)
+    if not found:
+        return None
+
+    sources = [
+        {
+            'type': MIME_TYPES[format_],
+            'srcset': ', '.join(f'{url} {width}w' for width, url in widths),
+            'src': widths[-1][1],
+        }
+        for format_, widths in found
+    ]
+
+    return {'sources': sources[:-1], 'img': sources[-1]}
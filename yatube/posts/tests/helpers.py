@@ -1,4 +1,9 @@
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# Предел SQL-запросов на одну страницу, не зависящий от числа постов.
+QUERY_BUDGET = 5
 
 
 def new_image():
@@ -16,3 +21,25 @@ def new_image():
         content=small_gif,
         content_type='image/gif'
     )
+
+
+class QueryBudgetMixin:
+    '''Проверка, что страница укладывается в бюджет SQL-запросов'''
+
+    query_budget = QUERY_BUDGET
+
+    def assertQueryBudget(self, client, url, budget=None):
+        budget = budget or self.query_budget
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+
+        sql = '\n'.join(query['sql'] for query in queries.captured_queries)
+        self.assertLessEqual(
+            len(queries),
+            budget,
+            f'{url} выполняет {len(queries)} запросов '
+            f'при бюджете {budget}:\n{sql}',
+        )
+
+        return response
@@ -0,0 +1,207 @@
+from datetime import timedelta
+from xml.etree import ElementTree
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.feedgenerator import rfc3339_date
+
+from ..atom import follow_token
+from ..models import Follow, Group, Post, User
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+POSTS_COUNT = 3
+
+
+def read(response):
+    '''Тело ответа, потокового или обычного'''
+
+    if response.streaming:
+        return b''.join(response.streaming_content)
+
+    return response.content
+
+
+def entries(response):
+    root = ElementTree.fromstring(read(response))
+
+    return [
+        entry.find(f'{ATOM}content').text
+        for entry in root.iter(f'{ATOM}entry')
+    ]
+
+
+class AtomFeedTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='auth', first_name='Лев', last_name='Толстой'
+        )
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.user)
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        for i in range(POSTS_COUNT):
+            cls.post = Post.objects.create(
+                author=cls.user,
+                group=cls.group,
+                text=f'Пост <{i}> & текст',
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.feeds = {
+            'group_feed': reverse(
+                'posts:group_feed', kwargs={'slug': 'test-slug'}
+            ),
+            'author_feed': reverse(
+                'posts:author_feed', kwargs={'username': 'auth'}
+            ),
+            'follow_feed': reverse(
+                'posts:follow_feed',
+                kwargs={'token': follow_token(self.reader)},
+            ),
+        }
+
+    def test_feeds_are_valid_atom(self):
+        '''Ленты - Atom с экранированным текстом, от новых к старым.'''
+
+        expected = [
+            f'Пост <{i}> & текст' for i in reversed(range(POSTS_COUNT))
+        ]
+        for name, feed in self.feeds.items():
+            with self.subTest(feed=name):
+                response = self.client.get(feed)
+
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(
+                    response['Content-Type'].startswith(
+                        'application/atom+xml'
+                    )
+                )
+                self.assertEqual(entries(response), expected)
+
+    def test_since_returns_only_newer_posts(self):
+        '''?since= оставляет посты, опубликованные позже.'''
+
+        since = (self.post.pub_date - timedelta(microseconds=1)).isoformat()
+        for name, feed in self.feeds.items():
+            with self.subTest(feed=name):
+                response = self.client.get(feed, {'since': since})
+
+                self.assertEqual(entries(response), [self.post.text])
+
+    def test_bad_since(self):
+        for name, feed in self.feeds.items():
+            with self.subTest(feed=name):
+                response = self.client.get(feed, {'since': 'вчера'})
+
+                self.assertEqual(response.status_code, 400)
+
+    def test_unchanged_feed_returns_304(self):
+        '''Совпавший ETag дает 304 с пустым телом.'''
+
+        for name, feed in self.feeds.items():
+            with self.subTest(feed=name):
+                response = self.client.get(feed)
+                read(response)
+
+                repeated = self.client.get(
+                    feed, HTTP_IF_NONE_MATCH=response['ETag']
+                )
+
+                self.assertEqual(repeated.status_code, 304)
+                self.assertFalse(repeated.content)
+
+    def test_cached_until_new_post(self):
+        '''Лента группы и автора кэшируется до нового поста в ней.'''
+
+        for name in ('group_feed', 'author_feed'):
+            with self.subTest(feed=name):
+                read(self.client.get(self.feeds[name]))
+
+                with CaptureQueriesContext(connection) as queries:
+                    cached = self.client.get(self.feeds[name])
+                self.assertFalse(cached.streaming)
+                self.assertLessEqual(len(queries.captured_queries), 1)
+
+        Post.objects.create(
+            author=self.user, group=self.group, text='Новый пост'
+        )
+
+        for name in ('group_feed', 'author_feed'):
+            with self.subTest(feed=name):
+                fresh = self.client.get(self.feeds[name])
+
+                self.assertEqual(entries(fresh)[0], 'Новый пост')
+
+    def test_links_follow_request_host(self):
+        '''
+        Закэшированная лента не отдает ссылки чужого хоста,
+        а rel="self" не тащит посторонние параметры запроса.
+        '''
+
+        for name in ('group_feed', 'author_feed'):
+            with self.subTest(feed=name):
+                for host in ('localhost', '127.0.0.1'):
+                    response = self.client.get(
+                        self.feeds[name], {'utm': 'x'}, HTTP_HOST=host
+                    )
+                    root = ElementTree.fromstring(read(response))
+                    links = [
+                        link.get('href') for link in root.iter(f'{ATOM}link')
+                    ]
+
+                    self.assertTrue(all(
+                        link.startswith(f'http://{host}/') for link in links
+                    ))
+                    self.assertEqual(
+                        links[1], f'http://{host}{self.feeds[name]}'
+                    )
+
+    def test_updated_is_latest_change(self):
+        '''<updated> ленты - самое позднее изменение среди ее постов.'''
+
+        oldest = Post.objects.order_by('pub_date').first()
+        edited = self.post.updated + timedelta(hours=1)
+        Post.objects.filter(pk=oldest.pk).update(updated=edited)
+
+        for name, feed in self.feeds.items():
+            with self.subTest(feed=name):
+                root = ElementTree.fromstring(read(self.client.get(feed)))
+
+                self.assertEqual(
+                    root.find(f'{ATOM}updated').text, rfc3339_date(edited)
+                )
+
+    def test_follow_feed_sees_new_post(self):
+        feed = self.feeds['follow_feed']
+        etag = self.client.get(feed)['ETag']
+        Post.objects.create(author=self.user, text='Новый пост')
+
+        response = self.client.get(feed, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(entries(response)[0], 'Новый пост')
+
+    def test_follow_feed_bad_token(self):
+        response = self.client.get(
+            reverse('posts:follow_feed', kwargs={'token': 'чужой'})
+        )
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_follow_page_links_feed(self):
+        reader_client = Client()
+        reader_client.force_login(self.reader)
+
+        response = reader_client.get(reverse('posts:follow_index'))
+
+        self.assertContains(response, self.feeds['follow_feed'])
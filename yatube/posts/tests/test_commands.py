@@ -0,0 +1,15 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+
+class ExplainQueriesCommandTests(TestCase):
+
+    def test_view_queries_use_indexes(self):
+        '''Запросы представлений не сканируют таблицы и не сортируют.'''
+
+        out = StringIO()
+        call_command('explain_queries', stdout=out)
+
+        self.assertIn('Все запросы используют индексы.', out.getvalue())
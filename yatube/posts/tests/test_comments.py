@@ -0,0 +1,87 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Post, User
+
+COMMENTS_PAGE_SIZE = 3
+COMMENTS_COUNT = 7
+
+
+@override_settings(COMMENTS_PAGE_SIZE=COMMENTS_PAGE_SIZE)
+class CommentPaginationTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+        for i in range(COMMENTS_COUNT):
+            Comment.objects.create(
+                post=cls.post, author=cls.user, text=f'Комментарий {i}'
+            )
+
+    def setUp(self):
+        self.detail_url = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk}
+        )
+        self.comments_url = reverse(
+            'posts:comments', kwargs={'post_id': self.post.pk}
+        )
+
+    def test_first_render_is_capped(self):
+        '''Страница поста выводит не больше COMMENTS_PAGE_SIZE.'''
+
+        response = self.client.get(self.detail_url)
+        comments = response.context['comments']
+
+        self.assertEqual(len(comments), COMMENTS_PAGE_SIZE)
+        self.assertEqual(comments[0].text, f'Комментарий {COMMENTS_COUNT - 1}')
+        self.assertContains(
+            response, f'?after={comments.paginator.next_cursor}'
+        )
+
+    def test_fragments_load_all_comments(self):
+        '''Фрагменты по курсору отдают остальные комментарии по порядку.'''
+
+        comments = self.client.get(self.detail_url).context['comments']
+        texts = [comment.text for comment in comments]
+        cursor = comments.paginator.next_cursor
+
+        while cursor:
+            response = self.client.get(self.comments_url, {'after': cursor})
+            page = response.context['comments']
+            texts += [comment.text for comment in page]
+            cursor = page.paginator.next_cursor
+
+        self.assertEqual(texts, [
+            f'Комментарий {i}' for i in reversed(range(COMMENTS_COUNT))
+        ])
+        self.assertTemplateUsed(response, 'posts/includes/comment_list.html')
+        self.assertNotContains(response, 'js-more-comments')
+
+    def test_json_format(self):
+        '''?format=json отдает комментарии и курсор следующей страницы.'''
+
+        data = self.client.get(
+            self.comments_url, {'format': 'json'}
+        ).json()
+        following = self.client.get(
+            self.comments_url, {'format': 'json', 'after': data['next']}
+        ).json()
+
+        self.assertEqual(len(data['comments']), COMMENTS_PAGE_SIZE)
+        self.assertEqual(data['comments'][0]['author'], 'auth')
+        self.assertEqual(
+            following['comments'][0]['text'],
+            f'Комментарий {COMMENTS_COUNT - COMMENTS_PAGE_SIZE - 1}',
+        )
+
+    def test_fragment_query_count(self):
+        '''Фрагмент читается одним запросом, авторы через JOIN.'''
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.comments_url)
+
+        self.assertEqual(len(queries.captured_queries), 1)
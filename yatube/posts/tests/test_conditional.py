@@ -0,0 +1,110 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+
+
+class ConditionalGetTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            group=cls.group,
+            text='Тестовый пост',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.pages = {
+            'post_detail': reverse(
+                'posts:post_detail', kwargs={'post_id': self.post.pk}
+            ),
+            'group': reverse('posts:group', kwargs={'slug': 'test-slug'}),
+            'profile': reverse('posts:profile', kwargs={'username': 'auth'}),
+        }
+
+    def test_unchanged_page_returns_304_without_queries(self):
+        '''Совпавший ETag дает 304 без выборки постов и рендеринга.'''
+
+        for name, page in self.pages.items():
+            with self.subTest(page=name):
+                etag = self.client.get(page)['ETag']
+
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(page, HTTP_IF_NONE_MATCH=etag)
+
+                self.assertEqual(response.status_code, 304)
+                self.assertFalse(response.content)
+                self.assertLessEqual(len(queries.captured_queries), 1)
+                for query in queries.captured_queries:
+                    self.assertNotIn('posts_comment', query['sql'])
+
+    def test_if_modified_since_returns_304(self):
+        '''Неизмененная с Last-Modified страница дает 304.'''
+
+        for name, page in self.pages.items():
+            with self.subTest(page=name):
+                modified = self.client.get(page)['Last-Modified']
+                response = self.client.get(
+                    page, HTTP_IF_MODIFIED_SINCE=modified
+                )
+                self.assertEqual(response.status_code, 304)
+
+    def test_comment_changes_post_etag(self):
+        '''Новый комментарий меняет ETag страницы поста.'''
+
+        page = self.pages['post_detail']
+        etag = self.client.get(page)['ETag']
+
+        Comment.objects.create(post=self.post, author=self.reader, text='Да')
+
+        response = self.client.get(page, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Да')
+
+    def test_follow_changes_profile_etag(self):
+        '''Подписка меняет ETag профиля автора.'''
+
+        page = self.pages['profile']
+        etag = self.reader_client.get(page)['ETag']
+
+        Follow.objects.create(user=self.reader, author=self.user)
+
+        response = self.reader_client.get(page, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['following'])
+
+    def test_etag_depends_on_user_and_query(self):
+        '''ETag различается для пользователей и параметров адреса.'''
+
+        page = self.pages['group']
+        etags = {
+            self.client.get(page)['ETag'],
+            self.reader_client.get(page)['ETag'],
+            self.client.get(page, {'page': 1})['ETag'],
+        }
+
+        self.assertEqual(len(etags), 3)
+
+    def test_missing_post_still_404(self):
+        '''Для несуществующего поста валидаторов нет, ответ 404.'''
+
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': 10 ** 6})
+        )
+
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,132 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import feed
+from ..models import FeedEntry, Follow, Post, User
+
+
+class FeedTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_new_post_pushed_to_follower_feed(self):
+        '''Новый пост попадает в ленту подписчика.'''
+
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Пост')
+
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+
+    def test_follow_backfills_and_unfollow_trims_feed(self):
+        '''Подписка заполняет ленту, отписка ее очищает.'''
+
+        post = Post.objects.create(author=self.author, text='Пост')
+
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(
+            list(self.reader.feed.values_list('post', flat=True)),
+            [post.pk],
+        )
+
+        Follow.objects.filter(user=self.reader).delete()
+        self.assertFalse(self.reader.feed.exists())
+
+    @override_settings(FEED_MAX_LENGTH=2)
+    def test_feed_capped(self):
+        '''
+        Новый пост не обрезает ленты, их обрезает trim_feeds
+        до FEED_MAX_LENGTH записей.
+        '''
+
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = [
+            Post.objects.create(author=self.author, text=f'Пост {i}')
+            for i in range(4)
+        ]
+        self.assertEqual(self.reader.feed.count(), 4)
+
+        out = StringIO()
+        call_command('trim_feeds', stdout=out)
+
+        self.assertIn('Обрезано лент: 1', out.getvalue())
+        self.assertEqual(
+            set(self.reader.feed.values_list('post', flat=True)),
+            {posts[-1].pk, posts[-2].pk},
+        )
+
+    @override_settings(FEED_MAX_LENGTH=2)
+    def test_trim_keeps_cap_with_equal_dates(self):
+        '''Посты с одной датой не обрезаются ниже FEED_MAX_LENGTH.'''
+
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = [
+            Post.objects.create(author=self.author, text=f'Пост {i}')
+            for i in range(4)
+        ]
+        FeedEntry.objects.update(pub_date=timezone.now())
+
+        self.assertTrue(feed.trim(self.reader.pk))
+
+        self.assertEqual(
+            set(self.reader.feed.values_list('post', flat=True)),
+            {posts[-1].pk, posts[-2].pk},
+        )
+
+    def test_grown_feeds(self):
+        '''Проход после since смотрит только ленты с новыми постами.'''
+
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=other, author=self.reader)
+        Post.objects.create(author=self.reader, text='Старый')
+        since = timezone.now()
+        Post.objects.create(author=self.author, text='Новый')
+
+        self.assertEqual(list(feed.grown_feeds(since)), [self.reader.pk])
+        self.assertCountEqual(
+            feed.grown_feeds(), [self.reader.pk, other.pk]
+        )
+
+    def test_post_create_does_not_scan_follower_feeds(self):
+        '''Новый пост не ищет границу в лентах подписчиков.'''
+
+        for i in range(5):
+            Follow.objects.create(
+                user=User.objects.create_user(username=f'f{i}'),
+                author=self.author,
+            )
+
+        with CaptureQueriesContext(connection) as queries:
+            Post.objects.create(author=self.author, text='Пост')
+
+        self.assertFalse(any(
+            'OFFSET' in query['sql'] for query in queries.captured_queries
+        ))
+
+    @override_settings(FEED_CELEBRITY_THRESHOLD=1)
+    def test_celebrity_posts_merged_on_read(self):
+        '''Посты знаменитостей не раскладываются, а читаются напрямую.'''
+
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Пост')
+
+        self.assertFalse(self.reader.feed.exists())
+
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        self.assertIn(post, response.context['page_obj'])
@@ -0,0 +1,82 @@
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from core import cache as page_cache
+from ..models import Group, Post, User
+from ..templatetags.post_fragments import fragment_key
+
+
+class PostFragmentTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            group=cls.group,
+            text='Тестовый пост',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.group_url = reverse('posts:group', kwargs={'slug': 'test-slug'})
+
+    def test_fragment_reused_between_renders(self):
+        '''Фрагмент поста берется из кэша, пока пост не изменился.'''
+
+        self.client.get(self.group_url)
+        post = Post.objects.for_listing().get(pk=self.post.pk)
+        self.assertIsNotNone(cache.get(fragment_key(post, False, True)))
+
+        Post.objects.filter(pk=self.post.pk).update(text='Без сигналов')
+        page_cache.bump('group:test-slug')
+
+        response = self.client.get(self.group_url)
+        self.assertContains(response, 'Тестовый пост')
+
+    def test_variants_cached_separately(self):
+        '''Группа и профиль получают разные варианты фрагмента.'''
+
+        self.client.get(self.group_url)
+        response = self.client.get(
+            reverse('posts:profile', kwargs={'username': 'auth'})
+        )
+
+        self.assertContains(response, 'все записи группы')
+        self.assertNotContains(response, 'все посты пользователя')
+
+    def test_post_edit_invalidates_fragment(self):
+        '''Редактирование поста сбрасывает его фрагмент.'''
+
+        self.client.get(self.group_url)
+
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            data={'text': 'Отредактированный пост', 'group': self.group.pk},
+        )
+
+        response = self.client.get(self.group_url)
+        self.assertContains(response, 'Отредактированный пост')
+        self.assertNotContains(response, 'Тестовый пост')
+
+    def test_author_rename_invalidates_fragment(self):
+        '''Новое имя автора видно в ленте без правки поста.'''
+
+        self.client.get(self.group_url)
+
+        User.objects.filter(pk=self.user.pk).update(
+            first_name='Лев', last_name='Толстой'
+        )
+        page_cache.bump('group:test-slug')
+
+        response = self.client.get(self.group_url)
+        self.assertContains(response, 'Автор: Лев Толстой')
@@ -0,0 +1,226 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from .. import images
+from ..constants import IMAGE_MAX_SIDE, IMAGE_RELEASE_GRACE
+from ..models import ImageRelease, Post, ThumbnailJob, User
+from .helpers import new_image
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+ORIENTATION = 0x0112
+ROTATED_90 = 6
+
+
+def upload(name, size, mode='RGB', format_='JPEG', color=0, **params):
+    buffer = BytesIO()
+    Image.new(mode, size, color).save(buffer, format_, **params)
+
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+def photo(size=(3000, 1000)):
+    '''JPEG с EXIF: повернуть на 90 градусов'''
+
+    exif = Image.Exif()
+    exif[ORIENTATION] = ROTATED_90
+
+    return upload('photo.jpg', size, exif=exif.tobytes())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImagePipelineTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_upload_rotated_capped_and_stripped(self):
+        '''Картинка повернута по EXIF, ужата и сохранена без EXIF.'''
+
+        post = Post.objects.create(
+            author=self.user, text='Фото', image=photo()
+        )
+
+        with Image.open(post.image.path) as stored:
+            self.assertEqual(stored.format, 'JPEG')
+            self.assertEqual(stored.height, IMAGE_MAX_SIDE)
+            self.assertLess(stored.width, stored.height)
+            self.assertNotIn(ORIENTATION, stored.getexif())
+            self.assertEqual(
+                (post.image_width, post.image_height), stored.size
+            )
+
+        with open(post.image.path, 'rb') as stored:
+            digest = hashlib.sha256(stored.read()).hexdigest()
+        self.assertEqual(post.image_hash, digest)
+
+    def test_transparent_image_stays_png(self):
+        post = Post.objects.create(
+            author=self.user,
+            text='Логотип',
+            image=upload('logo.png', (10, 10), 'RGBA', 'PNG'),
+        )
+
+        self.assertTrue(post.image.name.endswith('.png'))
+        self.assertEqual((post.image_width, post.image_height), (10, 10))
+
+    def test_create_form_saves_image(self):
+        '''Форма создания поста принимает картинку.'''
+
+        self.client.post(
+            reverse('posts:post_create'),
+            {'text': 'Пост с картинкой', 'image': new_image()},
+        )
+
+        post = Post.objects.get(text='Пост с картинкой')
+        self.assertTrue(post.image)
+        self.assertEqual((post.image_width, post.image_height), (2, 1))
+
+    def test_clearing_image_resets_dimensions(self):
+        post = Post.objects.create(
+            author=self.user, text='Фото', image=new_image()
+        )
+
+        post.image = None
+        post.save()
+
+        post.refresh_from_db()
+        self.assertEqual(
+            (post.image_width, post.image_height, post.image_hash),
+            (None, None, ''),
+        )
+
+    def test_page_reserves_space_then_shows_srcset(self):
+        '''
+        До вариантов страница держит место под картинку по ее размерам,
+        после - выводит srcset и размеры в <img>.
+        '''
+
+        post = Post.objects.create(
+            author=self.user, text='Фото', image=photo((1200, 600))
+        )
+        url = reverse('posts:post_detail', kwargs={'post_id': post.pk})
+
+        response = self.client.get(url)
+        self.assertContains(response, 'aspect-ratio: 600 / 1200')
+
+        call_command('build_thumbnails', workers=1, stdout=StringIO())
+
+        response = self.client.get(url)
+        self.assertContains(response, 'width="600" height="1200"')
+        self.assertContains(response, ' 480w, ')
+        self.assertContains(response, ' 600w"')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class SharedImageTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        # Два репоста одной картинки и пост с другой.
+        self.posts = [
+            Post.objects.create(
+                author=self.user,
+                text=f'Репост {i}',
+                image=upload('repost.jpg', (30, 20), color=color),
+            )
+            for i, color in enumerate(('black', 'black', 'white'))
+        ]
+        self.name = self.posts[0].image.name
+        self.storage = self.posts[0].image.storage
+
+    def age(self, name):
+        past = time.time() - IMAGE_RELEASE_GRACE - 1
+        os.utime(self.storage.path(name), (past, past))
+
+    def test_duplicates_share_file_and_job(self):
+        '''Одинаковые картинки - один файл и одна задача на миниатюры.'''
+
+        self.assertEqual(self.posts[1].image.name, self.name)
+        self.assertNotEqual(self.posts[2].image.name, self.name)
+        self.assertEqual(
+            ThumbnailJob.objects.filter(image=self.name).count(), 1
+        )
+
+    def test_file_released_with_last_reference(self):
+        '''Файл удаляется, когда на него не ссылается ни один пост.'''
+
+        self.age(self.name)
+        self.posts[0].delete()
+        images.release(self.name)
+        self.assertTrue(self.storage.exists(self.name))
+
+        self.posts[1].delete()
+        images.release(self.name)
+        self.assertFalse(self.storage.exists(self.name))
+        self.assertFalse(ThumbnailJob.objects.filter(image=self.name).exists())
+
+    def test_recently_saved_file_kept(self):
+        '''Только что сохраненный файл не удаляется.'''
+
+        Post.objects.filter(image=self.name).delete()
+        images.release(self.name)
+
+        self.assertTrue(self.storage.exists(self.name))
+        self.assertTrue(ImageRelease.objects.filter(image=self.name).exists())
+
+    def test_deferred_release_after_grace(self):
+        '''
+        Отложенный файл удаляет release_images, когда пауза прошла,
+        а вновь использованный файл остается.
+        '''
+
+        other = self.posts[2].image.name
+        Post.objects.all().delete()
+        images.release(self.name)
+        images.release(other)
+        Post.objects.create(author=self.user, text='Снова', image=other)
+
+        call_command('release_images', stdout=StringIO())
+        self.assertTrue(self.storage.exists(self.name))
+
+        self.age(self.name)
+        self.age(other)
+        ImageRelease.objects.update(due=timezone.now())
+        output = StringIO()
+        call_command('release_images', stdout=output)
+
+        self.assertIn('Удалено картинок: 1', output.getvalue())
+        self.assertFalse(self.storage.exists(self.name))
+        self.assertFalse(ThumbnailJob.objects.filter(image=self.name).exists())
+        self.assertTrue(self.storage.exists(other))
+        self.assertFalse(ImageRelease.objects.exists())
@@ -1,7 +1,10 @@
+from django.db import connection
 from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
 
+from core.cache import get_generations
 from ..constants import MAX_LEN_TITLE
-from ..models import Group, Post, User
+from ..models import FeedEntry, Follow, Group, Post, User, UserStats
 
 
 class PostModelTest(TestCase):
@@ -72,3 +75,107 @@ class PostModelTest(TestCase):
                 self.assertEqual(
                     post._meta.get_field(field).help_text, value
                 )
+
+
+class FollowQuerySetTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.authors = [
+            User.objects.create_user(username=f'author{i}') for i in range(3)
+        ]
+        Post.objects.create(author=cls.authors[0], text='Пост')
+
+    def stats(self, user):
+        return UserStats.objects.get(pk=user.pk)
+
+    def test_follow_is_one_idempotent_query(self):
+        '''Подписка - один запрос, повторная ничего не меняет.'''
+
+        with CaptureQueriesContext(connection) as queries:
+            created = Follow.objects.follow(self.reader, 'author0')
+        # Остальные запросы - сигналы: счетчики и лента.
+        self.assertEqual(
+            [query['sql'] for query in queries.captured_queries
+             if 'posts_follow' in query['sql']
+             or 'auth_user' in query['sql']],
+            [queries.captured_queries[0]['sql']],
+        )
+        self.assertTrue(created)
+        self.assertFalse(Follow.objects.follow(self.reader, 'author0'))
+
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(self.stats(self.authors[0]).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        self.assertTrue(FeedEntry.objects.filter(user=self.reader).exists())
+
+    def test_follow_self_or_missing_author(self):
+        self.assertFalse(Follow.objects.follow(self.reader, 'reader'))
+        self.assertFalse(Follow.objects.follow(self.reader, 'missing'))
+
+        self.assertFalse(Follow.objects.exists())
+
+    def test_unfollow(self):
+        Follow.objects.follow(self.reader, 'author0')
+
+        self.assertTrue(Follow.objects.unfollow(self.reader, 'author0'))
+        self.assertFalse(Follow.objects.unfollow(self.reader, 'author0'))
+
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(self.stats(self.authors[0]).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+        self.assertFalse(FeedEntry.objects.filter(user=self.reader).exists())
+
+    def test_bulk_follow(self):
+        '''
+        Пачка подписок - один INSERT только новых, счетчики, ленты
+        и кэш меняются только для вставленных строк.
+        '''
+
+        Follow.objects.follow(self.reader, 'author0')
+        Post.objects.create(author=self.authors[1], text='Еще пост')
+        follows = [
+            Follow(user=self.reader, author=author)
+            for author in [*self.authors, self.reader]
+        ]
+        generation, = get_generations('author:author1')
+
+        created = Follow.objects.bulk_follow(follows)
+
+        self.assertEqual(
+            sorted(follow.author.username for follow in created),
+            ['author1', 'author2'],
+        )
+        self.assertTrue(all(follow.pk for follow in created))
+        self.assertEqual(Follow.objects.count(), 3)
+        self.assertEqual(self.stats(self.reader).following_count, 3)
+        self.assertEqual(
+            [self.stats(author).followers_count for author in self.authors],
+            [1, 1, 1],
+        )
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.reader).count(), 2
+        )
+        self.assertNotEqual(get_generations('author:author1'), [generation])
+
+    def test_bulk_follow_queries_do_not_grow(self):
+        '''Число запросов пачки не зависит от числа подписок.'''
+
+        authors = [
+            User.objects.create_user(username=f'many{i}') for i in range(20)
+        ]
+        for author in authors:
+            Post.objects.create(author=author, text='Пост')
+
+        # INSERT, два UPDATE счетчиков, лента, ее обрезка, имена.
+        with self.assertNumQueries(6):
+            created = Follow.objects.bulk_follow(
+                Follow(user=self.reader, author=author) for author in authors
+            )
+
+        self.assertEqual(len(created), 20)
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.reader).count(), 20
+        )
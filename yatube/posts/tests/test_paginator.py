@@ -1,8 +1,13 @@
+from django.core.cache import cache
+from django.db import connection
+from django.template.loader import render_to_string
 from django.urls import reverse
 from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
 
 from ..models import Group, Post, User
 from ..constants import POSTS_LIMIT
+from ..utils import ELLIPSIS, ApproximatePaginator, elided_page_range
 
 COUNT_POSTS_PAGE_TWO = 3
 
@@ -28,6 +33,7 @@ class PaginatorTests(TestCase):
             )
 
     def setUp(self):
+        cache.clear()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
 
@@ -62,3 +68,173 @@ class PaginatorTests(TestCase):
                 response = self.client.get(page + '?page=2')
                 self.assertEqual(len(response.context['page_obj']),
                                  COUNT_POSTS_PAGE_TWO)
+
+    def test_keyset_pages_follow_cursor(self):
+        '''Курсоры ?after=/?before= листают страницы без пропусков.'''
+
+        page = reverse('posts:group', kwargs={'slug': f'{self.group.slug}'})
+
+        first = self.client.get(page).context['page_obj']
+        self.assertIsNone(first.paginator.previous_cursor)
+
+        second = self.client.get(
+            page, {'after': first.paginator.next_cursor}
+        ).context['page_obj']
+        self.assertEqual(len(second), COUNT_POSTS_PAGE_TWO)
+        self.assertIsNone(second.paginator.next_cursor)
+        self.assertEqual(
+            list(first) + list(second),
+            list(Post.objects.filter(group=self.group)),
+        )
+
+        back = self.client.get(
+            page, {'before': second.paginator.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(back), list(first))
+
+    def test_keyset_page_skips_count_query(self):
+        '''Курсорная страница не выполняет COUNT(*) и OFFSET.'''
+
+        page = reverse('posts:group', kwargs={'slug': f'{self.group.slug}'})
+        first = self.client.get(page).context['page_obj']
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(page, {'after': first.paginator.next_cursor})
+
+        for query in queries.captured_queries:
+            with self.subTest(sql=query['sql']):
+                self.assertFalse(query['sql'].startswith('SELECT COUNT('))
+                self.assertNotIn('OFFSET', query['sql'])
+
+    def test_broken_cursor_returns_first_page(self):
+        '''Битый курсор отдает первую страницу.'''
+
+        response = self.client.get(reverse('posts:index'), {'after': '%%%'})
+        self.assertEqual(len(response.context['page_obj']), POSTS_LIMIT)
+
+    def test_numbered_page_uses_cached_count(self):
+        '''?page= считает посты без аннотаций и берет число из кэша.'''
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('posts:index'), {'page': 2})
+        counts = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('SELECT COUNT(')
+        ]
+        self.assertEqual(len(counts), 1)
+        self.assertNotIn('posts_comment', counts[0])
+
+        paginator = ApproximatePaginator(Post.objects.all(), POSTS_LIMIT)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(
+                paginator.count, POSTS_LIMIT + COUNT_POSTS_PAGE_TWO
+            )
+        self.assertEqual(len(queries.captured_queries), 0)
+
+    def test_underestimated_count_keeps_next_page(self):
+        '''Заниженная оценка не прячет следующую страницу.'''
+
+        paginator = ApproximatePaginator(Post.objects.all(), POSTS_LIMIT, 1)
+        self.assertTrue(paginator.is_approximate)
+
+        first = paginator.get_page(1)
+        self.assertEqual(len(first), POSTS_LIMIT)
+        self.assertTrue(first.has_next())
+
+        last = paginator.get_page(2)
+        self.assertEqual(len(last), COUNT_POSTS_PAGE_TWO)
+        self.assertFalse(last.has_next())
+        self.assertFalse(paginator.is_approximate)
+        self.assertEqual(paginator.count, POSTS_LIMIT + COUNT_POSTS_PAGE_TWO)
+
+    def test_stale_cached_count_does_not_hide_new_pages(self):
+        '''
+        Устаревшее число в кэше не запирает читателя на старой
+        последней странице: страницы за ним проверяются по строкам,
+        а новая оценка сохраняется.
+        '''
+
+        ApproximatePaginator(Post.objects.all(), POSTS_LIMIT).get_page(1)
+        for i in range(POSTS_LIMIT * 2):
+            Post.objects.create(author=self.user, text=f'Новый {i}')
+
+        paginator = ApproximatePaginator(Post.objects.all(), POSTS_LIMIT)
+        page = paginator.get_page(3)
+        self.assertEqual(page.number, 3)
+        self.assertTrue(page.has_next())
+
+        paginator = ApproximatePaginator(Post.objects.all(), POSTS_LIMIT)
+        self.assertGreaterEqual(paginator.num_pages, 4)
+        page = paginator.get_page(4)
+        self.assertEqual(page.number, 4)
+        self.assertEqual(len(page), COUNT_POSTS_PAGE_TWO)
+        self.assertFalse(page.has_next())
+
+    def test_page_past_estimate_without_rows_returns_last_page(self):
+        ApproximatePaginator(Post.objects.all(), POSTS_LIMIT).get_page(1)
+
+        paginator = ApproximatePaginator(Post.objects.all(), POSTS_LIMIT)
+        page = paginator.get_page(9)
+
+        self.assertEqual(page.number, 2)
+        self.assertFalse(page.has_next())
+
+    def test_overestimated_count_returns_last_page(self):
+        '''Завышенная оценка отдает настоящую последнюю страницу.'''
+
+        paginator = ApproximatePaginator(
+            Post.objects.all(), POSTS_LIMIT, POSTS_LIMIT * 10
+        )
+        page = paginator.get_page(7)
+
+        self.assertEqual(page.number, 2)
+        self.assertEqual(len(page), COUNT_POSTS_PAGE_TWO)
+        self.assertEqual(paginator.num_pages, 2)
+
+    def test_profile_marks_approximate_pages(self):
+        '''Профиль берет число постов из счетчика и помечает оценку.'''
+
+        self.user.stats.posts_count = POSTS_LIMIT * 3
+        self.user.stats.save()
+        page = reverse('posts:profile', kwargs={'username': self.user})
+
+        response = self.client.get(page, {'page': 1})
+        self.assertEqual(response.context['page_obj'].paginator.num_pages, 3)
+        self.assertContains(response, '&asymp;3')
+
+        response = self.client.get(page, {'page': 2})
+        self.assertEqual(response.context['page_obj'].paginator.num_pages, 2)
+        self.assertNotContains(response, '&asymp;')
+
+    def test_elided_page_range(self):
+        '''Навигация: края, окно вокруг текущей и пропуски.'''
+
+        cases = (
+            (1, 1, [1]),
+            (3, 7, [1, 2, 3, 4, 5, 6, 7]),
+            (1, 100, [1, 2, 3, ELLIPSIS, 100]),
+            (50, 100, [1, ELLIPSIS, 48, 49, 50, 51, 52, ELLIPSIS, 100]),
+            (100, 100, [1, ELLIPSIS, 98, 99, 100]),
+        )
+        for number, num_pages, expected in cases:
+            with self.subTest(number=number, num_pages=num_pages):
+                self.assertEqual(
+                    list(elided_page_range(number, num_pages)), expected
+                )
+
+    def test_paginator_size_does_not_depend_on_pages(self):
+        '''Размер навигации одинаков для 100 и миллиона страниц.'''
+
+        sizes = set()
+        for count in (POSTS_LIMIT * 100, POSTS_LIMIT * 10 ** 6):
+            paginator = ApproximatePaginator(
+                Post.objects.all(), POSTS_LIMIT, count
+            )
+            page_obj = paginator.get_page(1)
+            page_obj.number = paginator.num_pages // 2
+            html = render_to_string(
+                'posts/includes/paginator.html', {'page_obj': page_obj}
+            )
+            sizes.add(html.count('<li'))
+
+        self.assertEqual(len(sizes), 1)
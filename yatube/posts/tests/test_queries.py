@@ -0,0 +1,57 @@
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from ..constants import POSTS_LIMIT
+from ..models import Comment, Follow, Group, Post, User
+from .helpers import QueryBudgetMixin
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+
+        for i in range(POSTS_LIMIT):
+            author = User.objects.create_user(username=f'author_{i}')
+            Follow.objects.create(user=cls.user, author=author)
+            post = Post.objects.create(
+                author=author,
+                group=cls.group,
+                text=f'Тестовый пост {i}',
+            )
+            Comment.objects.create(post=post, author=author, text='comment')
+
+        cls.post = post
+        cls.author = author
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_views_fit_query_budget(self):
+        '''Страницы не выполняют запросы на каждый пост.'''
+
+        pages = [
+            reverse('posts:index'),
+            reverse('posts:group', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': 'auth'}),
+            reverse(
+                'posts:profile',
+                kwargs={'username': self.author.username},
+            ),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+            reverse('posts:follow_index'),
+        ]
+
+        for page in pages:
+            with self.subTest(page=page):
+                self.assertQueryBudget(self.authorized_client, page)
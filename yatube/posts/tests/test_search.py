@@ -0,0 +1,145 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import search
+from ..constants import POSTS_LIMIT
+from ..models import Post, User
+from ..stemmer import stem
+
+
+class StemmerTests(TestCase):
+
+    def test_word_forms_share_stem(self):
+        '''Формы одного слова сводятся к одной основе.'''
+
+        for forms in (
+            ('пост', 'постами', 'постов', 'посты'),
+            ('важный', 'важного', 'важнейшие'),
+            ('валяться', 'валялась', 'валяются'),
+        ):
+            with self.subTest(forms=forms):
+                self.assertEqual(len({stem(word) for word in forms}), 1)
+
+
+class SearchTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Длинные посты о программировании',
+        )
+        Post.objects.create(author=cls.user, text='Фотографии котов')
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('posts:search')
+
+    def found(self, query, **params):
+        response = self.client.get(self.url, {'q': query, **params})
+
+        return list(response.context['page_obj'])
+
+    def test_search_matches_word_forms(self):
+        '''Поиск находит пост по другой форме слова.'''
+
+        self.assertEqual(self.found('пост программирование'), [self.post])
+        self.assertEqual(self.found('ПОСТАМИ'), [self.post])
+        self.assertEqual(self.found('собаки'), [])
+
+    def test_empty_query_has_no_results(self):
+        '''Без запроса показывается только форма.'''
+
+        response = self.client.get(self.url)
+
+        self.assertIsNone(response.context['page_obj'])
+
+    def test_index_follows_edit_and_delete(self):
+        '''Индекс обновляется при изменении и удалении поста.'''
+
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Рецепты супов'
+        post.save()
+        self.assertEqual(self.found('посты'), [])
+        self.assertEqual(self.found('суп'), [post])
+
+        post.delete()
+        self.assertEqual(self.found('суп'), [])
+
+    def test_newer_post_ranked_higher(self):
+        '''При равной релевантности выше более свежий пост.'''
+
+        newer = Post.objects.create(
+            author=self.user,
+            text='Длинные посты о программировании',
+        )
+        Post.objects.filter(pk=self.post.pk).update(
+            pub_date=timezone.now() - timedelta(days=365)
+        )
+        search.rebuild()
+
+        self.assertEqual(self.found('посты'), [newer, self.post])
+
+    def test_cursor_pagination(self):
+        '''Результаты листаются курсором без повторов.'''
+
+        Post.objects.bulk_create([
+            Post(author=self.user, text=f'Пост номер {i}')
+            for i in range(POSTS_LIMIT + 2)
+        ])
+        search.rebuild()
+
+        response = self.client.get(self.url, {'q': 'пост'})
+        first = list(response.context['page_obj'])
+        cursor = response.context['page_obj'].paginator.next_cursor
+        second = self.found('пост', after=cursor)
+
+        self.assertEqual(len(first), POSTS_LIMIT)
+        self.assertEqual(len(second), 3)
+        self.assertFalse(set(first) & set(second))
+        self.assertContains(response, '?q=%D0%BF%D0%BE%D1%81%D1%82&after')
+
+    @override_settings(SEARCH_MAX_CANDIDATES=2)
+    def test_limited_candidates_noted(self):
+        '''
+        Когда совпадений больше SEARCH_MAX_CANDIDATES, страница
+        предупреждает, что ранжированы только последние из них.
+        '''
+
+        notice = 'показаны лучшие из самых новых'
+        self.assertNotContains(
+            self.client.get(self.url, {'q': 'пост'}), notice
+        )
+
+        Post.objects.bulk_create([
+            Post(author=self.user, text=f'Пост номер {i}') for i in range(2)
+        ])
+        search.rebuild()
+        response = self.client.get(self.url, {'q': 'пост'})
+
+        self.assertEqual(len(response.context['page_obj']), 2)
+        self.assertContains(response, notice)
+        self.assertNotContains(
+            self.client.get(self.url, {'q': 'котов'}), notice
+        )
+
+    def test_admin_search_uses_index(self):
+        '''Поиск в админке идет по тому же индексу.'''
+
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        client = Client()
+        client.force_login(admin)
+
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'постами'}
+        )
+
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.post]
+        )
@@ -0,0 +1,72 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from ..models import Comment, Follow, Post, User, UserStats
+
+
+class UserStatsTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_counters_follow_rows(self):
+        '''Счетчики меняются при создании и удалении строк.'''
+
+        post = Post.objects.create(author=self.author, text='Пост')
+        Comment.objects.create(post=post, author=self.reader, text='c')
+        Follow.objects.create(user=self.reader, author=self.author)
+
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        self.assertEqual(self.stats(self.reader).comments_count, 1)
+
+        post.delete()
+        Follow.objects.all().delete()
+
+        self.assertEqual(self.stats(self.author).posts_count, 0)
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+        self.assertEqual(self.stats(self.reader).comments_count, 0)
+
+    def test_recount_stats_repairs_drift(self):
+        '''Команда recount_stats исправляет расхождения.'''
+
+        Post.objects.create(author=self.author, text='Пост')
+        UserStats.objects.filter(user=self.author).update(posts_count=7)
+        UserStats.objects.filter(user=self.reader).delete()
+
+        out = StringIO()
+        call_command('recount_stats', stdout=out)
+
+        self.assertIn('Исправлено записей статистики: 1', out.getvalue())
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.reader).posts_count, 0)
+
+    def test_profile_reads_stored_counters(self):
+        '''Профиль выводит сохраненные счетчики.'''
+
+        UserStats.objects.filter(user=self.author).update(
+            posts_count=11, followers_count=22, following_count=33
+        )
+
+        response = self.reader_client.get(
+            reverse('posts:profile', kwargs={'username': 'author'})
+        )
+
+        self.assertContains(response, 'Всего постов: 11')
+        self.assertContains(response, 'Всего подписок: 33')
+        self.assertContains(response, 'Всего подписчиков: 22')
@@ -0,0 +1,110 @@
+import shutil
+from io import StringIO
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import thumbnails
+from ..constants import THUMBNAIL_JOB_ATTEMPTS
+from ..models import Post, ThumbnailJob, User
+from .helpers import new_image
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailPipelineTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            author=self.user,
+            text='Тестовый пост',
+            image=new_image(),
+        )
+        self.url = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk}
+        )
+
+    def test_new_image_enqueued_once(self):
+        '''Новая картинка ставится в очередь один раз.'''
+
+        self.post.text = 'Правка без новой картинки'
+        self.post.save()
+        self.client.get(self.url)
+
+        self.assertEqual(
+            list(ThumbnailJob.objects.values_list('image', flat=True)),
+            [self.post.image.name],
+        )
+
+    def test_placeholder_until_thumbnail_built(self):
+        '''До построения миниатюры шаблон выводит заглушку.'''
+
+        response = self.client.get(self.url)
+        self.assertNotContains(response, '<img class="card-img')
+
+        call_command('build_thumbnails', workers=1, stdout=StringIO())
+
+        self.assertFalse(ThumbnailJob.objects.exists())
+        response = self.client.get(self.url)
+        self.assertContains(response, '<img class="card-img')
+
+    def test_render_does_not_write(self):
+        '''Страница с неготовой картинкой не пишет в базу.'''
+
+        ThumbnailJob.objects.all().delete()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [query['sql'] for query in queries.captured_queries
+             if not query['sql'].startswith('SELECT')],
+            [],
+        )
+        self.assertFalse(ThumbnailJob.objects.exists())
+
+    def test_failed_job_kept_and_not_retried(self):
+        '''
+        Задача, исчерпавшая попытки, остается с отметкой failed:
+        ее не берет воркер и не сбрасывает повторная постановка.
+        '''
+
+        with mock.patch.object(
+            thumbnails, 'build', side_effect=OSError
+        ) as build:
+            for _ in range(THUMBNAIL_JOB_ATTEMPTS + 1):
+                call_command('build_thumbnails', workers=1, stdout=StringIO())
+            thumbnails.enqueue(self.post.image.name)
+            call_command('build_thumbnails', workers=1, stdout=StringIO())
+
+        self.assertEqual(build.call_count, THUMBNAIL_JOB_ATTEMPTS)
+        job = ThumbnailJob.objects.get()
+        self.assertEqual(job.attempts, THUMBNAIL_JOB_ATTEMPTS)
+        self.assertIsNotNone(job.failed)
+
+        call_command(
+            'build_thumbnails', workers=1, retry_failed=True,
+            stdout=StringIO(),
+        )
+
+        self.assertFalse(ThumbnailJob.objects.exists())
@@ -0,0 +1,145 @@
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import search
+from ..models import Comment, FeedEntry, Follow, Group, Post, User, UserStats
+from ..transfer import Importer
+
+
+class TransferCommandsTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        for name in os.listdir(self.tmp):
+            os.remove(os.path.join(self.tmp, name))
+        os.rmdir(self.tmp)
+
+    def path(self, name):
+        return os.path.join(self.tmp, name)
+
+    def write(self, name, records):
+        with open(self.path(name), 'w', encoding='utf-8') as file:
+            for record in records:
+                file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+        return self.path(name)
+
+    def import_file(self, path, **options):
+        out = StringIO()
+        call_command('import_posts', path, stdout=out, **options)
+
+        return out.getvalue()
+
+    def round_trip(self, name):
+        old_date = timezone.now() - timedelta(days=30)
+        post = Post.objects.create(
+            author=self.author, group=self.group, text='Старые посты'
+        )
+        Post.objects.filter(pk=post.pk).update(pub_date=old_date)
+        Comment.objects.create(post=post, author=self.reader, text='Ответ')
+        Follow.objects.create(user=self.reader, author=self.author)
+
+        call_command(
+            'export_posts', self.path(name), stderr=StringIO()
+        )
+        Post.objects.all().delete()
+        Follow.objects.all().delete()
+
+        output = self.import_file(self.path(name))
+
+        post = Post.objects.get()
+        self.assertIn('строк/с', output)
+        self.assertEqual(post.pub_date, old_date)
+        self.assertEqual(post.group, self.group)
+        self.assertEqual(post.comments.get().author, self.reader)
+        self.assertTrue(
+            Follow.objects.filter(user=self.reader, author=self.author)
+            .exists()
+        )
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        author_stats = UserStats.objects.get(user=self.author)
+        self.assertEqual(author_stats.posts_count, 1)
+        self.assertEqual(author_stats.followers_count, 1)
+        self.assertEqual(
+            search.ranked_ids(search.match_expression('пост'))[0][0],
+            post.pk,
+        )
+
+    def test_jsonl_round_trip(self):
+        '''Выгрузка в JSONL и загрузка обратно сохраняют данные.'''
+
+        self.round_trip('dump.jsonl')
+
+    def test_csv_round_trip(self):
+        '''Выгрузка в CSV и загрузка обратно сохраняют данные.'''
+
+        self.round_trip('dump.csv')
+
+    def test_import_creates_authors_and_ids(self):
+        '''Загрузка заводит новых авторов и выдает id записям без id.'''
+
+        path = self.write('seed.jsonl', [
+            {'type': 'post', 'author': 'newbie', 'text': f'Пост {i}'}
+            for i in range(5)
+        ])
+
+        self.import_file(path, batch_size=2)
+
+        newbie = User.objects.get(username='newbie')
+        self.assertFalse(newbie.has_usable_password())
+        self.assertEqual(newbie.posts.count(), 5)
+        self.assertEqual(UserStats.objects.get(user=newbie).posts_count, 5)
+
+    def test_new_authors_have_stats_before_finish(self):
+        '''Автор из прерванной загрузки получает счетчики и профиль.'''
+
+        path = self.write('seed.jsonl', [
+            {'type': 'post', 'author': 'newbie', 'text': 'Пост'},
+        ])
+
+        with mock.patch.object(Importer, 'finish'):
+            self.import_file(path)
+
+        self.assertTrue(UserStats.objects.filter(user__username='newbie'))
+        response = self.client.get(
+            reverse('posts:profile', kwargs={'username': 'newbie'})
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_bad_record_rejected(self):
+        '''Запись неизвестного типа прерывает загрузку с ошибкой.'''
+
+        path = self.write('bad.jsonl', [
+            {'type': 'post', 'author': 'author', 'text': 'Пост'},
+            {'type': 'like', 'author': 'author'},
+        ])
+
+        with self.assertRaises(CommandError):
+            self.import_file(path, batch_size=1)
+
+        self.assertEqual(Post.objects.count(), 1)
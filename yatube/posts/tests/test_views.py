@@ -48,6 +48,7 @@ class PostPagesTests(TestCase):
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
     def setUp(self):
+        cache.clear()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
 
@@ -137,6 +138,18 @@ class PostPagesTests(TestCase):
 
         self.assertEqual(response.context['following'], False)
 
+    def test_profile_without_stats_row(self):
+        '''Профиль автора без строки UserStats открывается.'''
+
+        User.objects.bulk_create([User(username='bulk', password='!')])
+
+        for query in ('', '?page=1'):
+            response = self.authorized_client.get(
+                reverse('posts:profile', kwargs={'username': 'bulk'})
+                + query
+            )
+            self.assertEqual(response.status_code, 200)
+
     def test_post_detail_show_correct_context(self):
         """Шаблон post_detail сформирован с правильным контекстом."""
 
@@ -221,7 +234,7 @@ class PostPagesTests(TestCase):
         """Корректная работа кеша"""
 
         response = self.client.get(reverse('posts:index'))
-        Post.objects.get(id=self.post.id).delete()
+        Post.objects.filter(id=self.post.id).update(text='Без сигналов')
         new_response = self.client.get(reverse('posts:index'))
         self.assertEqual(response.content, new_response.content)
 
@@ -229,6 +242,26 @@ class PostPagesTests(TestCase):
         new_response = self.client.get(reverse('posts:index'))
         self.assertNotEqual(response.content, new_response.content)
 
+    def test_cache_invalidated_by_changes(self):
+        """Изменение поста сразу сбрасывает кэш его страниц"""
+
+        pages = [
+            reverse('posts:index'),
+            reverse('posts:group', kwargs={'slug': f'{self.group.slug}'}),
+            reverse(
+                'posts:profile',
+                kwargs={'username': f'{self.user.username}'}
+            ),
+        ]
+        responses = [self.client.get(page) for page in pages]
+
+        Post.objects.get(id=self.post.id).delete()
+
+        for page, response in zip(pages, responses):
+            with self.subTest(page=page):
+                new_response = self.client.get(page)
+                self.assertNotEqual(response.content, new_response.content)
+
     def test_subscriptions_per_user(self):
         """Корректная подписка на других пользователей"""
 
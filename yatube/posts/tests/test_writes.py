@@ -0,0 +1,177 @@
+import threading
+from unittest import mock
+
+from django.db import IntegrityError, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from .. import writes
+from ..models import Comment, Follow, Post, User, UserStats
+from ..writes import COMMENT, FOLLOW, UNFOLLOW, Write
+
+THREADS = 8
+
+
+class FlushTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def comment(self, text):
+        return Write(
+            COMMENT, Comment(post=self.post, author=self.reader, text=text)
+        )
+
+    def test_mixed_writes_in_one_flush(self):
+        '''Комментарии, подписки и отписки пишутся одной пачкой.'''
+
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=self.reader, author=other)
+        batch = [
+            self.comment('один'),
+            self.comment('два'),
+            Write(FOLLOW, (self.reader, 'author')),
+            Write(FOLLOW, (self.reader, 'author')),
+            Write(FOLLOW, (self.reader, 'missing')),
+            Write(UNFOLLOW, (self.reader, 'other')),
+        ]
+
+        writes.flush(batch)
+
+        self.assertTrue(all(write.error is None for write in batch))
+        self.assertEqual(
+            [write.result for write in batch[2:5]], [True, False, False]
+        )
+        self.assertEqual(
+            list(self.post.comments.order_by('pk').values_list(
+                'text', flat=True
+            )),
+            ['один', 'два'],
+        )
+        self.assertEqual(
+            list(Follow.objects.values_list('author__username', flat=True)),
+            ['author'],
+        )
+        stats = UserStats.objects.get(user=self.reader)
+        self.assertEqual(stats.comments_count, 2)
+        self.assertEqual(stats.following_count, 1)
+
+    def test_batched_unfollows_report_each_pair(self):
+        '''
+        Отписки пачкой возвращают результат для каждой пары:
+        повтор и отписка от чужого автора получают False.
+        '''
+
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.reader, author=other)
+        batch = [
+            Write(UNFOLLOW, (self.reader, 'author')),
+            Write(UNFOLLOW, (self.reader, 'author')),
+            Write(UNFOLLOW, (self.reader, 'missing')),
+            Write(UNFOLLOW, (other, 'author')),
+            Write(UNFOLLOW, (self.reader, 'other')),
+        ]
+
+        writes.flush(batch)
+
+        self.assertEqual(
+            [write.result for write in batch],
+            [True, False, False, False, True],
+        )
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(
+            UserStats.objects.get(user=self.reader).following_count, 0
+        )
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).followers_count, 0
+        )
+
+    def test_existing_follow_not_duplicated(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+
+        self.assertFalse(writes.follow(self.reader, 'author'))
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).followers_count, 1
+        )
+
+    def test_failed_write_does_not_fail_batch(self):
+        '''Ошибку получает только плохая запись, остальные пишутся.'''
+
+        batch = [self.comment('один'), self.comment(None), self.comment('три')]
+
+        writes.flush(batch)
+
+        self.assertIsNone(batch[0].error)
+        self.assertIsInstance(batch[1].error, IntegrityError)
+        self.assertIsNone(batch[2].error)
+        self.assertEqual(
+            list(self.post.comments.order_by('pk').values_list(
+                'text', flat=True
+            )),
+            ['один', 'три'],
+        )
+
+    def test_error_raised_to_caller(self):
+        with self.assertRaises(IntegrityError):
+            writes.add_comment(
+                Comment(post=self.post, author=self.reader, text=None)
+            )
+
+
+@override_settings(
+    WRITE_COALESCING=True,
+    WRITE_COALESCING_DELAY=5,
+    WRITE_COALESCING_BATCH=THREADS,
+)
+class CoalescingTests(TransactionTestCase):
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.readers = [
+            User.objects.create_user(username=f'reader{i}')
+            for i in range(THREADS)
+        ]
+
+    def test_concurrent_writes_share_transaction(self):
+        '''
+        Одновременные подписки пишутся одной транзакцией,
+        и каждый поток возвращается после ее коммита.
+        '''
+
+        flushed = []
+        committed = []
+
+        def flush(batch):
+            flushed.append(len(batch))
+            real_flush(batch)
+
+        def follow(reader):
+            try:
+                writes.follow(reader, 'author')
+                committed.append(
+                    Follow.objects.filter(user=reader).exists()
+                )
+            finally:
+                connection.close()
+
+        real_flush = writes.flush
+        threads = [
+            threading.Thread(target=follow, args=(reader,))
+            for reader in self.readers
+        ]
+        with mock.patch.object(writes, 'flush', flush):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(flushed, [THREADS])
+        self.assertEqual(committed, [True] * THREADS)
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).followers_count, THREADS
+        )
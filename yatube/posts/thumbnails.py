@@ -0,0 +1,161 @@
+'''
+Фоновая подготовка миниатюр картинок постов.
+
+Сохранение новой картинки ставит задачу в таблицу ThumbnailJob,
+уникальное имя файла не дает поставить одну картинку дважды.
+Команда build_thumbnails забирает задачи и строит все варианты из
+images.VARIANTS, а шаблоны до этого показывают заглушку
+вместо того, чтобы строить миниатюру внутри запроса.
+Шаблоны только читают готовые миниатюры и ничего не пишут в базу:
+GET-запрос не должен закрепляться за основной базой (core.replicas).
+Задача, упавшая THUMBNAIL_JOB_ATTEMPTS раз, остается в таблице
+с отметкой failed и больше не берется, пока ее не вернут
+build_thumbnails --retry-failed.
+'''
+
+import logging
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings, settings
+from sorl.thumbnail.images import ImageFile
+
+from .constants import THUMBNAIL_JOB_ATTEMPTS, THUMBNAIL_JOB_TIMEOUT
+from .images import VARIANTS, stored
+from .models import Post, ThumbnailJob
+
+logger = logging.getLogger(__name__)
+
+
+class ReadyThumbnailBackend(ThumbnailBackend):
+    '''Бэкенд sorl, который только ищет готовую миниатюру'''
+
+    def get_ready_thumbnail(self, file_, geometry_string, **options):
+        '''Возвращает миниатюру из хранилища ключей sorl или None'''
+
+        source = ImageFile(file_)
+
+        if settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+
+        for key, attr in self.extra_options:
+            value = getattr(settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+
+        return default.kvstore.get(ImageFile(name, default.storage))
+
+
+backend = ReadyThumbnailBackend()
+
+
+def ready_variants(file_):
+    '''
+    Возвращает готовые варианты картинки для srcset
+    как [(формат, [(ширина, адрес)])] в порядке предпочтения форматов.
+    Пока готовы не все варианты, возвращает None.
+    '''
+
+    if not file_:
+        return None
+
+    found = {}
+    for geometry, options in VARIANTS:
+        thumbnail = backend.get_ready_thumbnail(file_, geometry, **options)
+        if thumbnail is None:
+            return None
+        widths = found.setdefault(options['format'], {})
+        widths.setdefault(thumbnail.width, thumbnail.url)
+
+    return [
+        (format_, sorted(widths.items())) for format_, widths in found.items()
+    ]
+
+
+def enqueue(name):
+    '''Ставит картинку в очередь, повтор игнорируется'''
+
+    ThumbnailJob.objects.bulk_create(
+        [ThumbnailJob(image=name)],
+        ignore_conflicts=True,
+    )
+
+
+def claim(job):
+    '''Забирает задачу, если ее не держит живой воркер'''
+
+    now = timezone.now()
+    stale = now - timedelta(seconds=THUMBNAIL_JOB_TIMEOUT)
+
+    return ThumbnailJob.objects.filter(
+        Q(started__isnull=True) | Q(started__lt=stale),
+        pk=job.pk,
+        failed__isnull=True,
+    ).update(started=now)
+
+
+def build(job):
+    '''
+    Строит все размеры картинки и обновляет посты с ней,
+    чтобы их фрагменты и страницы перерисовались без заглушки.
+    '''
+
+    source = stored(job.image)
+    for geometry, options in VARIANTS:
+        get_thumbnail(source, geometry, **options)
+        ready = backend.get_ready_thumbnail(source, geometry, **options)
+        if ready is None:
+            raise FileNotFoundError(job.image)
+
+    for post in Post.objects.filter(image=job.image):
+        post.save(update_fields=['updated'])
+
+
+def process(job):
+    '''Выполняет одну задачу, возвращает True при успехе'''
+
+    if not claim(job):
+        return False
+
+    try:
+        build(job)
+    except Exception:
+        logger.exception('Не удалось построить миниатюры %s', job.image)
+        job.attempts += 1
+        job.started = None
+        if job.attempts >= THUMBNAIL_JOB_ATTEMPTS:
+            # Строка остается: иначе следующее сохранение поставило бы
+            # сломанную картинку заново с нулем попыток.
+            job.failed = timezone.now()
+        job.save(update_fields=['attempts', 'started', 'failed'])
+
+        return False
+
+    job.delete()
+
+    return True
+
+
+def pending_jobs(limit):
+    '''Возвращает самые старые задачи очереди, кроме проваленных'''
+
+    return list(
+        ThumbnailJob.objects.filter(failed__isnull=True)
+        .order_by('created')[:limit]
+    )
+
+
+def retry_failed():
+    '''Возвращает проваленные задачи в очередь, число задач'''
+
+    return ThumbnailJob.objects.filter(failed__isnull=False).update(
+        failed=None, attempts=0
+    )
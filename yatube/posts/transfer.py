@@ -0,0 +1,305 @@
+'''
+Потоковый перенос постов, комментариев и подписок.
+
+Файл - JSONL или CSV, каждая строка - запись с полем type
+(post, comment, follow). Записи читаются и пишутся пачками,
+поэтому память не растет с размером файла: в ней держатся
+только пачка и словари username -> id и slug -> id.
+Производные данные (ленты, поисковый индекс, счетчики, кэш)
+обновляются пачками, а не сигналами на каждую строку.
+'''
+
+import csv
+import json
+from contextlib import contextmanager
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core import cache as page_cache
+from . import feed, search, stats
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+FORMATS = ('jsonl', 'csv')
+
+FIELDS = (
+    'type', 'id', 'post', 'author', 'user', 'group',
+    'text', 'pub_date', 'image',
+)
+
+# Порядок выгрузки: комментарии ссылаются на посты,
+# поэтому при загрузке посты должны прийти раньше.
+TYPES = ('post', 'comment', 'follow')
+
+
+def guess_format(path):
+    return 'csv' if path.lower().endswith('.csv') else 'jsonl'
+
+
+def chunks(iterable, size):
+    '''Режет поток на списки по size элементов'''
+
+    iterator = iter(iterable)
+
+    return iter(lambda: list(islice(iterator, size)), [])
+
+
+def read_records(stream, fmt):
+    '''Читает записи из потока, пустые значения CSV становятся None'''
+
+    if fmt == 'csv':
+        for row in csv.DictReader(stream):
+            yield {key: value or None for key, value in row.items()}
+    else:
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+
+
+def write_records(stream, fmt, records):
+    '''Пишет записи в поток, возвращает их число'''
+
+    total = 0
+    if fmt == 'csv':
+        writer = csv.DictWriter(stream, FIELDS)
+        writer.writeheader()
+        write = writer.writerow
+    else:
+        def write(record):
+            stream.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    for record in records:
+        write(record)
+        total += 1
+
+    return total
+
+
+def export_records(chunk_size):
+    '''Выгружает посты, комментарии и подписки потоком записей'''
+
+    posts = Post.objects.order_by('pk').values_list(
+        'pk', 'text', 'pub_date', 'author__username', 'group__slug', 'image'
+    )
+    for pk, text, pub_date, author, group, image in posts.iterator(
+        chunk_size=chunk_size
+    ):
+        yield {
+            'type': 'post',
+            'id': pk,
+            'text': text,
+            'pub_date': pub_date.isoformat(),
+            'author': author,
+            'group': group,
+            'image': image,
+        }
+
+    comments = Comment.objects.order_by('pk').values_list(
+        'pk', 'post_id', 'author__username', 'text', 'created'
+    )
+    for pk, post, author, text, created in comments.iterator(
+        chunk_size=chunk_size
+    ):
+        yield {
+            'type': 'comment',
+            'id': pk,
+            'post': post,
+            'author': author,
+            'text': text,
+            'pub_date': created.isoformat(),
+        }
+
+    follows = Follow.objects.order_by('pk').values_list(
+        'user__username', 'author__username'
+    )
+    for user, author in follows.iterator(chunk_size=chunk_size):
+        yield {'type': 'follow', 'user': user, 'author': author}
+
+
+def parse_date(value):
+    '''Дата из файла, без даты - текущее время'''
+
+    if not value:
+        return timezone.now()
+
+    date = parse_datetime(value)
+    if date is None:
+        raise ValueError(f'Неверная дата: {value}')
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date)
+
+    return date
+
+
+@contextmanager
+def explicit_dates(*fields):
+    '''
+    Отключает auto_now_add у полей, чтобы bulk_create
+    записал даты из файла, а не время загрузки.
+    '''
+
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Importer:
+    '''
+    Загружает пачки записей через bulk_create.
+
+    Atributes:
+        users, groups - словари username/slug -> id,
+            недостающие авторы и группы создаются;
+        next_ids - следующий свободный id для записей без id;
+        rows - число загруженных записей.
+    '''
+
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self.users = dict(User.objects.values_list('username', 'pk'))
+        self.groups = dict(Group.objects.values_list('slug', 'pk'))
+        self.next_ids = {
+            model: (model.objects.aggregate(top=Max('pk'))['top'] or 0) + 1
+            for model in (Post, Comment)
+        }
+        self.feed_users = set()
+        self.rows = 0
+
+    def insert(self, model, objs, **options):
+        '''
+        bulk_create пачками не больше batch_size и не больше,
+        чем база принимает в одном INSERT.
+        '''
+
+        fields = model._meta.concrete_fields
+        limit = connection.ops.bulk_batch_size(fields, objs)
+        model.objects.bulk_create(
+            objs, batch_size=max(min(self.batch_size, limit), 1), **options
+        )
+
+    def resolve(self, names, known, model, factory):
+        '''
+        Дополняет словарь known объектами, которых еще нет в базе.
+        Новым пользователям сразу заводит строки счетчиков: значения
+        исправит finish, но страница автора открывается и до него.
+        '''
+
+        missing = set(names) - set(known) - {None}
+        if missing:
+            field = 'username' if model is User else 'slug'
+            self.insert(model, [factory(name) for name in missing])
+            known.update(
+                model.objects.filter(**{f'{field}__in': missing})
+                .values_list(field, 'pk')
+            )
+            if model is User:
+                self.insert(
+                    UserStats,
+                    [UserStats(user_id=known[name]) for name in missing],
+                    ignore_conflicts=True,
+                )
+
+    def allocate_id(self, model, value):
+        '''Берет id из файла или выдает следующий свободный'''
+
+        pk = int(value) if value else self.next_ids[model]
+        self.next_ids[model] = max(self.next_ids[model], pk + 1)
+
+        return pk
+
+    def build(self, records):
+        '''
+        Раскладывает записи пачки на объекты моделей.
+        Возвращает их вместе с ресурсами кэша, которые они меняют.
+        '''
+
+        self.resolve(
+            [r.get('author') for r in records]
+            + [r.get('user') for r in records],
+            self.users,
+            User,
+            lambda name: User(username=name, password=make_password(None)),
+        )
+        self.resolve(
+            [r.get('group') for r in records],
+            self.groups,
+            Group,
+            lambda slug: Group(slug=slug, title=slug, description=''),
+        )
+
+        objects = {kind: [] for kind in TYPES}
+        resources = {'index'}
+        for record in records:
+            kind = record.get('type')
+            if kind == 'post':
+                obj = Post(
+                    pk=self.allocate_id(Post, record.get('id')),
+                    text=record['text'],
+                    pub_date=parse_date(record.get('pub_date')),
+                    author_id=self.users[record['author']],
+                    group_id=self.groups.get(record.get('group')),
+                    image=record.get('image') or '',
+                )
+                resources.add(f'author:{record["author"]}')
+                if record.get('group'):
+                    resources.add(f'group:{record["group"]}')
+            elif kind == 'comment':
+                obj = Comment(
+                    pk=self.allocate_id(Comment, record.get('id')),
+                    post_id=int(record['post']),
+                    text=record['text'],
+                    created=parse_date(record.get('pub_date')),
+                    author_id=self.users[record['author']],
+                )
+                resources.add(f'post:{record["post"]}')
+            elif kind == 'follow':
+                if record['user'] == record['author']:
+                    continue
+                obj = Follow(
+                    user_id=self.users[record['user']],
+                    author_id=self.users[record['author']],
+                )
+                resources.add(f'author:{record["user"]}')
+                resources.add(f'author:{record["author"]}')
+            else:
+                raise ValueError(f'Неизвестный тип записи: {kind}')
+            objects[kind].append(obj)
+
+        return objects, resources
+
+    def load(self, records):
+        '''Загружает одну пачку в отдельной транзакции'''
+
+        with transaction.atomic():
+            objects, resources = self.build(records)
+            posts = objects['post']
+
+            self.insert(Post, posts)
+            self.insert(Comment, objects['comment'])
+            self.insert(Follow, objects['follow'], ignore_conflicts=True)
+
+            if search.is_available():
+                search.index_rows(
+                    (post.pk, post.text, post.pub_date) for post in posts
+                )
+            self.feed_users |= feed.push_posts(posts)
+            for follow in objects['follow']:
+                feed.backfill(follow.user_id, follow.author_id)
+
+        page_cache.bump(*resources)
+        self.rows += len(records)
+
+    def finish(self):
+        '''Обрезает ленты и пересчитывает счетчики после загрузки'''
+
+        for user_id in self.feed_users:
+            feed.trim(user_id)
+        stats.recount()
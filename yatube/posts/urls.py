@@ -13,6 +13,27 @@ urlpatterns = [
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path('follow/', views.follow_index, name='follow_index'),
+    path(
+        'group/<slug:slug>/feed/',
+        views.group_feed,
+        name='group_feed'
+    ),
+    path(
+        'profile/<str:username>/feed/',
+        views.author_feed,
+        name='author_feed'
+    ),
+    path(
+        'follow/feed/<str:token>/',
+        views.follow_feed,
+        name='follow_feed'
+    ),
+    path('search/', views.search, name='search'),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='comments'
+    ),
     path(
         'posts/<int:post_id>/comment/',
         views.add_comment,
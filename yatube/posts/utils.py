@@ -1,8 +1,298 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
+import hashlib
 
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
 
-def get_page_obj(request, posts, limit_posts):
-    paginator = Paginator(posts, limit_posts)
-    page_namber = request.GET.get('page')
 
-    return paginator.get_page(page_namber)
+ELLIPSIS = '…'
+
+
+def encode_cursor(value, pk):
+    '''Упаковывает ключ (значение сортировки, id) в непрозрачный токен'''
+
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    else:
+        value = repr(value)
+    raw = f'{value}|{pk}'.encode()
+
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    '''
+    Распаковывает токен курсора.
+    Возвращает пару строк (значение, id) или None для битого токена.
+    '''
+
+    if not token:
+        return None
+
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        value, pk = raw.decode().rsplit('|', 1)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+    if not pk.isdigit():
+        return None
+
+    return value, int(pk)
+
+
+class KeysetPaginator(Paginator):
+    '''
+    Постраничный вывод по ключу (поле сортировки, id).
+
+    Вместо OFFSET страница выбирается условием WHERE по курсору,
+    поэтому глубокая страница стоит столько же, сколько первая,
+    а COUNT(*) не выполняется. Поле сортировки берется
+    из Meta.ordering модели или передается в ordering парой
+    (поле, уникальное поле) с одинаковым направлением.
+
+    Atributes:
+        next_cursor - токен для ?after= или None;
+        previous_cursor - токен для ?before= или None.
+    '''
+
+    is_keyset = True
+
+    def __init__(self, object_list, per_page, ordering=None):
+        super().__init__(object_list, per_page)
+        if ordering is None:
+            key = object_list.model._meta.ordering[0]
+            ordering = key, '-pk' if key.startswith('-') else 'pk'
+        key, tiebreak = ordering
+        self.descending = key.startswith('-')
+        self.key = key.lstrip('-')
+        self.tiebreak = tiebreak.lstrip('-')
+        self.next_cursor = None
+        self.previous_cursor = None
+
+    def _key_field(self):
+        annotation = self.object_list.query.annotations.get(self.key)
+        if annotation is not None:
+            return annotation.output_field
+
+        return self.object_list.model._meta.get_field(self.key)
+
+    def _seek(self, cursor, backwards):
+        '''Условие для строк, лежащих за курсором'''
+
+        value, pk = cursor
+        value = self._key_field().to_python(value)
+        lookup = 'gt' if self.descending == backwards else 'lt'
+
+        # Внешнее нестрогое условие дает индексу диапазон по ключу.
+        return Q(**{f'{self.key}__{lookup}e': value}) & (
+            Q(**{f'{self.key}__{lookup}': value})
+            | Q(**{f'{self.tiebreak}__{lookup}': pk})
+        )
+
+    def _order(self, backwards):
+        desc = '-' if self.descending != backwards else ''
+
+        return f'{desc}{self.key}', f'{desc}{self.tiebreak}'
+
+    def _cursor(self, obj):
+        return encode_cursor(
+            getattr(obj, self.key),
+            getattr(obj, self.tiebreak),
+        )
+
+    def page_queryset(self, cursor=None, backwards=False):
+        '''Возвращает запрос одной страницы (с лишней строкой) за курсором'''
+
+        queryset = self.object_list
+        if cursor is not None:
+            queryset = queryset.filter(self._seek(cursor, backwards))
+
+        return queryset.order_by(*self._order(backwards))[:self.per_page + 1]
+
+    def get_page(self, after=None, before=None):
+        '''
+        Возвращает страницу после курсора after или перед курсором before.
+        Без курсора (или с битым курсором) возвращает первую страницу.
+        '''
+
+        cursor = decode_cursor(after)
+        backwards = False
+        if cursor is None and before:
+            cursor = decode_cursor(before)
+            backwards = cursor is not None
+
+        try:
+            queryset = self.page_queryset(cursor, backwards)
+        except ValidationError:
+            cursor, backwards = None, False
+            queryset = self.page_queryset()
+
+        rows = list(queryset)
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if backwards:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, cursor is not None
+
+        if rows and has_next:
+            self.next_cursor = self._cursor(rows[-1])
+        if rows and has_previous:
+            self.previous_cursor = self._cursor(rows[0])
+
+        return self._get_page(rows, 1, self)
+
+
+def elided_page_range(number, num_pages, on_each_side=2, on_ends=1):
+    '''
+    Номера страниц для навигации: on_ends первых и последних
+    и по on_each_side вокруг текущей, пропуски заменены ELLIPSIS.
+    Длина не зависит от числа страниц.
+    '''
+
+    window = range(
+        max(1, number - on_each_side),
+        min(num_pages, number + on_each_side) + 1,
+    )
+    edges = (
+        *range(1, min(on_ends, num_pages) + 1),
+        *range(max(num_pages - on_ends + 1, 1), num_pages + 1),
+    )
+
+    previous = 0
+    for page in sorted({*window, *edges}):
+        if page - previous == 2:
+            # Пропуск в одну страницу короче показать номером.
+            yield previous + 1
+        elif page - previous > 2:
+            yield ELLIPSIS
+        yield page
+        previous = page
+
+
+class ApproximatePaginator(Paginator):
+    '''
+    Номерной постраничный вывод без точного COUNT(*) на каждый запрос.
+
+    Общее число строк берется из денормализованного счетчика,
+    если он передан в count, иначе из кэша. При промахе кэша
+    считается COUNT(*) по запросу без аннотаций и сортировки
+    и кладется в кэш на settings.PAGE_COUNT_TIMEOUT секунд.
+    Страница выбирается с лишней строкой: по ней видно,
+    есть ли следующая страница, даже если оценка устарела.
+    На последней странице оценка заменяется точным числом.
+
+    Atributes:
+        is_approximate - число строк и страниц приблизительное;
+        cache_key - ключ кэша с числом строк.
+    '''
+
+    def __init__(self, object_list, per_page, count=None):
+        super().__init__(object_list, per_page)
+        self.is_approximate = True
+        if count is not None:
+            self.count = count
+        self.cache_key = None
+
+    def _count_queryset(self):
+        return self.object_list.order_by().values('pk')
+
+    def _exact_count(self):
+        count = self._count_queryset().count()
+        self._remember(count)
+
+        return count
+
+    def _remember(self, count):
+        if self.cache_key is not None:
+            cache.set(self.cache_key, count, settings.PAGE_COUNT_TIMEOUT)
+
+    @cached_property
+    def count(self):
+        sql = str(self._count_queryset().query).encode()
+        self.cache_key = 'page_count:' + hashlib.md5(sql).hexdigest()
+        count = cache.get(self.cache_key)
+        if count is None:
+            count = self._exact_count()
+
+        return count
+
+    def _correct(self, count):
+        '''Заменяет оценку точным числом строк'''
+
+        self.count = count
+        self.__dict__.pop('num_pages', None)
+        self.is_approximate = False
+        self._remember(count)
+
+    def validate_number(self, number):
+        '''
+        Номер за приблизительным num_pages не отвергается сразу:
+        оценка могла устареть, и page() сам проверит строки страницы.
+        '''
+
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            if not self.is_approximate or int(number) < 1:
+                raise
+            return int(number)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+
+        if len(rows) > self.per_page:
+            if number >= self.num_pages:
+                # Оценка занижена: за этой страницей есть еще хотя бы
+                # одна. Новая оценка идет в кэш, иначе следующий запрос
+                # снова упрется в старое число страниц.
+                self.count = bottom + len(rows)
+                self.__dict__.pop('num_pages', None)
+                self._remember(self.count)
+            rows = rows[:self.per_page]
+        elif rows or number == 1:
+            self._correct(bottom + len(rows))
+        else:
+            # Оценка завышена: get_page перейдет на настоящую последнюю.
+            self._correct(self._exact_count())
+            raise EmptyPage('That page contains no results')
+
+        return self._get_page(rows, number, self)
+
+    def get_page(self, number):
+        try:
+            return super().get_page(number)
+        except EmptyPage:
+            return self.page(self.num_pages)
+
+
+def get_page_obj(request, posts, limit_posts, ordering=None, count=None):
+    '''
+    Возвращает страницу постов.
+    По умолчанию листает курсором (?after=/?before=),
+    номерной режим (?page=) оставлен как запасной.
+    count - денормализованное число постов для номерного режима.
+    '''
+
+    if 'page' in request.GET:
+        paginator = ApproximatePaginator(posts, limit_posts, count)
+        page_namber = request.GET.get('page')
+
+        return paginator.get_page(page_namber)
+
+    paginator = KeysetPaginator(posts, limit_posts, ordering)
+
+    return paginator.get_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
@@ -1,18 +1,27 @@
+from django.conf import settings
+from django.http import Http404, JsonResponse
 from django.shortcuts import render, get_object_or_404, redirect
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.cache import cache_page
 
-from .models import Post, Group, User, Comment, Follow
+from core.cache import (
+    cache_page_versioned, conditional_versioned, versioned_prefix,
+)
+
+from .models import Comment, Post, Group, User, Follow
 from .constants import POSTS_LIMIT
-from .forms import PostForm, CommentForm
-from .utils import get_page_obj
+from .forms import PostForm, CommentForm, SearchForm
+from .utils import KeysetPaginator, get_page_obj
+from .feed import FEED_ORDERING, get_feed_posts
+from .search import SearchPaginator
+from . import atom, writes
 
 
-@cache_page(20, key_prefix='index_page')
+@cache_page_versioned(settings.PAGE_CACHE_TIMEOUT, 'index_page', 'index')
 def index(request):
     '''Сортирует по дате и возвращает LIMIT обЪектов модели Post'''
 
-    posts = Post.objects.select_related('author')
+    posts = Post.objects.for_listing()
 
     context = {
         'page_obj': get_page_obj(request, posts, POSTS_LIMIT),
@@ -21,6 +30,10 @@ def index(request):
     return render(request, 'posts/index.html', context)
 
 
+@conditional_versioned('group_page', 'group:{slug}')
+@cache_page_versioned(
+    settings.PAGE_CACHE_TIMEOUT, 'group_page', 'group:{slug}'
+)
 def group_posts(request, slug):
     '''
     Проверяет наличие группы.
@@ -29,7 +42,7 @@ def group_posts(request, slug):
     '''
 
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    posts = group.posts.for_listing()
 
     context = {
         'page_obj': get_page_obj(request, posts, POSTS_LIMIT),
@@ -39,13 +52,20 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@conditional_versioned('profile_page', 'author:{username}')
+@cache_page_versioned(
+    settings.PAGE_CACHE_TIMEOUT, 'profile_page', 'author:{username}'
+)
 def profile(request, username):
     '''
     Возвращает посты выбранного автора
     '''
 
-    author = get_object_or_404(User, username=username)
-    posts = Post.objects.filter(author=author)
+    author = get_object_or_404(
+        User.objects.select_related('stats'),
+        username=username,
+    )
+    posts = author.posts.for_listing()
 
     is_following = False
     if request.user.is_authenticated:
@@ -53,23 +73,97 @@ def profile(request, username):
             user=request.user,
             author=author).exists()
 
+    # Строки счетчиков может еще не быть (import_posts заводит их
+    # после пользователей), тогда число постов считается по кэшу.
+    author_stats = getattr(author, 'stats', None)
     context = {
         'author': author,
-        'page_obj': get_page_obj(request, posts, POSTS_LIMIT),
+        'page_obj': get_page_obj(
+            request, posts, POSTS_LIMIT,
+            count=author_stats and author_stats.posts_count,
+        ),
         'following': is_following
     }
 
     return render(request, 'posts/profile.html', context)
 
 
+@conditional_versioned('group_feed', 'group:{slug}')
+def group_feed(request, slug):
+    '''Лента Atom последних постов группы'''
+
+    group = get_object_or_404(Group.objects.only('title'), slug=slug)
+
+    return atom.cached_feed(
+        request,
+        versioned_prefix('group_feed', f'group:{slug}'),
+        group.title,
+        reverse('posts:group', kwargs={'slug': slug}),
+        group.posts.all(),
+    )
+
+
+@conditional_versioned('author_feed', 'author:{username}')
+def author_feed(request, username):
+    '''Лента Atom последних постов автора'''
+
+    author = get_object_or_404(
+        User.objects.only('username', 'first_name', 'last_name'),
+        username=username,
+    )
+
+    return atom.cached_feed(
+        request,
+        versioned_prefix('author_feed', f'author:{username}'),
+        author.get_full_name() or author.username,
+        reverse('posts:profile', kwargs={'username': username}),
+        author.posts.all(),
+    )
+
+
+def get_comments_page(request, post_id):
+    '''
+    Возвращает страницу комментариев поста от новых к старым.
+    Следующие страницы листаются курсором ?after=.
+    '''
+
+    comments = Comment.objects.filter(post_id=post_id).select_related(
+        'author'
+    ).only('text', 'created', 'author__username')
+    paginator = KeysetPaginator(comments, settings.COMMENTS_PAGE_SIZE)
+
+    return paginator.get_page(after=request.GET.get('after'))
+
+
+def post_page_resources(post_id):
+    '''
+    Ресурсы кэша страницы поста: сам пост, его автор (счетчик постов)
+    и группа. None, если поста нет.
+    '''
+
+    found = Post.objects.filter(pk=post_id).values_list(
+        'author__username', 'group__slug'
+    ).first()
+    if found is None:
+        return None
+
+    username, slug = found
+    resources = [f'post:{post_id}', f'author:{username}']
+    if slug:
+        resources.append(f'group:{slug}')
+
+    return resources
+
+
+@conditional_versioned('post_page', post_page_resources)
 def post_detail(request, post_id):
     '''
     Возвращает выбранный пост.
     Автора поста и колтчесво постов автора
     '''
 
-    post = get_object_or_404(Post, pk=post_id)
-    comments = Comment.objects.filter(post=post)
+    post = get_object_or_404(Post.objects.for_listing(), pk=post_id)
+    comments = get_comments_page(request, post_id)
     form = CommentForm(request.POST or None)
 
     context = {
@@ -81,6 +175,37 @@ def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', context)
 
 
+def post_comments(request, post_id):
+    '''
+    Подгружает следующую страницу комментариев поста.
+    Отдает HTML-фрагмент для страницы поста
+    или JSON при ?format=json.
+    '''
+
+    comments = get_comments_page(request, post_id)
+
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'comments': [
+                {
+                    'id': comment.pk,
+                    'author': comment.author.username,
+                    'text': comment.text,
+                    'created': comment.created,
+                }
+                for comment in comments
+            ],
+            'next': comments.paginator.next_cursor,
+        })
+
+    context = {
+        'comments': comments,
+        'post_id': post_id,
+    }
+
+    return render(request, 'posts/includes/comment_list.html', context)
+
+
 @login_required
 def post_create(request):
     '''
@@ -89,7 +214,7 @@ def post_create(request):
     добавляет в бд
     '''
 
-    form = PostForm(request.POST or None)
+    form = PostForm(request.POST or None, files=request.FILES or None)
 
     if form.is_valid():
         post = form.save(commit=False)
@@ -139,52 +264,87 @@ def post_edit(request, post_id):
 @login_required
 def add_comment(request, post_id):
 
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
     form = CommentForm(request.POST or None)
 
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        writes.add_comment(comment)
 
     return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
 def follow_index(request):
-    user = get_object_or_404(User, pk=request.user.id)
-
-    posts = Post.objects.filter(author__following__user=user)
+    posts = get_feed_posts(request.user).for_listing()
 
     context = {
-        'page_obj': get_page_obj(request, posts, POSTS_LIMIT),
+        'page_obj': get_page_obj(request, posts, POSTS_LIMIT, FEED_ORDERING),
+        'feed_token': atom.follow_token(request.user),
     }
 
     return render(request, 'posts/follow.html', context)
 
 
+def follow_feed(request, token):
+    '''
+    Лента Atom подписок. Читалки лент не входят на сайт,
+    поэтому пользователь определяется подписанным токеном в адресе.
+    '''
+
+    user = User.objects.filter(pk=atom.follow_user_id(token)).first()
+    if user is None:
+        raise Http404
+
+    return atom.follow_feed(
+        request,
+        f'Подписки {user.username}',
+        reverse('posts:follow_index'),
+        get_feed_posts(user),
+        'feed_date',
+        FEED_ORDERING,
+    )
+
+
+def search(request):
+    '''
+    Ищет посты по словам запроса ?q= в полнотекстовом индексе.
+    Выше идут более подходящие и более свежие посты.
+    '''
+
+    form = SearchForm(request.GET or None)
+    page_obj = None
+
+    if form.is_valid():
+        paginator = SearchPaginator(form.cleaned_data['q'], POSTS_LIMIT)
+        page_obj = paginator.get_page(
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+        )
+
+    context = {
+        'form': form,
+        'query': request.GET.get('q', ''),
+        'page_obj': page_obj,
+    }
+
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
-    is_subscription = Follow.objects.filter(
-        user=request.user,
-        author=author).exists()
-
-    if not is_subscription:
-        if not request.user.username == username:
-            Follow.objects.create(
-                user=request.user,
-                author=author
-            )
+    # Новая подписка - один запрос. Остальное (уже подписан, это он
+    # сам, автора нет) редко, и только тогда автор ищется для 404.
+    if not writes.follow(request.user, username):
+        get_object_or_404(User.objects.only('pk'), username=username)
 
     return redirect('posts:follow_index')
 
 
 @login_required
 def profile_unfollow(request, username):
-    Follow.objects.filter(
-        user=request.user,
-        author__username=username).delete()
+    writes.unfollow(request.user, username)
 
     return redirect('posts:follow_index')
@@ -0,0 +1,263 @@
+'''
+Групповая запись комментариев и подписок.
+
+С WRITE_COALESCING запрос не открывает свою транзакцию, а кладет
+запись в общий буфер процесса и ждет ее коммита. Первый ждущий
+поток становится ведущим: собирает записи до WRITE_COALESCING_BATCH
+штук или WRITE_COALESCING_DELAY секунд и выполняет их одной
+транзакцией, остальные ждут. Представление отвечает только после
+коммита своей записи, поэтому подтвержденная запись не теряется.
+
+Если общая транзакция падает (например, пост удалили, пока
+комментарий ждал), записи повторяются по одной, и ошибку получает
+только запрос с плохой записью. Без WRITE_COALESCING запись
+выполняется сразу тем же кодом.
+'''
+
+import threading
+from itertools import groupby
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Model
+
+from .models import Follow, User
+
+COMMENT = 'comment'
+FOLLOW = 'follow'
+UNFOLLOW = 'unfollow'
+
+
+class Write:
+    '''
+    Запись, ждущая коммита.
+
+    Atributes:
+        kind - COMMENT, FOLLOW или UNFOLLOW;
+        value - несохраненный Comment или пара (пользователь,
+            имя автора) для подписки и отписки;
+        done - событие коммита или ошибки;
+        result - результат записи;
+        error - исключение, если запись не удалась.
+    '''
+
+    def __init__(self, kind, value):
+        self.kind = kind
+        self.value = value
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def reset(self):
+        '''Забывает pk, выданный в откаченной транзакции'''
+
+        if isinstance(self.value, Model):
+            self.value.pk = None
+            self.value._state.adding = True
+
+
+def save_comments(comments):
+    # По одному, чтобы у комментариев были pk и обычные сигналы;
+    # дорог коммит, а не INSERT, и он здесь один.
+    for comment in comments:
+        comment.save()
+
+    return comments
+
+
+def resolve_authors(pairs):
+    '''Словарь имя автора -> id для пар (пользователь, имя автора)'''
+
+    return dict(
+        User.objects.filter(
+            username__in={username for _, username in pairs}
+        ).values_list('username', 'pk')
+    )
+
+
+def pair_results(done, pairs, authors):
+    '''
+    Для каждой пары - попала ли она в done, множество пар
+    (user_id, author_id), записанных запросом. Повтор пары в пачке
+    получает False: записала ее только первая запись.
+    '''
+
+    done = set(done)
+    results = []
+    for user, username in pairs:
+        pair = user.pk, authors.get(username)
+        results.append(pair in done)
+        done.discard(pair)
+
+    return results
+
+
+def create_follows(pairs):
+    '''
+    Одна подписка - один INSERT ... SELECT. Пачка - один запрос
+    за авторами и один bulk_follow. Для каждой пары - новая ли она.
+    '''
+
+    if len(pairs) == 1:
+        return [Follow.objects.follow(*pairs[0])]
+
+    authors = resolve_authors(pairs)
+    created = Follow.objects.bulk_follow(
+        Follow(user=user, author_id=authors[username])
+        for user, username in pairs
+        if username in authors
+    )
+
+    return pair_results(
+        ((follow.user_id, follow.author_id) for follow in created),
+        pairs, authors,
+    )
+
+
+def delete_follows(pairs):
+    '''
+    Одна отписка - один DELETE. Пачка - один запрос за авторами
+    и один bulk_unfollow. Для каждой пары - была ли подписка.
+    '''
+
+    if len(pairs) == 1:
+        return [Follow.objects.unfollow(*pairs[0])]
+
+    authors = resolve_authors(pairs)
+    deleted = Follow.objects.bulk_unfollow(
+        Follow(user=user, author=User(pk=authors[username], username=username))
+        for user, username in pairs
+        if username in authors
+    )
+
+    return pair_results(
+        ((follow.user_id, follow.author_id) for follow in deleted),
+        pairs, authors,
+    )
+
+
+APPLY = {
+    COMMENT: save_comments,
+    FOLLOW: create_follows,
+    UNFOLLOW: delete_follows,
+}
+
+
+def apply(writes):
+    '''Выполняет записи; подряд идущие записи одного вида - вместе'''
+
+    for kind, group in groupby(writes, key=lambda write: write.kind):
+        group = list(group)
+        results = APPLY[kind]([write.value for write in group])
+        for write, result in zip(group, results):
+            write.result = result
+
+
+def flush(writes):
+    '''
+    Выполняет записи одной транзакцией, если она упала - каждую
+    в своей. Ошибка записи сохраняется в ней самой.
+    '''
+
+    try:
+        with transaction.atomic():
+            apply(writes)
+    except Exception as error:
+        if len(writes) == 1:
+            writes[0].error = error
+            return
+        for write in writes:
+            write.reset()
+            try:
+                with transaction.atomic():
+                    apply([write])
+            except Exception as error:
+                write.error = error
+
+
+class Buffer:
+    '''
+    Буфер записей процесса.
+
+    Atributes:
+        pending - записи, которые ждут ведущего;
+        leading - есть поток, собирающий пачку;
+        filled - условие "пачка набрана" для ведущего;
+        flushing - не дает двум пачкам писать одновременно.
+    '''
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.filled = threading.Condition(self.lock)
+        self.flushing = threading.Lock()
+        self.pending = []
+        self.leading = False
+
+    def submit(self, write):
+        with self.lock:
+            self.pending.append(write)
+            lead = not self.leading
+            self.leading = True
+            if len(self.pending) >= settings.WRITE_COALESCING_BATCH:
+                self.filled.notify()
+
+        if lead:
+            self.lead()
+        else:
+            write.done.wait()
+
+    def lead(self):
+        '''Собирает пачку и пишет ее, пока остальные ждут'''
+
+        with self.flushing:
+            with self.lock:
+                self.filled.wait_for(
+                    lambda: (
+                        len(self.pending) >= settings.WRITE_COALESCING_BATCH
+                    ),
+                    timeout=settings.WRITE_COALESCING_DELAY,
+                )
+                writes, self.pending = self.pending, []
+                self.leading = False
+
+            try:
+                flush(writes)
+            finally:
+                for write in writes:
+                    write.done.set()
+
+
+buffer = Buffer()
+
+
+def submit(kind, value):
+    '''Выполняет запись и возвращается после ее коммита'''
+
+    write = Write(kind, value)
+    # Внутри чужой транзакции коммит решает вызывающий код,
+    # и записи других запросов в нее попасть не должны.
+    if not settings.WRITE_COALESCING or transaction.get_connection(
+        router.db_for_write(Follow)
+    ).in_atomic_block:
+        flush([write])
+    else:
+        buffer.submit(write)
+
+    if write.error is not None:
+        raise write.error
+
+    return write.result
+
+
+def add_comment(comment):
+    return submit(COMMENT, comment)
+
+
+def follow(user, username):
+    '''True, если подписка новая'''
+
+    return submit(FOLLOW, (user, username))
+
+
+def unfollow(user, username):
+    return submit(UNFOLLOW, (user, username))
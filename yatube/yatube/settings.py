@@ -22,6 +22,7 @@ INSTALLED_APPS = [
     'posts.apps.PostsConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
 
     'django.contrib.admin',
     'django.contrib.auth',
@@ -34,6 +35,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.metrics.MetricsMiddleware',
+    'core.replicas.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -77,9 +80,45 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
     }
 }
 
+# PRAGMA для каждого нового соединения SQLite (core.signals).
+# WAL дает читателям работать параллельно с записью, busy_timeout
+# заставляет конкурирующую запись ждать вместо "database is locked".
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+# Реплики для чтения: пути к копиям базы через запятую в DB_REPLICAS.
+# Копии обновляет python manage.py sync_replicas --loop. Страницы
+# с реплики, которая еще не видит их последних изменений, не кэшируются
+# (core.cache), так что отставание реплики только временно отключает
+# кэш этих страниц.
+DATABASE_REPLICAS = []
+for number, path in enumerate(
+    filter(None, os.getenv('DB_REPLICAS', '').split(',')), start=1
+):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': path,
+        # Постоянное соединение читало бы подмененный файл вечно.
+        'CONN_MAX_AGE': 0,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+
+# Сколько секунд после записи чтения пользователя идут на default.
+REPLICA_PIN_SECONDS = 5
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -120,8 +159,87 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Длина материализованной ленты подписок (ленты обрезает команда
+# trim_feeds) и порог подписчиков, после которого посты автора
+# подмешиваются в ленту при чтении.
+FEED_MAX_LENGTH = 1000
+FEED_CELEBRITY_THRESHOLD = 10000
+
+# Кэш общий для всех воркеров: file или redis (нужен пакет django-redis).
+# locmem годится только для разработки и тестов.
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django_redis.cache.RedisCache',
+}
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': CACHE_BACKENDS[os.getenv('CACHE_BACKEND', 'locmem')],
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION', os.path.join(BASE_DIR, 'cache')
+        ),
     }
 }
+
+# Страницы сбрасываются сигналами моделей, TTL лишь страховка.
+PAGE_CACHE_TIMEOUT = 60 * 10
+
+# Сколько секунд номерной постраничный вывод (?page=) верит
+# закэшированному числу постов вместо COUNT(*).
+PAGE_COUNT_TIMEOUT = 60 * 5
+
+# Сколько комментариев выводит страница поста сразу и сколько
+# подгружает каждый запрос к posts:comments.
+COMMENTS_PAGE_SIZE = 50
+
+# Сколько последних постов отдают ленты Atom.
+SYNDICATION_ENTRIES = 50
+
+# Потоки, в которых yatube.asgi выполняет Django. Каждый поток
+# держит свое соединение с базой, так что это и предел соединений.
+ASGI_THREADS = int(os.getenv('ASGI_THREADS', 8))
+
+# Групповая запись комментариев и подписок (posts.writes): пачка
+# пишется одной транзакцией через WRITE_COALESCING_DELAY секунд
+# или по набору WRITE_COALESCING_BATCH записей.
+WRITE_COALESCING = os.getenv('WRITE_COALESCING', '') == '1'
+WRITE_COALESCING_DELAY = 0.005
+WRITE_COALESCING_BATCH = 100
+
+# Размер страницы API по умолчанию и наибольший для ?limit=.
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 100
+
+# Сколько авторов можно передать в одну подписку {"authors": [...]}.
+API_MAX_BULK_FOLLOWS = 500
+
+# Фрагменты post.html версионируются датой изменения поста.
+POST_FRAGMENT_TIMEOUT = 60 * 60 * 24
+
+# Свежесть в ранжировании поиска: пост, опубликованный на столько
+# секунд позже, получает к BM25 прибавку в одну единицу.
+SEARCH_RECENCY_SECONDS = 60 * 60 * 24 * 30
+
+# Сколько последних совпадений ранжирует поиск. Ограничивает время
+# запроса для частых слов, более старые совпадения не показываются,
+# о чем предупреждает страница поиска.
+SEARCH_MAX_CANDIDATES = 2000
+
+# Токен для /metrics (заголовок Authorization: Bearer <токен>).
+# Без токена метрики открыты всем, закрывайте их на уровне прокси.
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+# Бюджеты представлений: при превышении пишется предупреждение
+# в логгер core.metrics. Метрики: seconds, sql_count, sql_seconds,
+# template_seconds.
+VIEW_BUDGETS = {
+    'posts:index': {'sql_count': 5, 'seconds': 0.5},
+    'posts:group': {'sql_count': 5, 'seconds': 0.5},
+    'posts:profile': {'sql_count': 5, 'seconds': 0.5},
+    'posts:post_detail': {'sql_count': 5, 'seconds': 0.5},
+    'posts:follow_index': {'sql_count': 5, 'seconds': 0.5},
+    'posts:search': {'sql_count': 5, 'seconds': 0.5},
+    'posts:comments': {'sql_count': 2, 'seconds': 0.2},
+    'api:posts': {'sql_count': 3, 'seconds': 0.2},
+}